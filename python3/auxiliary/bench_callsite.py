@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+# Call-site capture benchmark: inspect.stack() against errors.caller()
+#
+# Toggles LED strip (on then off) through common.led with stand-in for
+# rpi_ws281x, so time is that of Python code alone.  Before cost is toggle
+# plus inspect.getframeinfo(inspect.stack()[1][0]) that LED.on and LED.off
+# made on every call, measured from same stack depth as LED calls.  Now
+# errors.caller() runs only in except blocks, so toggle incurs none.
+# Cost of errors.caller() on failure is reported alongside.
+#
+#     cd python3 && python3 -m auxiliary.bench_callsite --toggles 200 --depth 12
+
+import argparse
+import inspect
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class PixelStrip(object):
+    """
+    Stand-in for rpi_ws281x.PixelStrip
+    """
+    def __init__(self, num, **kwargs):
+        self.pixels = [0] * num
+
+    def begin(self):
+        pass
+
+    def numPixels(self):
+        return len(self.pixels)
+
+    def setPixelColor(self, n, color):
+        self.pixels[n] = color
+
+    def show(self):
+        pass
+
+
+def legacy_capture() -> str:
+    """
+    Call-site capture as LED.on and LED.off made it before errors.caller()
+
+    :return err_msg_base: str
+    """
+    info = inspect.getframeinfo(frame=inspect.stack()[1][0])
+    return 'FILE: ' + info.filename + ' ' + 'FUNCTION: ' + info.function
+
+
+def at_depth(
+    depth: int,
+    func: any,
+    count: int
+) -> float:
+    """
+    Calls func count times from depth nested frames, as LED is called from
+    below main script, capture cycle and snap shot
+
+    :param depth: int
+    :param func: callable
+    :param count: int
+
+    :return seconds: float, per call
+    """
+    if depth > 0:
+        seconds = at_depth(depth - 1, func, count)
+    else:
+        timea = time.perf_counter()
+        for call_num in range(count):
+            func()
+        seconds = (time.perf_counter() - timea) / count
+
+    return seconds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare call-site capture cost per LED toggle')
+    parser.add_argument('--toggles', type=int, default=200)
+    parser.add_argument('--depth', type=int, default=12, help='frames below LED caller')
+    args = parser.parse_args()
+
+    rpi_ws281x = types.ModuleType('rpi_ws281x')
+    rpi_ws281x.PixelStrip = PixelStrip
+    rpi_ws281x.SK6812_STRIP_GRBW = 0
+    sys.modules['rpi_ws281x'] = rpi_ws281x
+
+    from common import errors
+    from common.led import LED
+
+    sys.stdout = open(os.devnull, 'w')
+    flash = LED(
+        err_xmit_url='',
+        led_cfg_dict={
+            'count': 2,
+            'pin': 18,
+            'freq_hz': 800000,
+            'dma': 10,
+            'brightness': 255,
+            'invert': False,
+            'channel': 0
+        }
+    )
+    led_set_dict = {'r': 100, 'g': 100, 'b': 100, 'w': 255}
+
+    def toggle():
+        flash.on(led_set_dict=led_set_dict)
+        flash.off()
+
+    toggle_sec = at_depth(args.depth, toggle, args.toggles)
+    legacy_sec = at_depth(args.depth, legacy_capture, args.toggles)
+    caller_sec = at_depth(args.depth, errors.caller, args.toggles)
+    sys.stdout = sys.__stdout__
+
+    before_sec = toggle_sec + (2 * legacy_sec)
+    print('Call-site capture: inspect.stack() {0:.1f} us, errors.caller() {1:.2f} us'.format(
+        legacy_sec * 1e6,
+        caller_sec * 1e6
+    ))
+    print('LED toggle at depth {0}: before {1:.1f} us, after {2:.1f} us ({3:.0f}x)'.format(
+        args.depth,
+        before_sec * 1e6,
+        toggle_sec * 1e6,
+        before_sec / toggle_sec
+    ))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+# Capture reduction benchmark: JPEG path against luma path
+#
+# JPEG path reduces quality-100 JPEG stream as PiCamera delivers it, luma
+# path reduces YUV420 frame held in preallocated buffer.  Camera output is
+# synthesized once into files, each path then runs in fresh process so CPU
+# time and peak resident set size are those of that path alone.  Template
+# recognition is timed last over synthesized digit templates and register
+# at default recognition input size, target is under 100 ms on Pi Zero.
+#
+#     cd python3 && python3 -m auxiliary.bench_capture --size 1536 --roi 400,400,1100,900
+
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def frames(
+    work_dir: str,
+    size: int
+) -> (str, str):
+    """
+    Synthesizes camera output for both paths
+
+    :param work_dir: str
+    :param size: int, frame width and height
+
+    :return jpeg_url: str
+    :return yuv_url: str
+    """
+    from PIL import Image, ImageChops
+
+    img = ImageChops.add(
+        Image.radial_gradient(mode='L').resize((size, size)),
+        Image.effect_noise((size, size), 24)
+    ).convert('RGB')
+
+    jpeg_url = os.path.join(work_dir, 'frame.jpg')
+    img.save(jpeg_url, format='jpeg', quality=100)
+
+    # YUV420 with rows padded to 32 and height to 16, as PiCamera delivers
+    frame_width = (size + 31) // 32 * 32
+    frame_height = (size + 15) // 16 * 16
+    yuv_url = os.path.join(work_dir, 'frame.yuv')
+    with open(file=yuv_url, mode='wb') as yuv_file:
+        luma = img.convert('L').crop((0, 0, frame_width, frame_height))
+        yuv_file.write(luma.tobytes())
+        yuv_file.write(bytes(frame_width * frame_height // 2))
+
+    return jpeg_url, yuv_url
+
+
+def run_path(
+    path: str,
+    frame_url: str,
+    size: int,
+    args: argparse.Namespace,
+    result_queue: multiprocessing.Queue
+) -> None:
+    """
+    Reduces one frame in current process and reports CPU time and memory
+
+    :param path: str, 'jpeg' or 'luma'
+    :param frame_url: str
+    :param size: int
+    :param args: argparse.Namespace
+    :param result_queue: multiprocessing.Queue
+    """
+    import numpy as np
+    from common import img_ops
+
+    rss_base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    dest_url = os.path.join(os.path.dirname(frame_url), path + '.jpg')
+    roi_list = [tuple(int(value) for value in args.roi.split(','))] if args.roi else None
+
+    cpua = time.process_time()
+    if path == 'jpeg':
+        with open(file=frame_url, mode='rb') as frame_file:
+            img_orig = io.BytesIO(frame_file.read())
+    else:
+        frame_width = (size + 31) // 32 * 32
+        frame_height = (size + 15) // 16 * 16
+        yuv_buffer = np.empty(frame_width * frame_height * 3 // 2, dtype=np.uint8)
+        with open(file=frame_url, mode='rb') as frame_file:
+            frame_file.readinto(memoryview(yuv_buffer))
+        img_orig = yuv_buffer[:frame_width * frame_height].\
+            reshape(frame_height, frame_width)[:size, :size]
+
+    img_ops.reduce(
+        img_orig_stream=img_orig,
+        err_xmit_url='',
+        img_orig_url='',
+        img_dest_url=dest_url,
+        img_dest_qual=args.quality,
+        roi_list=roi_list,
+        luma_scale=args.luma_scale if path == 'luma' else 1
+    )
+
+    result_queue.put({
+        'path': path,
+        'cpu': time.process_time() - cpua,
+        'rss_base': rss_base,
+        'rss_peak': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'bytes': os.path.getsize(dest_url)
+    })
+
+
+def template_match(
+    work_dir: str,
+    args: argparse.Namespace
+) -> (float, str):
+    """
+    Times template recognition of synthesized register, templates are
+    default PIL font digits scaled to digit cell
+
+    :param work_dir: str
+    :param args: argparse.Namespace
+
+    :return match_sec: float, per register
+    :return read: str
+    """
+    from PIL import Image, ImageDraw
+    from common import recognize
+
+    cell_width = args.rcg_width // args.digits
+    template_dir = os.path.join(work_dir, 'templates')
+    os.makedirs(template_dir, exist_ok=True)
+
+    digit_imgs = []
+    for digit in range(10):
+        img = Image.new('L', (8, 12), 255)
+        ImageDraw.Draw(img).text((1, 0), str(digit), fill=0)
+        digit_imgs.append(img.resize((cell_width, args.rcg_height), Image.BILINEAR))
+        digit_imgs[-1].save(os.path.join(template_dir, '{0}_bench.png'.format(digit)))
+
+    expect = ''.join(str((digit * 7 + 4) % 10) for digit in range(args.digits))
+    register = Image.new('L', (args.rcg_width, args.rcg_height), 255)
+    for position, digit in enumerate(expect):
+        register.paste(digit_imgs[int(digit)], (position * cell_width, 0))
+
+    rcg = recognize.BACKENDS['template'](rcg_dict={
+        'model_url': template_dir,
+        'width': args.rcg_width,
+        'height': args.rcg_height,
+        'digits': args.digits,
+        'batch': 1
+    })
+    rcg.load()
+    rcg.predict(img_list=[register])
+
+    timea = time.perf_counter()
+    for run_num in range(args.match_runs):
+        read_list = rcg.predict(img_list=[register])
+    match_sec = (time.perf_counter() - timea) / args.match_runs
+
+    return match_sec, read_list[0][0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare JPEG and luma capture reduction paths')
+    parser.add_argument('--size', type=int, default=1536, help='frame width and height')
+    parser.add_argument('--quality', type=int, default=20)
+    parser.add_argument('--roi', default='', help='left,top,right,bottom')
+    parser.add_argument('--luma-scale', type=int, default=1)
+    parser.add_argument('--rcg-width', type=int, default=160, help='recognition input width')
+    parser.add_argument('--rcg-height', type=int, default=32, help='recognition input height')
+    parser.add_argument('--digits', type=int, default=6)
+    parser.add_argument('--match-runs', type=int, default=50)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_capture_')
+    jpeg_url, yuv_url = frames(
+        work_dir=work_dir,
+        size=args.size
+    )
+
+    context = multiprocessing.get_context('spawn')
+    result_queue = context.Queue()
+    for path, frame_url in [('jpeg', jpeg_url), ('luma', yuv_url)]:
+        process = context.Process(
+            target=run_path,
+            args=(path, frame_url, args.size, args, result_queue)
+        )
+        process.start()
+        result = result_queue.get()
+        process.join()
+
+        print('{0:<5} path: CPU {1:.3f} sec, peak RSS {2} kB ({3:+d} kB over imports), output {4} bytes'.format(
+            result['path'],
+            result['cpu'],
+            result['rss_peak'],
+            result['rss_peak'] - result['rss_base'],
+            result['bytes']
+        ))
+
+    match_sec, read = template_match(
+        work_dir=work_dir,
+        args=args
+    )
+    print('template match: {0:.1f} ms per register of {1} digits at {2}x{3}, read {4} (target < 100 ms on Pi Zero)'.
+          format(match_sec * 1e3, args.digits, args.rcg_width, args.rcg_height, read))
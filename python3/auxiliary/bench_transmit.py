@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+# Transmit throughput benchmark against simulated modem
+#
+# Runs main-transmit.py sequence (queue sync, single upload session, ack on
+# success) over auxiliary.modem_sim in place of Sim800 on /dev/ttyAMA0 and
+# reports files per hour, payload bytes per second and wall time per phase.
+# Alternate upload over network is disabled so only modem path is measured.
+#
+#     cd python3 && python3 -m auxiliary.bench_transmit --files 20 --size 40000
+
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auxiliary.modem_sim import ModemSim
+
+
+def timed(
+    phase_dict: dict,
+    phase: str,
+    func: any
+) -> any:
+    """
+    Wraps function to accumulate call count and wall time under phase
+
+    :param phase_dict: dict, phase to [count, seconds]
+    :param phase: str
+    :param func: callable
+
+    :return wrapper: callable
+    """
+    phase_dict.setdefault(phase, [0, 0.0])
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timea = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            phase_dict[phase][0] += 1
+            phase_dict[phase][1] += time.monotonic() - timea
+
+    return wrapper
+
+
+def bench(
+    args: argparse.Namespace
+) -> dict:
+    """
+    Runs single benchmark pass
+
+    :param args: argparse.Namespace
+
+    :return result_dict: dict
+    """
+    sim = ModemSim(
+        model='sim800',
+        baudrate=args.baud,
+        cmd_latency=args.latency,
+        attach_delay=args.attach_delay,
+        boot_delay=args.boot_delay,
+        uplink_bps=args.uplink,
+        error_rate=args.error_rate,
+        http_status=args.status,
+        seed=args.seed
+    )
+
+    # Sim800 drives PWRKEY through RPi.GPIO, simulator stands in for it
+    rpi = types.ModuleType('RPi')
+    rpi.GPIO = sim.gpio
+    sys.modules['RPi'] = rpi
+    sys.modules['RPi.GPIO'] = sim.gpio
+
+    from common import transmit
+    from common.xmit_queue import XmitQueue
+    from sim800.gprs import Sim800
+
+    phase_dict = {}
+    Sim800.http_upload_alt = staticmethod(lambda **kwargs: True)
+    for phase in ['probe', 'reset', 'session_open', 'session_send', 'session_close']:
+        setattr(Sim800, phase, timed(phase_dict, phase, getattr(Sim800, phase)))
+
+    work_dir = tempfile.mkdtemp(prefix='bench_transmit_')
+    xmit_dir = os.path.join(work_dir, 'transmit')
+    os.makedirs(xmit_dir)
+    for file_num in range(args.files):
+        file_url = os.path.join(xmit_dir, 'bench_{0:04d}.jpg'.format(file_num))
+        with open(file=file_url, mode='wb') as bench_file:
+            bench_file.write(os.urandom(args.size))
+
+    gprs_cfg_dict = {
+        'sock': 'fast.t-mobile.com',
+        'addr': '127.0.0.1',
+        'port': 4440,
+        'port_dev': sim.slave_name,
+        'baudrate': args.baud,
+        'attempts': args.attempts,
+        'chunk_bytes': args.chunk_bytes,
+        'chunk_state_url': os.path.join(work_dir, 'chunk_state.json'),
+        'probe_deadline': args.probe_deadline,
+        'async_io': args.async_io
+    }
+
+    xmit_queue = XmitQueue(
+        queue_url=os.path.join(work_dir, 'xmit_queue.db'),
+        xmit_dir=xmit_dir,
+        priority_list=['errors', 'readings', 'images', 'logs']
+    )
+    assert xmit_queue.index_used(), 'dequeue does not use queue_order index'
+
+    def xmit_files():
+        while True:
+            file_url_local = xmit_queue.dequeue()
+            if file_url_local is None:
+                break
+            yield file_url_local, 'bench_' + os.path.basename(file_url_local)
+
+    timea = time.monotonic()
+    transmit.transmit_batch(
+        gprs_set_dict=gprs_cfg_dict,
+        file_list=xmit_files(),
+        xmit_done=xmit_queue.ack,
+        xmit_fail=xmit_queue.fail,
+        prepare=timed(phase_dict, 'prepare', xmit_queue.sync)
+    )
+    wall_time = time.monotonic() - timea
+
+    sent_count = args.files - len(os.listdir(xmit_dir))
+    xmit_queue.close()
+    sim.close()
+
+    return {
+        'files': sent_count,
+        'bytes': sent_count * args.size,
+        'wall': wall_time,
+        'phases': phase_dict,
+        'commands': sim.cmd_count,
+        'actions': sim.http_count
+    }
+
+
+def report(
+    result_dict: dict
+) -> str:
+    """
+    Formats benchmark result
+
+    :param result_dict: dict
+
+    :return report: str
+    """
+    wall = result_dict['wall']
+    lines = [
+        'Files sent: {0}, payload bytes: {1}, wall time: {2:.2f} sec'.format(
+            result_dict['files'],
+            result_dict['bytes'],
+            wall
+        ),
+        'Throughput: {0:.1f} files/hour, {1:.1f} bytes/sec'.format(
+            (result_dict['files'] * 3600 / wall) if wall else 0.0,
+            (result_dict['bytes'] / wall) if wall else 0.0
+        ),
+        'Modem commands: {0}, HTTP actions: {1}'.format(
+            result_dict['commands'],
+            result_dict['actions']
+        )
+    ]
+    for phase, (count, seconds) in result_dict['phases'].items():
+        lines.append(
+            '    {0:<14} {1:>4} call(s) {2:>9.3f} sec'.format(phase, count, seconds)
+        )
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Transmit benchmark against simulated SIM800')
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--size', type=int, default=20000, help='bytes per file')
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per command')
+    parser.add_argument('--attach-delay', type=float, default=2.0, help='seconds to open bearer')
+    parser.add_argument('--boot-delay', type=float, default=8.0, help='seconds from power on to SMS Ready')
+    parser.add_argument('--uplink', type=int, default=5000, help='network bytes per second')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--status', type=int, nargs='+', default=[200], help='HTTPACTION codes in turn')
+    parser.add_argument('--attempts', type=int, default=3)
+    parser.add_argument('--chunk-bytes', type=int, default=0)
+    parser.add_argument('--probe-deadline', type=float, default=2.0)
+    parser.add_argument('--async', dest='async_io', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--quiet', action='store_true', help='suppress modem trace')
+    args = parser.parse_args()
+
+    if args.quiet:
+        sys.stdout = open(os.devnull, 'w')
+    result_dict = bench(args=args)
+    sys.stdout = sys.__stdout__
+    print(report(result_dict=result_dict))
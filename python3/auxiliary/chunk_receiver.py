@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+# Reference receiver for whole-file and resumable chunked uploads
+#
+# Whole files are posted to /upload with file name in User-Agent header.
+# Chunks are posted to /upload_chunk?name=&offset=&total=[&sha256=] and
+# written into a part file at given offset.  A chunk whose offset is beyond
+# bytes already held is answered with 409 and bytes held, so sender resumes
+# from there.  The final chunk carries SHA-256 of whole file, reassembled
+# file is verified and moved into receive directory.
+#
+#     python3 chunk_receiver.py --port 4440 --dir /tmp/received
+
+import argparse
+import hashlib
+import http.server
+import logging
+import os
+import urllib.parse
+
+logfile = 'januswm-receiver'
+logger = logging.getLogger(logfile)
+
+
+class ChunkHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Handles whole-file and chunked upload posts
+    """
+    recv_dir = '.'
+
+    def reply(
+        self,
+        http_status: int,
+        message: str
+    ) -> None:
+        """
+        Sends plain text response
+
+        :param http_status: int
+        :param message: str
+        """
+        body = message.encode()
+        self.send_response(http_status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(
+        self
+    ) -> None:
+        """
+        Dispatches post by path
+        """
+        url_parts = urllib.parse.urlparse(self.path)
+        data_pkt = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if url_parts.path == '/upload':
+            file_name = os.path.basename(self.headers.get('User-Agent', 'unnamed'))
+            with open(file=os.path.join(self.recv_dir, file_name), mode='wb') as recv_file:
+                recv_file.write(data_pkt)
+            self.reply(200, 'received {0}'.format(len(data_pkt)))
+
+        elif url_parts.path == '/upload_chunk':
+            self.chunk(
+                query_dict=urllib.parse.parse_qs(url_parts.query),
+                data_pkt=data_pkt
+            )
+
+        else:
+            self.reply(404, 'unknown path')
+
+    def chunk(
+        self,
+        query_dict: dict,
+        data_pkt: bytes
+    ) -> None:
+        """
+        Writes chunk into part file and completes file on final chunk
+
+        :param query_dict: dict
+        :param data_pkt: bytes
+        """
+        try:
+            file_name = os.path.basename(query_dict['name'][0])
+            offset = int(query_dict['offset'][0])
+            total = int(query_dict['total'][0])
+        except (KeyError, ValueError):
+            self.reply(400, 'bad chunk query')
+            return
+
+        part_dir = os.path.join(self.recv_dir, '.parts')
+        os.makedirs(part_dir, exist_ok=True)
+        part_url = os.path.join(part_dir, file_name)
+
+        part_size = os.path.getsize(part_url) if os.path.isfile(part_url) else 0
+        if offset > part_size:
+            self.reply(409, str(part_size))
+            return
+
+        # Re-sent ranges overwrite what is held, anything beyond is dropped
+        with open(file=part_url, mode='r+b' if part_size else 'wb') as part_file:
+            part_file.seek(offset)
+            part_file.write(data_pkt)
+            part_file.truncate()
+        part_size = offset + len(data_pkt)
+        logger.info('%s: %d of %d bytes', file_name, part_size, total)
+
+        if part_size < total:
+            self.reply(200, str(part_size))
+            return
+
+        sha = hashlib.sha256()
+        with open(file=part_url, mode='rb') as part_file:
+            for block in iter(lambda: part_file.read(65536), b''):
+                sha.update(block)
+
+        if ('sha256' in query_dict) and (sha.hexdigest() != query_dict['sha256'][0]):
+            os.remove(part_url)
+            self.reply(422, 'hash mismatch')
+            return
+
+        os.replace(part_url, os.path.join(self.recv_dir, file_name))
+        self.reply(200, str(part_size))
+
+
+def serve(
+    port: int,
+    recv_dir: str
+) -> http.server.HTTPServer:
+    """
+    Builds receiver server, caller runs serve_forever
+
+    :param port: int
+    :param recv_dir: str
+
+    :return server: HTTPServer
+    """
+    os.makedirs(recv_dir, exist_ok=True)
+    handler = type('BoundChunkHandler', (ChunkHandler,), {'recv_dir': recv_dir})
+
+    return http.server.HTTPServer(('', port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reference upload receiver')
+    parser.add_argument('--port', type=int, default=4440)
+    parser.add_argument('--dir', default='received')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = serve(
+        port=args.port,
+        recv_dir=args.dir
+    )
+    server.serve_forever()
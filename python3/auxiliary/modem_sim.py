@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+# Software SIM800/SIM5320 simulator behind a pseudo-terminal
+#
+# Sim800 or Sim5320 objects open simulator slave device in place of
+# /dev/ttyAMA0.  Baud rate is emulated by pacing bytes in both directions,
+# every command incurs configured latency, bearer attach and HTTP actions
+# incur their own delays, commands fail at configured error rate and
+# HTTPACTION reports configured status codes in turn.  Power is switched by
+# PWRKEY pulses through the gpio attribute, which stands in for RPi.GPIO.
+
+import logging
+import os
+import pty
+import random
+import re
+import select
+import threading
+import time
+import tty
+import types
+
+logfile = 'januswm-modemsim'
+logger = logging.getLogger(logfile)
+
+
+class ModemSim(object):
+    """
+    Pseudo-terminal modem simulator
+    """
+    def __init__(
+        self,
+        model: str = 'sim800',
+        baudrate: int = 115200,
+        cmd_latency: float = 0.02,
+        attach_delay: float = 2.0,
+        boot_delay: float = 8.0,
+        uplink_bps: int = 5000,
+        error_rate: float = 0.0,
+        http_status: any = 200,
+        powered: bool = False,
+        seed: int = None
+    ) -> None:
+        """
+        Opens pseudo-terminal and starts simulator thread
+
+        :param model: str, 'sim800' or 'sim5320'
+        :param baudrate: int, emulated serial rate
+        :param cmd_latency: float, seconds before each command response
+        :param attach_delay: float, seconds to open GPRS bearer
+        :param boot_delay: float, seconds from power on to ready messages
+        :param uplink_bps: int, emulated network uplink in bytes per second
+        :param error_rate: float, probability each command answers ERROR
+        :param http_status: int or list of int, HTTPACTION status codes in turn
+        :param powered: bool, initial power state
+        :param seed: int, random seed for error injection
+        """
+        self.model = model
+        self.baudrate = baudrate
+        self.cmd_latency = cmd_latency
+        self.attach_delay = attach_delay
+        self.boot_delay = boot_delay
+        self.uplink_bps = uplink_bps
+        self.error_rate = error_rate
+        if isinstance(http_status, int):
+            http_status = [http_status]
+        self.http_status = list(http_status)
+        self.http_count = 0
+        self.powered = powered
+        self.booted = powered
+        self.random = random.Random(seed)
+
+        self.bearer = False
+        self.http_init = False
+        self.data_remaining = 0
+        self.data_buffer = b''
+        self.http_dict = {}
+        self.uploads = []
+        self.cmd_count = 0
+        self.pwrkey = False
+        self.pwrkey_time = 0.0
+
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.slave_name = os.ttyname(self.slave)
+        self.write_lock = threading.Lock()
+        self.running = True
+        self.thread = threading.Thread(
+            target=self.run,
+            name='modem-sim',
+            daemon=True
+        )
+        self.thread.start()
+
+        # Stand-in for RPi.GPIO module, PWRKEY held high then released toggles power
+        self.gpio = types.ModuleType('RPi.GPIO')
+        self.gpio.BCM = 11
+        self.gpio.OUT = 0
+        self.gpio.setmode = lambda mode: None
+        self.gpio.setup = lambda pin, mode: None
+        self.gpio.cleanup = lambda pin=None: None
+        self.gpio.output = self.pwrkey_output
+
+    def close(
+        self
+    ) -> None:
+        """
+        Stops simulator thread and closes pseudo-terminal
+        """
+        self.running = False
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def pwrkey_output(
+        self,
+        pin: int,
+        level: bool
+    ) -> None:
+        """
+        Handles GPIO output, PWRKEY pulse of at least one second toggles power
+
+        :param pin: int
+        :param level: bool
+        """
+        if level and not self.pwrkey:
+            self.pwrkey_time = time.monotonic()
+        elif self.pwrkey and not level:
+            if (time.monotonic() - self.pwrkey_time) >= 1.0:
+                if self.powered:
+                    self.power_off()
+                else:
+                    self.power_on()
+        self.pwrkey = bool(level)
+
+    def power_on(
+        self
+    ) -> None:
+        """
+        Powers modem on, ready messages follow after boot delay
+        """
+        self.powered = True
+        self.booted = False
+        self.bearer = False
+        self.http_init = False
+
+        def boot():
+            time.sleep(self.boot_delay)
+            if self.powered:
+                self.booted = True
+                if self.model == 'sim800':
+                    self.send_lines(['RDY', '+CFUN: 1', '+CPIN: READY', 'Call Ready', 'SMS Ready'])
+                else:
+                    self.send_lines(['START', '+CPIN: READY', 'PB DONE'])
+
+        threading.Thread(target=boot, daemon=True).start()
+
+    def power_off(
+        self
+    ) -> None:
+        """
+        Powers modem off, further commands are not answered
+        """
+        self.powered = False
+        self.booted = False
+        self.bearer = False
+        self.http_init = False
+
+    def send(
+        self,
+        data: bytes
+    ) -> None:
+        """
+        Writes bytes to host paced at emulated baud rate
+
+        :param data: bytes
+        """
+        with self.write_lock:
+            time.sleep(len(data) * 10 / self.baudrate)
+            os.write(self.master, data)
+
+    def send_lines(
+        self,
+        lines: list
+    ) -> None:
+        """
+        Writes response lines to host
+
+        :param lines: list
+        """
+        self.send(b''.join(b'\r\n' + line.encode() + b'\r\n' for line in lines))
+
+    def run(
+        self
+    ) -> None:
+        """
+        Reads host bytes, collects raw upload data and answers commands
+        """
+        buffer = b''
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                break
+            time.sleep(len(data) * 10 / self.baudrate)
+
+            if not self.powered:
+                continue
+            buffer += data
+
+            while buffer:
+                if self.data_remaining > 0:
+                    take = buffer[:self.data_remaining]
+                    buffer = buffer[len(take):]
+                    self.data_buffer += take
+                    self.data_remaining -= len(take)
+                    if self.data_remaining == 0:
+                        self.send_lines(['OK'])
+                    continue
+
+                if b'\r' not in buffer:
+                    break
+                cmd_line, buffer = buffer.split(b'\r', 1)
+                cmd_line = cmd_line.decode('utf-8', errors='replace').strip()
+                if cmd_line != '':
+                    self.command(cmd_line=cmd_line)
+
+    def command(
+        self,
+        cmd_line: str
+    ) -> None:
+        """
+        Answers single AT command
+
+        :param cmd_line: str
+        """
+        self.cmd_count += 1
+        time.sleep(self.cmd_latency)
+
+        # Echo is on as after modem power up
+        self.send((cmd_line + '\r\n').encode())
+
+        if (self.error_rate > 0) and (self.random.random() < self.error_rate):
+            self.send_lines(['ERROR'])
+            return
+
+        if self.model == 'sim800':
+            self.command_sim800(cmd_line=cmd_line)
+        else:
+            self.command_sim5320(cmd_line=cmd_line)
+
+    def command_sim800(
+        self,
+        cmd_line: str
+    ) -> None:
+        """
+        Answers SIM800 AT command
+
+        :param cmd_line: str
+        """
+        if cmd_line == 'AT+CSQ':
+            self.send_lines(['+CSQ: 18,0', 'OK'])
+        # SIM and network are not ready until boot completes
+        elif cmd_line == 'AT+CPIN?':
+            self.send_lines(['+CPIN: READY', 'OK'] if self.booted else ['+CME ERROR: 14'])
+        elif cmd_line == 'AT+CREG?':
+            self.send_lines(['+CREG: 0,{0}'.format(1 if self.booted else 2), 'OK'])
+        elif cmd_line == 'AT+CGATT?':
+            self.send_lines(['+CGATT: {0}'.format(1 if self.booted else 0), 'OK'])
+        elif cmd_line == 'AT+SAPBR=1,1':
+            # Opening bearer that is already open fails, as on SIM800
+            if self.bearer:
+                self.send_lines(['ERROR'])
+            else:
+                time.sleep(self.attach_delay)
+                self.bearer = True
+                self.send_lines(['OK'])
+        elif cmd_line == 'AT+SAPBR=2,1':
+            self.send_lines(['+SAPBR: 1,{0},"10.0.0.2"'.format(1 if self.bearer else 3), 'OK'])
+        elif cmd_line == 'AT+SAPBR=0,1':
+            self.send_lines(['OK' if self.bearer else 'ERROR'])
+            self.bearer = False
+        elif cmd_line == 'AT+HTTPINIT':
+            self.send_lines(['ERROR' if self.http_init else 'OK'])
+            self.http_init = True
+        elif cmd_line == 'AT+HTTPTERM':
+            self.send_lines(['OK' if self.http_init else 'ERROR'])
+            self.http_init = False
+        elif cmd_line == 'AT+CFUN=1,1':
+            self.send_lines(['OK'])
+            self.power_on()
+        elif cmd_line.startswith('AT+HTTPPARA='):
+            match = re.match(r'AT\+HTTPPARA="(\w+)","?([^"]*)"?', cmd_line)
+            if match:
+                self.http_dict[match.group(1)] = match.group(2)
+            self.send_lines(['OK'])
+        elif cmd_line.startswith('AT+HTTPDATA='):
+            self.data_remaining = int(cmd_line.split('=')[1].split(',')[0])
+            self.data_buffer = b''
+            self.send_lines(['DOWNLOAD'])
+        elif cmd_line == 'AT+HTTPACTION=1':
+            self.send_lines(['OK'])
+            if self.bearer:
+                time.sleep(self.cmd_latency + (len(self.data_buffer) / self.uplink_bps))
+                status = self.http_status[self.http_count % len(self.http_status)]
+                self.http_count += 1
+                if status == 200:
+                    self.uploads.append(
+                        (self.http_dict.get('UA', ''), self.http_dict.get('URL', ''), len(self.data_buffer))
+                    )
+            else:
+                status = 601
+            self.send_lines(['+HTTPACTION: 1,{0},2'.format(status)])
+        elif cmd_line == 'AT+HTTPREAD':
+            # Body is byte count received, as reference receiver answers
+            http_body = str(len(self.data_buffer))
+            self.send_lines(['+HTTPREAD: {0}'.format(len(http_body)), http_body, 'OK'])
+        elif cmd_line == 'AT+CPOWD=1':
+            self.send_lines(['NORMAL POWER DOWN'])
+            self.power_off()
+        elif cmd_line.startswith('AT'):
+            self.send_lines(['OK'])
+        else:
+            self.send_lines(['ERROR'])
+
+    def command_sim5320(
+        self,
+        cmd_line: str
+    ) -> None:
+        """
+        Answers SIM5320 AT command
+
+        :param cmd_line: str
+        """
+        if cmd_line == 'AT+CHTTPSSTART':
+            time.sleep(self.attach_delay)
+            self.bearer = True
+            self.send_lines(['OK'])
+        elif cmd_line.startswith('AT+CHTTPSSEND='):
+            self.data_remaining = int(cmd_line.split('=')[1])
+            self.data_buffer = b''
+            self.send(b'\r\n>')
+        elif cmd_line.startswith('AT+CHTTPSRECV='):
+            if not self.http_dict.get('recv_event'):
+                self.http_dict['recv_event'] = True
+                self.send_lines(['OK'])
+                time.sleep(self.cmd_latency + (len(self.data_buffer) / self.uplink_bps))
+                self.uploads.append(('', '', len(self.data_buffer)))
+                self.send_lines(['+CHTTPS: RECV EVENT'])
+            else:
+                self.http_dict['recv_event'] = False
+                self.send_lines(['+CHTTPSRECV: DATA,2', 'OK', '+CHTTPSRECV: 0'])
+        elif cmd_line.startswith('AT'):
+            self.send_lines(['OK'])
+        else:
+            self.send_lines(['ERROR'])
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='SIM800/SIM5320 simulator on pseudo-terminal')
+    parser.add_argument('--model', default='sim800', choices=['sim800', 'sim5320'])
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--attach-delay', type=float, default=2.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--status', type=int, nargs='+', default=[200])
+    args = parser.parse_args()
+
+    sim = ModemSim(
+        model=args.model,
+        baudrate=args.baud,
+        cmd_latency=args.latency,
+        attach_delay=args.attach_delay,
+        error_rate=args.error_rate,
+        http_status=args.status,
+        powered=True
+    )
+    print('Simulated {0} on {1}'.format(args.model, sim.slave_name))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sim.close()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+# Batch reprocessor for images/ archive
+#
+# Re-runs reduction, perceptual hash and recognition over stored images
+# with current capture.ini settings (ROI, quality or byte budget,
+# recognition backend), optionally overridden below.  Archive is walked
+# lazily and images are fanned out to process pool sized to CPU cores, each
+# worker keeping its recognizer resident.  Reduced images go to output
+# directory, archive is never modified.  Results are appended to
+# results.csv in blocks; names already in results.csv are skipped, so
+# interrupted run resumes where it stopped.
+#
+#     cd python3 && python3 -m auxiliary.reprocess --draft-scale 2 --out /tmp/reprocess
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Results columns, first column is checkpoint key
+RESULT_FIELDS = ['image', 'error', 'quality', 'trials', 'bytes', 'dhash', 'digits', 'confidence', 'seconds']
+
+# Settings of current worker process, see worker_init()
+WORKER_DICT = {}
+
+
+def done_names(
+    results_url: str
+) -> set:
+    """
+    Reads names of images already processed from results file
+
+    :param results_url: str
+
+    :return done_set: set
+    """
+    done_set = set()
+
+    if os.path.isfile(path=results_url):
+        with open(file=results_url, mode='r', newline='') as results_file:
+            for row in csv.reader(results_file):
+                if row and (row[0] != RESULT_FIELDS[0]):
+                    done_set.add(row[0])
+
+    return done_set
+
+
+def walk(
+    img_dir: str,
+    done_set: set
+) -> iter:
+    """
+    Yields archive images not yet processed, directories are listed one
+    at a time so walk starts without reading whole archive
+
+    :param img_dir: str
+    :param done_set: set
+
+    :return img_url: str, generator
+    """
+    for dir_path, dir_names, file_names in os.walk(img_dir):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.lower().endswith(('.jpg', '.jpeg')) and \
+                    (os.path.relpath(os.path.join(dir_path, file_name), img_dir) not in done_set):
+                yield os.path.join(dir_path, file_name)
+
+
+def worker_init(
+    worker_dict: dict
+) -> None:
+    """
+    Stores settings in worker process, output of library functions is
+    suppressed when quiet
+
+    :param worker_dict: dict
+    """
+    WORKER_DICT.update(worker_dict)
+    if worker_dict['quiet']:
+        sys.stdout = open(os.devnull, 'w')
+
+
+def work(
+    img_url: str
+) -> list:
+    """
+    Reduces, hashes and recognizes one archive image
+
+    :param img_url: str
+
+    :return row: list, RESULT_FIELDS values
+    """
+    from common import img_ops, recognize
+
+    timea = time.time()
+    img_name = os.path.relpath(img_url, WORKER_DICT['img_dir'])
+    dest_url = os.path.join(WORKER_DICT['out_dir'], img_name.replace(os.sep, '_'))
+
+    redx_dict = {}
+    img_redx_err = img_ops.reduce(
+        img_orig_stream=None,
+        err_xmit_url='',
+        img_orig_url=img_url,
+        img_dest_url=dest_url,
+        img_dest_qual=WORKER_DICT['quality'],
+        roi_list=WORKER_DICT['roi_list'],
+        img_dest_bytes=WORKER_DICT['bytes_max'],
+        redx_dict=redx_dict,
+        draft_scale=WORKER_DICT['draft_scale']
+    )
+
+    img_dhash = ''
+    digits = ''
+    confidence = ''
+    if not img_redx_err:
+        img_dhash = img_ops.img_hash(img_url=dest_url)
+
+        if WORKER_DICT['rcg_dict']['enable']:
+            rcg_err, read_list = recognize.recognize(
+                rcg_dict=WORKER_DICT['rcg_dict'],
+                img_list=[dest_url]
+            )
+            if not rcg_err:
+                digits = read_list[0][0]
+                confidence = '{0:.3f}'.format(read_list[0][1])
+
+    return [
+        img_name,
+        int(img_redx_err),
+        redx_dict.get('quality', ''),
+        redx_dict.get('trials', ''),
+        redx_dict.get('bytes', ''),
+        img_dhash,
+        digits,
+        confidence,
+        '{0:.3f}'.format(time.time() - timea)
+    ]
+
+
+def reprocess(
+    worker_dict: dict,
+    processes: int,
+    flush_rows: int
+) -> dict:
+    """
+    Runs archive through process pool, results are written every
+    flush_rows images and at end
+
+    :param worker_dict: dict
+    :param processes: int
+    :param flush_rows: int
+
+    :return result_dict: dict
+    """
+    os.makedirs(worker_dict['out_dir'], exist_ok=True)
+    results_url = os.path.join(worker_dict['out_dir'], 'results.csv')
+    done_set = done_names(results_url=results_url)
+
+    result_dict = {
+        'skipped': len(done_set),
+        'images': 0,
+        'errors': 0,
+        'wall': 0.0
+    }
+
+    with open(file=results_url, mode='a', newline='') as results_file:
+        results_writer = csv.writer(results_file)
+        if results_file.tell() == 0:
+            results_writer.writerow(RESULT_FIELDS)
+
+        row_list = []
+        timea = time.time()
+        with multiprocessing.Pool(
+            processes=processes,
+            initializer=worker_init,
+            initargs=(worker_dict,)
+        ) as pool:
+            for row in pool.imap_unordered(
+                work,
+                walk(
+                    img_dir=worker_dict['img_dir'],
+                    done_set=done_set
+                ),
+                chunksize=4
+            ):
+                row_list.append(row)
+                result_dict['images'] += 1
+                result_dict['errors'] += row[1]
+
+                if len(row_list) >= flush_rows:
+                    results_writer.writerows(row_list)
+                    results_file.flush()
+                    os.fsync(results_file.fileno())
+                    row_list = []
+
+                    print('{0} image(s), {1:.2f} images/sec'.format(
+                        result_dict['images'],
+                        result_dict['images'] / (time.time() - timea)
+                    ))
+
+        results_writer.writerows(row_list)
+        result_dict['wall'] = time.time() - timea
+
+    return result_dict
+
+
+if __name__ == '__main__':
+    from config.core import CoreCfg
+    from config.capture import CaptureCfg
+
+    core_cfg = CoreCfg()
+    core_path_dict = core_cfg.get(attrib='core_path_dict')
+    capture_cfg = CaptureCfg(core_cfg=core_cfg)
+    cam_cfg_dict = capture_cfg.get(attrib='cam_cfg_dict')
+
+    parser = argparse.ArgumentParser(description='Reprocess images archive with current capture settings')
+    parser.add_argument('--images', default=core_path_dict['img'], help='archive directory')
+    parser.add_argument('--out', default=os.path.join(core_cfg.base_dir, 'reprocess'), help='output directory')
+    parser.add_argument('--roi', default=None, help='left,top,right,bottom groups separated by ;')
+    parser.add_argument('--quality', type=int, default=cam_cfg_dict['quality'])
+    parser.add_argument('--bytes-max', type=int, default=cam_cfg_dict['bytes_max'])
+    parser.add_argument('--draft-scale', type=int, default=1, help='2, 4 or 8 decodes at reduced scale')
+    parser.add_argument('--no-recognize', action='store_true')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--flush', type=int, default=100, help='results written every N images')
+    parser.add_argument('--quiet', action='store_true', help='suppress per-image output')
+    args = parser.parse_args()
+
+    rcg_dict = dict(capture_cfg.get(attrib='rcg_dict'))
+    if args.no_recognize:
+        rcg_dict['enable'] = False
+
+    result_dict = reprocess(
+        worker_dict={
+            'img_dir': args.images,
+            'out_dir': args.out,
+            'roi_list': capture_cfg.get(attrib='roi_dict')['rects'] if args.roi is None
+            else CaptureCfg.roi_parse(roi_str=args.roi),
+            'quality': args.quality,
+            'bytes_max': args.bytes_max,
+            'draft_scale': args.draft_scale,
+            'rcg_dict': rcg_dict,
+            'quiet': args.quiet
+        },
+        processes=args.processes,
+        flush_rows=args.flush
+    )
+
+    print('Images: {0} processed, {1} failed, {2} already done, wall time {3:.2f} sec'.format(
+        result_dict['images'],
+        result_dict['errors'],
+        result_dict['skipped'],
+        result_dict['wall']
+    ))
+    print('Throughput: {0:.2f} images/sec on {1} process(es)'.format(
+        (result_dict['images'] / result_dict['wall']) if result_dict['wall'] else 0.0,
+        args.processes
+    ))
@@ -0,0 +1,375 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import re
+import threading
+import time
+from common.at_engine import DEFAULT_SPEC
+
+logfile = 'januswm-transmit'
+logger = logging.getLogger(logfile)
+
+
+class AsyncATEngine(object):
+    """
+    Asyncio AT transport: a reader callback on serial file descriptor splits
+    incoming bytes into lines, dispatches unsolicited result codes to
+    registered handlers and queues remaining lines for awaiting command
+    """
+    def __init__(
+        self,
+        name: str,
+        cmd_table: dict,
+        loop: asyncio.AbstractEventLoop
+    ) -> None:
+        """
+        Instantiates engine on given event loop
+
+        :param name: str, modem name for log messages
+        :param cmd_table: dict, command prefix to partial response specification
+        :param loop: asyncio.AbstractEventLoop
+        """
+        self.name = name
+        self.cmd_table = cmd_table
+        self.loop = loop
+        self.port = None
+        self.buffer = b''
+        self.lines = collections.deque()
+        self.line_event = asyncio.Event()
+        self.urc_list = []
+        self.spec_active = None
+
+        # Longest prefix first so most specific table entry wins
+        self.cmd_prefixes = sorted(
+            cmd_table.keys(),
+            key=len,
+            reverse=True
+        )
+
+    def spec(
+        self,
+        port_msg: str
+    ) -> dict:
+        """
+        Gets response specification for command, table entries override
+        default specification key by key
+
+        :param port_msg: str
+
+        :return spec: dict
+        """
+        spec = dict(DEFAULT_SPEC)
+        for prefix in self.cmd_prefixes:
+            if port_msg.startswith(prefix):
+                spec.update(self.cmd_table[prefix])
+                break
+
+        return spec
+
+    def register_urc(
+        self,
+        prefix: str,
+        handler: any
+    ) -> None:
+        """
+        Registers handler called with line for unsolicited result codes
+        starting with prefix
+
+        :param prefix: str
+        :param handler: callable
+        """
+        self.urc_list.append((prefix, handler))
+
+    async def attach(
+        self,
+        port: any
+    ) -> None:
+        """
+        Attaches opened serial port in non-blocking mode and starts reader
+
+        :param port: serial.Serial
+        """
+        self.port = port
+        self.port.timeout = 0
+        self.buffer = b''
+        self.lines.clear()
+        self.loop.add_reader(
+            self.port.fileno(),
+            self.on_readable
+        )
+
+    async def detach(
+        self
+    ) -> None:
+        """
+        Stops reader before serial port is closed
+        """
+        if self.port is not None:
+            self.loop.remove_reader(self.port.fileno())
+            self.port = None
+
+    def on_readable(
+        self
+    ) -> None:
+        """
+        Reads available bytes and demultiplexes complete lines
+        """
+        try:
+            self.buffer += self.port.read(max(1, self.port.in_waiting))
+        except Exception as exc:
+            logger.error(msg='{0} serial read failed: {1}'.format(self.name, exc))
+            return
+
+        while b'\n' in self.buffer:
+            port_line, self.buffer = self.buffer.split(b'\n', 1)
+            self.feed(port_line=port_line.decode('utf-8', errors='replace').strip())
+
+        # Prompts arrive without line ending
+        if self.buffer and (self.spec_active is not None) and self.spec_active['prompt']:
+            partial = self.buffer.decode('utf-8', errors='replace').strip()
+            if any(re.match(prompt, partial) for prompt in self.spec_active['prompt']):
+                self.buffer = b''
+                self.feed(port_line=partial)
+
+    def feed(
+        self,
+        port_line: str
+    ) -> None:
+        """
+        Dispatches unsolicited result code or queues line for command
+
+        :param port_line: str
+        """
+        if port_line == '':
+            return
+
+        # Lines the active command is waiting for are never treated as URC
+        spec = self.spec_active
+        awaited = (spec is not None) and any(
+            re.match(pattern, port_line)
+            for pattern in spec['final'] + spec['error'] + spec['prompt']
+        )
+
+        handled = False
+        if not awaited:
+            for prefix, handler in self.urc_list:
+                if port_line.startswith(prefix):
+                    logger.info(msg=port_line)
+                    handler(port_line)
+                    handled = True
+
+        if not handled:
+            self.lines.append(port_line)
+            self.line_event.set()
+
+    async def response(
+        self,
+        port_msg: str,
+        spec: dict = None,
+        data: bytes = None
+    ) -> (bool, list):
+        """
+        Writes command data, if given, and awaits response to command until
+        final result, error or deadline, lines received before call are
+        consumed first.  Specification is made active before data is
+        written on loop thread, so reader cannot run in between and final
+        line arriving at once is queued for command, not dispatched as URC.
+
+        :param port_msg: str
+        :param spec: dict, overrides table lookup
+        :param data: bytes, written to serial port once specification is active
+
+        :return port_msg_err: bool
+        :return port_lines: list, intermediate lines followed by final line
+        """
+        if spec is None:
+            spec = self.spec(port_msg=port_msg)
+        self.spec_active = spec
+        if data is not None:
+            self.port.write(data)
+
+        port_msg_err = False
+        port_lines = []
+        deadline = time.monotonic() + spec['deadline']
+
+        log = self.name + ' ' + port_msg + ' response'
+        logger.info(msg=log)
+        print(log)
+
+        while True:
+            if not self.lines:
+                self.line_event.clear()
+                try:
+                    await asyncio.wait_for(
+                        self.line_event.wait(),
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                except asyncio.TimeoutError:
+                    port_msg_err = True
+                    log = '{0} {1} response deadline of {2} sec expired.'.\
+                        format(self.name, port_msg, spec['deadline'])
+                    logger.error(msg=log)
+                    print(log)
+                    break
+                continue
+
+            port_line = self.lines.popleft()
+            logger.info(msg=port_line)
+            print(port_line)
+            port_lines.append(port_line)
+
+            if any(re.match(final, port_line) for final in spec['final'] + spec['prompt']):
+                break
+
+            if any(re.match(error, port_line) for error in spec['error']):
+                port_msg_err = True
+                break
+
+        self.spec_active = None
+
+        return port_msg_err, port_lines
+
+
+class SyncATEngine(object):
+    """
+    Synchronous facade over AsyncATEngine, event loop runs in background
+    thread so modem lines are read while caller prepares files.  Interface
+    matches common.at_engine.ATEngine.
+    """
+    def __init__(
+        self,
+        name: str,
+        cmd_table: dict
+    ) -> None:
+        """
+        Starts event loop thread and engine
+
+        :param name: str
+        :param cmd_table: dict
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever,
+            name=name + '-at',
+            daemon=True
+        )
+        self.thread.start()
+
+        async def build():
+            return AsyncATEngine(
+                name=name,
+                cmd_table=cmd_table,
+                loop=self.loop
+            )
+        self.engine = self.run(build())
+
+    def run(
+        self,
+        coro: any
+    ) -> any:
+        """
+        Runs coroutine on engine loop and waits for its result
+
+        :param coro: coroutine
+
+        :return result: any
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def attach(
+        self,
+        port: any
+    ) -> None:
+        """
+        Attaches opened serial port
+
+        :param port: serial.Serial
+        """
+        self.run(self.engine.attach(port=port))
+
+    def detach(
+        self
+    ) -> None:
+        """
+        Detaches serial port before it is closed
+        """
+        self.run(self.engine.detach())
+
+    def register_urc(
+        self,
+        prefix: str,
+        handler: any
+    ) -> None:
+        """
+        Registers unsolicited result code handler, called on loop thread
+
+        :param prefix: str
+        :param handler: callable
+        """
+        self.engine.register_urc(
+            prefix=prefix,
+            handler=handler
+        )
+
+    def spec(
+        self,
+        port_msg: str
+    ) -> dict:
+        """
+        Gets response specification for command
+
+        :param port_msg: str
+
+        :return spec: dict
+        """
+        return self.engine.spec(port_msg=port_msg)
+
+    def response(
+        self,
+        port_msg: str,
+        spec: dict = None,
+        data: bytes = None
+    ) -> (bool, list):
+        """
+        Writes command data on loop thread and waits for response to command
+
+        :param port_msg: str
+        :param spec: dict
+        :param data: bytes
+
+        :return port_msg_err: bool
+        :return port_lines: list
+        """
+        return self.run(self.engine.response(port_msg=port_msg, spec=spec, data=data))
+
+    def submit(
+        self,
+        func: any,
+        *args
+    ) -> concurrent.futures.Future:
+        """
+        Runs blocking function in loop executor alongside modem traffic
+
+        :param func: callable
+        :param args: arguments for func
+
+        :return future: concurrent.futures.Future
+        """
+        async def execute():
+            return await self.loop.run_in_executor(None, func, *args)
+
+        return asyncio.run_coroutine_threadsafe(execute(), self.loop)
+
+    def close(
+        self
+    ) -> None:
+        """
+        Stops event loop thread
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
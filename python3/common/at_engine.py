@@ -0,0 +1,272 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import concurrent.futures
+import logging
+import re
+import time
+
+logfile = 'januswm-transmit'
+logger = logging.getLogger(logfile)
+
+# Response specification used for commands without table entry: regular
+# expressions for final success lines, final error lines and prompts that
+# arrive without line ending, and wall-clock deadline in seconds
+DEFAULT_SPEC = {
+    'final': [r'OK$'],
+    'error': [r'ERROR$', r'\+CME ERROR'],
+    'prompt': [],
+    'deadline': 10
+}
+
+
+class ATEngine(object):
+    """
+    Reads AT command responses line by line until per-command final result,
+    error result, prompt or deadline, dispatching unsolicited result codes
+    to registered handlers as they arrive
+    """
+    def __init__(
+        self,
+        name: str,
+        cmd_table: dict,
+        poll_timeout: float = 0.1
+    ) -> None:
+        """
+        Instantiates engine
+
+        :param name: str, modem name for log messages
+        :param cmd_table: dict, command prefix to partial response specification
+        :param poll_timeout: float, serial read timeout, bounds deadline overshoot
+        """
+        self.name = name
+        self.cmd_table = cmd_table
+        self.poll_timeout = poll_timeout
+        self.port = None
+        self.buffer = b''
+        self.urc_list = []
+
+        # Longest prefix first so most specific table entry wins
+        self.cmd_prefixes = sorted(
+            cmd_table.keys(),
+            key=len,
+            reverse=True
+        )
+
+    def attach(
+        self,
+        port: any
+    ) -> None:
+        """
+        Attaches opened serial port, setting short read timeout
+
+        :param port: serial.Serial
+        """
+        self.port = port
+        self.port.timeout = self.poll_timeout
+        self.buffer = b''
+
+    def detach(
+        self
+    ) -> None:
+        """
+        Detaches serial port before it is closed
+        """
+        self.port = None
+        self.buffer = b''
+
+    def register_urc(
+        self,
+        prefix: str,
+        handler: any
+    ) -> None:
+        """
+        Registers handler called with line for unsolicited result codes
+        starting with prefix
+
+        :param prefix: str
+        :param handler: callable
+        """
+        self.urc_list.append((prefix, handler))
+
+    def spec(
+        self,
+        port_msg: str
+    ) -> dict:
+        """
+        Gets response specification for command, table entries override
+        default specification key by key
+
+        :param port_msg: str
+
+        :return spec: dict
+        """
+        spec = dict(DEFAULT_SPEC)
+        for prefix in self.cmd_prefixes:
+            if port_msg.startswith(prefix):
+                spec.update(self.cmd_table[prefix])
+                break
+
+        return spec
+
+    def read_line(
+        self,
+        deadline: float,
+        prompt_list: list
+    ) -> any:
+        """
+        Reads next line, or pending prompt without line ending, before
+        deadline
+
+        :param deadline: float, time.monotonic value
+        :param prompt_list: list
+
+        :return port_line: str, None on deadline
+        """
+        port_line = None
+
+        while True:
+            line_end = self.buffer.find(b'\n')
+            if line_end >= 0:
+                port_line = self.buffer[:line_end]
+                self.buffer = self.buffer[line_end + 1:]
+                break
+
+            if self.buffer and prompt_list:
+                partial = self.buffer.decode('utf-8', errors='replace').strip()
+                if any(re.match(prompt, partial) for prompt in prompt_list):
+                    port_line = self.buffer
+                    self.buffer = b''
+                    break
+
+            if time.monotonic() >= deadline:
+                break
+
+            self.buffer += self.port.read(max(1, self.port.in_waiting))
+
+        if port_line is not None:
+            port_line = port_line.decode('utf-8', errors='replace').strip()
+
+        return port_line
+
+    def dispatch(
+        self,
+        port_line: str
+    ) -> bool:
+        """
+        Passes line to matching unsolicited result code handlers
+
+        :param port_line: str
+
+        :return handled: bool
+        """
+        handled = False
+        for prefix, handler in self.urc_list:
+            if port_line.startswith(prefix):
+                handler(port_line)
+                handled = True
+
+        return handled
+
+    def response(
+        self,
+        port_msg: str,
+        spec: dict = None,
+        data: bytes = None
+    ) -> (bool, list):
+        """
+        Writes command data, if given, and reads response to command until
+        final result, error or deadline
+
+        :param port_msg: str
+        :param spec: dict, overrides table lookup
+        :param data: bytes, written to serial port before response is read
+
+        :return port_msg_err: bool
+        :return port_lines: list, intermediate lines followed by final line
+        """
+        if spec is None:
+            spec = self.spec(port_msg=port_msg)
+        if data is not None:
+            self.port.write(data)
+
+        port_msg_err = False
+        port_lines = []
+        timea = time.monotonic()
+        deadline = timea + spec['deadline']
+
+        log = self.name + ' ' + port_msg + ' response'
+        logger.info(msg=log)
+        print(log)
+
+        while True:
+            port_line = self.read_line(
+                deadline=deadline,
+                prompt_list=spec['prompt']
+            )
+
+            if port_line is None:
+                port_msg_err = True
+                log = '{0} {1} response deadline of {2} sec expired.'.\
+                    format(self.name, port_msg, spec['deadline'])
+                logger.error(msg=log)
+                print(log)
+                break
+
+            if port_line == '':
+                continue
+
+            logger.info(msg=port_line)
+            print(port_line)
+
+            if any(re.match(final, port_line) for final in spec['final'] + spec['prompt']):
+                port_lines.append(port_line)
+                break
+
+            if any(re.match(error, port_line) for error in spec['error']):
+                port_msg_err = True
+                port_lines.append(port_line)
+                break
+
+            if not self.dispatch(port_line=port_line):
+                port_lines.append(port_line)
+
+        logger.debug(
+            msg='{0} {1} response in {2:.3f} sec'.format(
+                self.name,
+                port_msg,
+                time.monotonic() - timea
+            )
+        )
+
+        return port_msg_err, port_lines
+
+    def submit(
+        self,
+        func: any,
+        *args
+    ) -> concurrent.futures.Future:
+        """
+        Runs function immediately, blocking engine has no background loop to
+        overlap it with, interface matches common.at_async.SyncATEngine
+
+        :param func: callable
+        :param args: arguments for func
+
+        :return future: concurrent.futures.Future, already complete
+        """
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+
+        return future
+
+    def close(
+        self
+    ) -> None:
+        """
+        Releases engine, nothing to stop for blocking engine
+        """
+        self.detach()
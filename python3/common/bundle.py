@@ -0,0 +1,129 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import hashlib
+import json
+import logging
+import os
+import zipfile
+
+logfile = 'januswm-transmit'
+logger = logging.getLogger(logfile)
+
+# Already compressed formats are stored as-is, everything else is deflated
+STORED_EXTS = ['.jpg', '.jpeg', '.png', '.gz', '.zip']
+
+
+def group(
+    file_url_list: list,
+    bundle_max_bytes: int
+) -> list:
+    """
+    Groups files into successive lists whose raw sizes sum to no more than
+    given maximum, a single file larger than maximum gets its own group
+
+    :param file_url_list: list
+    :param bundle_max_bytes: int
+
+    :return group_list: list
+    """
+    group_list = []
+    group_files = []
+    group_bytes = 0
+
+    for file_url in file_url_list:
+        file_bytes = os.path.getsize(file_url)
+        if group_files and ((group_bytes + file_bytes) > bundle_max_bytes):
+            group_list.append(group_files)
+            group_files = []
+            group_bytes = 0
+
+        group_files.append(file_url)
+        group_bytes += file_bytes
+
+    if group_files:
+        group_list.append(group_files)
+
+    return group_list
+
+
+def bundle(
+    file_url_list: list,
+    bundle_url: str
+) -> bool:
+    """
+    Packs given files into single zip archive with manifest of file names,
+    sizes and SHA-256 hashes.  Archive is written under temporary name and
+    renamed into place once complete.
+
+    :param file_url_list: list
+    :param bundle_url: str
+
+    :return bundle_err: bool
+    """
+    bundle_err = False
+    manifest = []
+
+    bundle_temp_url = os.path.join(
+        os.path.dirname(bundle_url),
+        '.' + os.path.basename(bundle_url) + '.tmp'
+    )
+
+    try:
+        with zipfile.ZipFile(file=bundle_temp_url, mode='w') as bundle_zip:
+            for file_url in file_url_list:
+                file_name = os.path.basename(file_url)
+                with open(file=file_url, mode='rb') as data_file:
+                    data = data_file.read()
+
+                if os.path.splitext(file_name)[1].lower() in STORED_EXTS:
+                    compress_type = zipfile.ZIP_STORED
+                else:
+                    compress_type = zipfile.ZIP_DEFLATED
+
+                bundle_zip.writestr(
+                    zinfo_or_arcname=file_name,
+                    data=data,
+                    compress_type=compress_type
+                )
+                manifest.append(
+                    {
+                        'name': file_name,
+                        'size': len(data),
+                        'sha256': hashlib.sha256(data).hexdigest()
+                    }
+                )
+
+            bundle_zip.writestr(
+                zinfo_or_arcname='manifest.json',
+                data=json.dumps(manifest),
+                compress_type=zipfile.ZIP_DEFLATED
+            )
+
+        os.rename(
+            bundle_temp_url,
+            bundle_url
+        )
+
+        log = 'Bundled {0} file(s), {1} bytes raw, into {2} of {3} bytes.'.\
+            format(
+                len(manifest),
+                sum(entry['size'] for entry in manifest),
+                bundle_url,
+                os.path.getsize(bundle_url)
+            )
+        logger.info(msg=log)
+        print(log)
+
+    except Exception as exc:
+        bundle_err = True
+        log = 'Failed to bundle files into {0}.'.format(bundle_url)
+        logger.error(msg=log)
+        logger.error(msg=exc)
+        print(log)
+        print(exc)
+
+        if os.path.isfile(path=bundle_temp_url):
+            os.remove(bundle_temp_url)
+
+    return bundle_err
@@ -3,20 +3,32 @@ __author__ = 'Larry A. Hartman'
 __company__ = 'Janus Research'
 
 import logging
-from common import img_ops, picamera
+import os
+import resource
+import time
+from common import file_ops, gate, img_ops, picamera, recognize, xmit_queue
 
 logfile = 'januswm-capture'
 logger = logging.getLogger(logfile)
 
 
 def capture(
-    capture_cfg: any
+    capture_cfg: any,
+    hw_dict: dict = None,
+    timing_dict: dict = None,
+    redx_dict: dict = None,
+    read_dict: dict = None
 ) -> bool:
     """
     Captures image, processes captured image, makes TensorFlow
     prediction, then transmits image
 
     :param capture_cfg: any
+    :param hw_dict: dict
+    :param timing_dict: dict
+    :param redx_dict: dict, receives quality, trial count and size of reduced image
+    :param read_dict: dict, receives digits and confidence if recognition is enabled,
+        dial units if dial is enabled
 
     :return: err_vals_dict['img_redx']: bool
     """
@@ -32,24 +44,368 @@ def capture(
     led_set_dict = capture_cfg.get(attrib='led_set_dict')
     cam_cfg_dict = capture_cfg.get(attrib='cam_cfg_dict')
     err_xmit_url = capture_cfg.get(attrib='err_xmit_url')
+    roi_dict = capture_cfg.get(attrib='roi_dict')
+    rcg_dict = capture_cfg.get(attrib='rcg_dict')
+    dial_dict = capture_cfg.get(attrib='dial_dict')
 
     print(img_url)
+    cpua = time.process_time()
+    timea = time.time()
     img_orig, err_vals_dict['img_orig'] = picamera.snap_shot(
         err_xmit_url=err_xmit_url,
         led_cfg_dict=led_cfg_dict,
         led_set_dict=led_set_dict,
-        cam_cfg_dict=cam_cfg_dict
+        cam_cfg_dict=cam_cfg_dict,
+        hw_dict=hw_dict
     )
+    if timing_dict is not None:
+        timing_dict['snap'] = time.time() - timea
     print('Capture error: {0}'.format(err_vals_dict['img_orig']))
 
     if not err_vals_dict['img_orig']:
+        timea = time.time()
         err_vals_dict['img_redx'] = img_ops.reduce(
             img_orig_stream=img_orig,
             err_xmit_url=err_xmit_url,
             img_orig_url=img_url,
             img_dest_url=img_url,
             img_dest_qual=cam_cfg_dict['quality'],
+            roi_list=roi_dict['rects'],
+            roi_cache_url=roi_dict['cache_url'] if roi_dict['auto'] else '',
+            img_dest_bytes=cam_cfg_dict['bytes_max'],
+            redx_dict=redx_dict,
+            luma_scale=cam_cfg_dict['luma_scale']
         )
+        if timing_dict is not None:
+            timing_dict['reduce'] = time.time() - timea
         print('Reduction error: {0}'.format(err_vals_dict['img_redx']))
 
+    # Reduced image holds only register region of interest
+    if not err_vals_dict['img_redx'] and rcg_dict['enable']:
+        timea = time.time()
+        rcg_err, read_list = recognize.recognize(
+            rcg_dict=rcg_dict,
+            img_list=[img_url]
+        )
+        if not rcg_err and (read_dict is not None):
+            read_dict['digits'], read_dict['confidence'] = read_list[0]
+        if timing_dict is not None:
+            timing_dict['recognize'] = time.time() - timea
+        if not rcg_err:
+            print('Reading: {0}, confidence {1:.3f}'.format(read_list[0][0], read_list[0][1]))
+
+    if not err_vals_dict['img_redx'] and dial_dict['enable']:
+        timea = time.time()
+        dial_err, dial_angle, dial_units = img_ops.dial_read(
+            img_url=img_url,
+            dial_dict=dial_dict,
+            cache_dir=dial_dict['cache_dir']
+        )
+        if not dial_err and (read_dict is not None):
+            read_dict['dial'] = dial_units
+        if timing_dict is not None:
+            timing_dict['dial'] = time.time() - timea
+
+    # Peak resident set size is for whole process, kB on Linux
+    log = 'Capture resource report: {0} path, CPU {1:.3f} sec, peak RSS {2} kB'.format(
+        'luma' if cam_cfg_dict['luma'] else 'jpeg',
+        time.process_time() - cpua,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    )
+    logger.info(msg=log)
+    print(log)
+
     return err_vals_dict['img_redx']
+
+
+def cycle(
+    core_cfg: any,
+    capture_cfg: any,
+    execution_minute: int,
+    hw_dict: dict = None,
+    timing_dict: dict = None
+) -> bool:
+    """
+    Executes one capture cycle for given execution minute: captures image
+    when due, places image into transmission queue when due, resets
+    single-shot frequencies and increments image sequence
+
+    :param core_cfg: any
+    :param capture_cfg: any
+    :param execution_minute: int
+    :param hw_dict: dict
+    :param timing_dict: dict
+
+    :return img_capt_err: bool
+    """
+    core_path_dict = core_cfg.get(attrib='core_path_dict')
+    cfg_url_dict = core_cfg.get(attrib='cfg_url_dict')
+
+    img_seq = capture_cfg.get(attrib='img_seq')
+    img_url = capture_cfg.get(attrib='img_url')
+    img_capt_dict = capture_cfg.get(attrib='img_capt_dict')
+
+    img_capt_err = False
+    read_dict = {}
+    if img_capt_dict['img_capt_freq'] > 0:
+        if not (execution_minute % img_capt_dict['img_capt_freq']):
+            redx_dict = {}
+            img_capt_err = capture(
+                capture_cfg=capture_cfg,
+                hw_dict=hw_dict,
+                timing_dict=timing_dict,
+                redx_dict=redx_dict,
+                read_dict=read_dict
+            )
+
+            # Readings accumulate in compact pending file until next transmission
+            if read_dict:
+                file_ops.f_request(
+                    file_cmd='file_csv_appendlist',
+                    file_name=cfg_url_dict['reads'],
+                    data_file_in=[
+                        capture_cfg.get(attrib='img_orig_dtg'),
+                        img_seq,
+                        read_dict.get('digits', ''),
+                        '{0:.3f}'.format(read_dict['confidence']) if 'digits' in read_dict else '',
+                        '{0:.3f}'.format(read_dict['dial']) if 'dial' in read_dict else ''
+                    ]
+                )
+
+            # Record encoding of each image to track per-image cellular cost, only
+            # under byte budget as fixed quality has nothing to track
+            if redx_dict and (capture_cfg.get(attrib='cam_cfg_dict')['bytes_max'] > 0):
+                file_ops.f_request(
+                    file_cmd='file_csv_appendlist',
+                    file_name=cfg_url_dict['qual'],
+                    data_file_in=[
+                        os.path.basename(img_url),
+                        redx_dict['quality'],
+                        redx_dict['trials'],
+                        redx_dict['bytes']
+                    ]
+                )
+
+    if not img_capt_err:
+        timea = time.time()
+        if img_capt_dict['img_xmit_freq'] > 0:
+            if not (execution_minute % img_capt_dict['img_xmit_freq']):
+                recognize.readings_enqueue(
+                    reads_url=cfg_url_dict['reads'],
+                    xmit_dir=core_path_dict['xmit'],
+                    xmit_name='reads_' + capture_cfg.get(attrib='img_orig_dtg') + '_' + img_seq + '.txt'
+                )
+                if os.path.isfile(path=img_url):
+                    img_change, reason, gate_state = image_gate(
+                        capture_cfg=capture_cfg,
+                        read_dict=read_dict,
+                        gate_url=cfg_url_dict['gate'],
+                        execution_minute=execution_minute
+                    )
+                    img_dhash = ''
+                    if img_change:
+                        img_change, img_dhash = change_check(
+                            img_url=img_url,
+                            hash_url=cfg_url_dict['hash'],
+                            change_thresh=img_capt_dict['change_thresh']
+                        )
+                        if not img_change:
+                            reason = 'unchanged from last queued image'
+                    # Counted once queue decision is final
+                    if gate_state is not None:
+                        image_count(
+                            capture_cfg=capture_cfg,
+                            img_url=img_url,
+                            gate_url=cfg_url_dict['gate'],
+                            gate_state=gate_state,
+                            img_send=img_change,
+                            reason=reason
+                        )
+                    # Archive image is hardlinked into queue, not written again
+                    if img_change:
+                        publish_err, xmit_url = xmit_queue.publish(
+                            file_url=img_url,
+                            xmit_dir=core_path_dict['xmit']
+                        )
+                        if not publish_err and (img_dhash != ''):
+                            file_ops.f_request(
+                                file_cmd='file_replace',
+                                file_name=cfg_url_dict['hash'],
+                                data_file_in=[img_dhash]
+                            )
+        if timing_dict is not None:
+            timing_dict['enqueue'] = time.time() - timea
+
+        if img_capt_dict['img_xmit_freq'] == 1:
+            set_err, msg = capture_cfg.set(
+                section='Capture_Settings',
+                attrib='image_xmit_freq',
+                value='0'
+            )
+
+        if img_capt_dict['img_capt_freq'] == 1:
+            set_err, msg = capture_cfg.set(
+                section='Capture_Settings',
+                attrib='image_capture_freq',
+                value='0'
+            )
+
+        # increment image sequence only after image is captured,
+        # even if there was an error
+        img_seq = str(int(img_seq) + 1)
+        file_ops.f_request(
+            file_cmd='file_replace',
+            file_name=cfg_url_dict['seq'],
+            num_bytes=7,
+            data_file_in=[img_seq]
+        )
+
+    return img_capt_err
+
+
+def image_gate(
+    capture_cfg: any,
+    read_dict: dict,
+    gate_url: str,
+    execution_minute: int
+) -> (bool, str, dict):
+    """
+    Decides whether image is queued alongside its reading, every image is
+    queued if gate is disabled.  Gate state is returned for image_count()
+    once queue decision is final.
+
+    :param capture_cfg: any
+    :param read_dict: dict
+    :param gate_url: str
+    :param execution_minute: int
+
+    :return img_send: bool
+    :return reason: str
+    :return gate_state: dict, None if gate is disabled
+    """
+    img_send = True
+    reason = 'image gate disabled'
+    gate_state = None
+    gate_dict = capture_cfg.get(attrib='gate_dict')
+
+    if gate_dict['enable'] and capture_cfg.get(attrib='rcg_dict')['enable']:
+        gate_state = gate.load(gate_url=gate_url)
+        img_send, reason = gate.check(
+            read_dict=read_dict,
+            gate_dict=gate_dict,
+            gate_state=gate_state,
+            execution_minute=execution_minute
+        )
+
+    return img_send, reason, gate_state
+
+
+def image_count(
+    capture_cfg: any,
+    img_url: str,
+    gate_url: str,
+    gate_state: dict,
+    img_send: bool,
+    reason: str
+) -> None:
+    """
+    Counts image as sent or withheld, by gate or by change check, and
+    saves gate state with bytes avoided per day
+
+    :param capture_cfg: any
+    :param img_url: str
+    :param gate_url: str
+    :param gate_state: dict
+    :param img_send: bool
+    :param reason: str
+    """
+    day = capture_cfg.get(attrib='img_orig_dtg')[:10]
+    gate.count(
+        gate_state=gate_state,
+        day=day,
+        img_send=img_send,
+        img_bytes=os.path.getsize(img_url)
+    )
+    gate.save(
+        gate_url=gate_url,
+        gate_state=gate_state
+    )
+
+    log = 'Image {0} {1}: {2}, {3} bytes avoided today.'.format(
+        img_url,
+        'queued' if img_send else 'withheld',
+        reason,
+        gate_state['days'][day]['bytes_avoided']
+    )
+    logger.info(msg=log)
+    print(log)
+
+
+def change_check(
+    img_url: str,
+    hash_url: str,
+    change_thresh: int
+) -> (bool, str):
+    """
+    Compares perceptual hash of image against hash of last queued image,
+    image is queued only if hashes differ by at least threshold bits
+
+    :param img_url: str
+    :param hash_url: str, file holding hash of last queued image
+    :param change_thresh: int, 0 = queue every image
+
+    :return img_change: bool
+    :return img_dhash: str
+    """
+    img_change = True
+    img_dhash = ''
+
+    if change_thresh > 0:
+        img_dhash = img_ops.img_hash(img_url=img_url)
+
+        ref_dhash = ''
+        if os.path.isfile(path=hash_url):
+            ref_dhash = file_ops.f_request(
+                file_cmd='data_read',
+                file_name=hash_url,
+                num_bytes=16
+            )
+
+        if (img_dhash != '') and (len(ref_dhash) == 16):
+            distance = img_ops.hash_distance(
+                img_dhash_a=img_dhash,
+                img_dhash_b=ref_dhash
+            )
+            img_change = distance >= change_thresh
+
+            if img_change:
+                log = 'Image {0} changed from last queued image, hash distance {1} >= {2}, queued.'.\
+                    format(img_url, distance, change_thresh)
+            else:
+                log = 'Image {0} unchanged from last queued image, hash distance {1} < {2}, not queued.'.\
+                    format(img_url, distance, change_thresh)
+        else:
+            log = 'Image {0} has no reference hash to compare, queued.'.format(img_url)
+
+        logger.info(msg=log)
+        print(log)
+
+    return img_change, img_dhash
+
+
+def timing_report(
+    timing_dict: dict
+) -> str:
+    """
+    Formats per-run timing dictionary as single log line, phases are
+    reported in the order they were recorded
+
+    :param timing_dict: dict
+
+    :return log: str
+    """
+    log = 'Capture timing report:'
+    for phase, phase_time in timing_dict.items():
+        log += ' {0} {1:.3f} sec,'.format(phase, phase_time)
+
+    return log.rstrip(',')
@@ -0,0 +1,283 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import hashlib
+import json
+import logging
+import os
+import urllib.parse
+
+logfile = 'januswm-transmit'
+logger = logging.getLogger(logfile)
+
+
+class ChunkState(object):
+    """
+    Acknowledged upload offsets per transmitted file name, persisted after
+    every acknowledged chunk so interrupted uploads resume where they stopped
+    """
+    def __init__(
+        self,
+        state_url: str
+    ) -> None:
+        """
+        Loads chunk state file, starting empty if missing or unreadable
+
+        :param state_url: str
+        """
+        self.state_url = state_url
+        self.state_dict = {}
+
+        if os.path.isfile(path=state_url):
+            try:
+                with open(file=state_url, mode='r', encoding='utf-8') as state_file:
+                    self.state_dict = json.load(fp=state_file)
+
+            except Exception as exc:
+                log = 'Failed to load chunk state {0}, starting uploads from zero.'.\
+                    format(state_url)
+                logger.warning(msg=log)
+                logger.warning(msg=exc)
+                print(log)
+
+    def save(
+        self
+    ) -> None:
+        """
+        Writes chunk state under temporary name, then renames into place
+        """
+        state_temp_url = self.state_url + '.tmp'
+        with open(file=state_temp_url, mode='w', encoding='utf-8') as state_file:
+            json.dump(obj=self.state_dict, fp=state_file)
+            state_file.flush()
+            os.fsync(state_file.fileno())
+        os.replace(state_temp_url, self.state_url)
+
+    def offset(
+        self,
+        file_url_xmit: str,
+        file_size: int,
+        file_hash: str
+    ) -> int:
+        """
+        Gets acknowledged offset for file, zero if file is new or changed
+
+        :param file_url_xmit: str
+        :param file_size: int
+        :param file_hash: str
+
+        :return offset: int
+        """
+        entry = self.state_dict.get(file_url_xmit)
+        if (entry is None) or (entry['size'] != file_size) or (entry['sha256'] != file_hash):
+            return 0
+
+        return entry['offset']
+
+    def update(
+        self,
+        file_url_xmit: str,
+        file_size: int,
+        file_hash: str,
+        offset: int
+    ) -> None:
+        """
+        Records acknowledged offset for file and persists state
+
+        :param file_url_xmit: str
+        :param file_size: int
+        :param file_hash: str
+        :param offset: int
+        """
+        self.state_dict[file_url_xmit] = {
+            'size': file_size,
+            'sha256': file_hash,
+            'offset': offset
+        }
+        self.save()
+
+    def remove(
+        self,
+        file_url_xmit: str
+    ) -> None:
+        """
+        Removes completed file from state and persists state
+
+        :param file_url_xmit: str
+        """
+        if self.state_dict.pop(file_url_xmit, None) is not None:
+            self.save()
+
+
+def file_hash(
+    file_url: str
+) -> str:
+    """
+    Computes SHA-256 of file without reading it whole into memory
+
+    :param file_url: str
+
+    :return hexdigest: str
+    """
+    sha = hashlib.sha256()
+    with open(file=file_url, mode='rb') as data_file:
+        for block in iter(lambda: data_file.read(65536), b''):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+def chunk_path(
+    file_url_xmit: str,
+    offset: int,
+    file_size: int,
+    file_hash: str = ''
+) -> str:
+    """
+    Builds upload path and query for single chunk, hash is sent with final
+    chunk only so receiver can verify reassembled file
+
+    :param file_url_xmit: str
+    :param offset: int
+    :param file_size: int
+    :param file_hash: str
+
+    :return url_path: str
+    """
+    query_dict = {
+        'name': file_url_xmit,
+        'offset': offset,
+        'total': file_size
+    }
+    if file_hash != '':
+        query_dict['sha256'] = file_hash
+
+    return '/upload_chunk?' + urllib.parse.urlencode(query_dict)
+
+
+def held_bytes(
+    http_body: str
+) -> int:
+    """
+    Gets bytes held by receiver from body of 409 response
+
+    :param http_body: str
+
+    :return held: int, -1 if body holds no byte count
+    """
+    try:
+        held = int(http_body.strip())
+    except (AttributeError, ValueError):
+        held = -1
+
+    return held
+
+
+def upload(
+    send_chunk: any,
+    chunk_state: ChunkState,
+    file_url_local: str,
+    file_url_xmit: str,
+    chunk_bytes: int
+) -> bool:
+    """
+    Uploads file in ranges of chunk_bytes starting from last acknowledged
+    offset, only current range is held in memory.  Receiver holding fewer
+    bytes than offset answers 409 with bytes it holds, upload resumes there.
+
+    :param send_chunk: callable taking url_path and data_pkt, returns HTTP status, 0 if none,
+        and response body
+    :param chunk_state: ChunkState
+    :param file_url_local: str
+    :param file_url_xmit: str
+    :param chunk_bytes: int
+
+    :return chunk_err: bool
+    """
+    chunk_err = False
+
+    file_size = os.path.getsize(file_url_local)
+    file_sha = file_hash(file_url=file_url_local)
+    offset = chunk_state.offset(
+        file_url_xmit=file_url_xmit,
+        file_size=file_size,
+        file_hash=file_sha
+    )
+
+    if offset > 0:
+        log = 'Resuming chunked upload of {0} at byte {1} of {2}.'.\
+            format(file_url_xmit, offset, file_size)
+        logger.info(msg=log)
+        print(log)
+
+    with open(file=file_url_local, mode='rb') as data_file:
+        data_file.seek(offset)
+
+        while (offset < file_size) or (file_size == 0):
+            data_pkt = data_file.read(chunk_bytes)
+            final = (offset + len(data_pkt)) >= file_size
+
+            url_path = chunk_path(
+                file_url_xmit=file_url_xmit,
+                offset=offset,
+                file_size=file_size,
+                file_hash=file_sha if final else ''
+            )
+            http_status, http_body = send_chunk(url_path, data_pkt)
+
+            if http_status == 409:
+                held = held_bytes(http_body=http_body)
+
+                # Receiver holds fewer bytes than acknowledged, resume from what it holds
+                if 0 <= held < offset:
+                    log = 'Receiver holds {0} of {1} bytes acknowledged for {2}, upload resumes there.'.\
+                        format(held, offset, file_url_xmit)
+                    logger.warning(msg=log)
+                    print(log)
+
+                    offset = held
+                    data_file.seek(offset)
+                    chunk_state.update(
+                        file_url_xmit=file_url_xmit,
+                        file_size=file_size,
+                        file_hash=file_sha,
+                        offset=offset
+                    )
+                    continue
+
+                chunk_err = True
+                chunk_state.remove(file_url_xmit=file_url_xmit)
+                log = 'Receiver rejected offset {0} for {1}, upload restarts from zero.'.\
+                    format(offset, file_url_xmit)
+                logger.warning(msg=log)
+                print(log)
+                break
+
+            elif http_status != 200:
+                chunk_err = True
+                log = 'Chunked upload of {0} interrupted at byte {1} of {2}.'.\
+                    format(file_url_xmit, offset, file_size)
+                logger.warning(msg=log)
+                print(log)
+                break
+
+            offset += len(data_pkt)
+            if final:
+                break
+
+            chunk_state.update(
+                file_url_xmit=file_url_xmit,
+                file_size=file_size,
+                file_hash=file_sha,
+                offset=offset
+            )
+
+    if not chunk_err:
+        chunk_state.remove(file_url_xmit=file_url_xmit)
+
+        log = 'Chunked upload of {0} complete, {1} bytes.'.\
+            format(file_url_xmit, file_size)
+        logger.info(msg=log)
+        print(log)
+
+    return chunk_err
@@ -1,59 +1,172 @@
 __author__ = 'Larry A. Hartman'
 __company__ = 'Janus Research'
 
+import atexit
+import json
 import logging
 import os.path
-from common import file_ops
-from config.core import CoreCfg
+import re
+import sys
+import threading
+from common import xmit_queue
+from datetime import datetime
 
 logfile = 'januswm'
 logger = logging.getLogger(logfile)
 
+# Error message built by callers: 'FILE: <file> FUNCTION: <function> MESSAGE: <message>'
+ERR_MSG_PATTERN = re.compile(r'^FILE: (.*?) FUNCTION: (.*?) MESSAGE: (.*)$', re.DOTALL)
+
+# Errors collected during run by error file url, then by (file, function, message)
+SPOOL = {}
+SPOOL_LOCK = threading.Lock()
+
+
+class CallSite(object):
+    """
+    File and function of calling code, formatted as error message base
+    only when error is reported
+    """
+    def __init__(
+        self,
+        code: any
+    ) -> None:
+        """
+        Holds code object of calling frame, not frame itself
+
+        :param code: code object
+        """
+        self.code = code
+
+    def __str__(
+        self
+    ) -> str:
+        """
+        Formats error message base
+
+        :return err_msg_base: str
+        """
+        return 'FILE: ' + self.code.co_filename + ' ' + \
+            'FUNCTION: ' + self.code.co_name
+
+    def __add__(
+        self,
+        other: str
+    ) -> str:
+        """
+        Formats error message base followed by other
+
+        :param other: str
+
+        :return err_msg: str
+        """
+        return str(self) + other
+
+
+def caller(
+    depth: int = 1
+) -> CallSite:
+    """
+    Gets call site of function calling caller(), at cost of single frame
+    lookup where inspect.stack() reads source of every frame in stack
+
+    :param depth: int, 1 = caller of function calling caller()
+
+    :return call_site: CallSite
+    """
+    return CallSite(code=sys._getframe(depth + 1).f_code)
+
 
 def errors(
     err_xmit_url: str,
     err_msg: str
 ) -> bool:
     """
-    Places log error entry into transmit folder for transmission
+    Records error in spool for transmission, repeats of same error only
+    update last seen time and count.  Spool is written by flush().
 
     :param err_xmit_url: str
     :param err_msg: str
 
     :return copy_err: bool
     """
-    core_cfg = CoreCfg()
-    cfg_url_dict = core_cfg.get(attrib='cfg_url_dict')
-
     copy_err = False
 
-    err_dtg = str(os.path.basename(err_xmit_url)).split('_')[1] + '_' + \
-        str(os.path.basename(err_xmit_url).split('_')[2])
-    err_msg = 'DATE-TIME: ' + err_dtg + '_' + err_msg
+    match = ERR_MSG_PATTERN.match(err_msg.strip())
+    if match is not None:
+        err_key = match.groups()
+    else:
+        err_key = ('', '', err_msg.strip())
+    err_time = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+
+    with SPOOL_LOCK:
+        err_dict = SPOOL.setdefault(err_xmit_url, {})
+        if err_key in err_dict:
+            err_dict[err_key]['last'] = err_time
+            err_dict[err_key]['count'] += 1
+        else:
+            err_dict[err_key] = {
+                'first': err_time,
+                'last': err_time,
+                'count': 1,
+                'file': err_key[0],
+                'function': err_key[1],
+                'message': err_key[2]
+            }
+
+    return copy_err
+
+
+def flush() -> bool:
+    """
+    Writes spooled errors to their error files as one JSON record per line
+    and places files into transmission directory, runs at exit
+
+    :return flush_err: bool
+    """
+    flush_err = False
+
+    with SPOOL_LOCK:
+        spool = dict(SPOOL)
+        SPOOL.clear()
 
-    if not os.path.isfile(path=err_xmit_url):
-        copy_err = file_ops.copy_file(
-            data_orig_url=cfg_url_dict['err'],
-            data_dest_url=err_xmit_url
+    for err_xmit_url, err_dict in spool.items():
+        err_part_url = os.path.join(
+            os.path.dirname(err_xmit_url),
+            '.' + os.path.basename(err_xmit_url) + '.part'
         )
+        try:
+            with open(file=err_part_url, mode='w') as err_part:
+                if os.path.isfile(path=err_xmit_url):
+                    with open(file=err_xmit_url, mode='r') as err_xmit:
+                        err_part.write(err_xmit.read())
+                for err_record in err_dict.values():
+                    err_part.write(json.dumps(err_record, separators=(',', ':')) + '\n')
 
-        if not copy_err:
-            file_ops.f_request(
-                file_cmd='file_line_write',
-                file_name=err_xmit_url,
-                data_file_in=[err_msg]
+            publish_err, err_xmit_url = xmit_queue.publish(
+                file_url=err_part_url,
+                xmit_dir=os.path.dirname(err_xmit_url),
+                xmit_name=os.path.basename(err_xmit_url),
+                move=True
             )
+            flush_err = flush_err or publish_err
 
-        else:
-            log = 'Failed to append error message to file for error transmission'
-            logger.error(log)
+            log = '{0} error record(s) of {1} error(s) written to {2}.'.format(
+                len(err_dict),
+                sum(err_record['count'] for err_record in err_dict.values()),
+                err_xmit_url
+            )
+            logger.info(msg=log)
+
+        except OSError as exc:
+            flush_err = True
+            log = 'Failed to write errors for error transmission to {0}.'.format(err_xmit_url)
+            logger.error(msg=log)
+            logger.error(msg=exc)
             print(log)
+            print(exc)
 
-    else:
-        file_ops.f_request(
-            file_cmd='file_line_append',
-            file_name=err_xmit_url,
-            data_file_in=[err_msg]
-        )
+    return flush_err
 
-    return copy_err
+
+atexit.register(flush)
@@ -0,0 +1,157 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import json
+import logging
+import os
+
+logfile = 'januswm-capture'
+logger = logging.getLogger(logfile)
+
+# Days of counters kept in gate state
+DAYS_KEPT = 31
+
+
+def load(
+    gate_url: str
+) -> dict:
+    """
+    Loads gate state: last accepted reading and per-day image counters
+
+    :param gate_url: str
+
+    :return gate_state: dict
+    """
+    gate_state = {
+        'last_reading': None,
+        'days': {}
+    }
+
+    if os.path.isfile(path=gate_url):
+        try:
+            with open(file=gate_url, mode='r') as gate_file:
+                gate_state.update(json.load(gate_file))
+
+        except (OSError, ValueError) as exc:
+            log = 'Failed to read image gate state {0}, starting anew.'.format(gate_url)
+            logger.warning(msg=log)
+            logger.warning(msg=exc)
+
+    return gate_state
+
+
+def save(
+    gate_url: str,
+    gate_state: dict
+) -> None:
+    """
+    Saves gate state through temporary file so it is never left partial
+
+    :param gate_url: str
+    :param gate_state: dict
+    """
+    days = sorted(gate_state['days'])
+    for day in days[:-DAYS_KEPT]:
+        del gate_state['days'][day]
+
+    temp_url = gate_url + '.tmp'
+    with open(file=temp_url, mode='w') as gate_file:
+        json.dump(gate_state, gate_file, indent=1, sort_keys=True)
+    os.replace(temp_url, gate_url)
+
+
+def check(
+    read_dict: dict,
+    gate_dict: dict,
+    gate_state: dict,
+    execution_minute: int
+) -> (bool, str):
+    """
+    Decides whether image must accompany reading: frame falls on periodic
+    audit, reading is missing or below confidence threshold, or reading is
+    anomalous against last accepted reading.  Reading below last reading
+    is taken as odometer rollover when counter wrapped through zero by no
+    more than delta_max, or by less than tenth of counter range if
+    delta_max is 0.  Audit frame read with confidence resets last
+    accepted reading, so anomalous reference does not persist.
+
+    :param read_dict: dict, digits and confidence, absent if recognition failed
+    :param gate_dict: dict
+    :param gate_state: dict
+    :param execution_minute: int
+
+    :return img_send: bool
+    :return reason: str
+    """
+    img_send = True
+    last_reading = gate_state['last_reading']
+
+    delta = 0
+    rollover = False
+    if ('digits' in read_dict) and (last_reading is not None):
+        modulus = 10 ** max(len(read_dict['digits']), len(last_reading))
+        delta = (int(read_dict['digits']) - int(last_reading)) % modulus
+        rollover = int(read_dict['digits']) < int(last_reading)
+        rollover_max = gate_dict['delta_max'] if (gate_dict['delta_max'] > 0) else (modulus // 10)
+        rollover = rollover and (delta <= rollover_max)
+
+    if (gate_dict['audit_freq'] > 0) and not (execution_minute % gate_dict['audit_freq']):
+        reason = 'periodic audit'
+
+    elif 'digits' not in read_dict:
+        reason = 'no reading'
+
+    elif read_dict['confidence'] < gate_dict['conf_min']:
+        reason = 'confidence {0:.3f} below {1:.3f}'.format(read_dict['confidence'], gate_dict['conf_min'])
+
+    elif (last_reading is not None) and (int(read_dict['digits']) < int(last_reading)) and not rollover:
+        reason = 'reading {0} below last reading {1}'.format(read_dict['digits'], last_reading)
+
+    elif (last_reading is not None) and (gate_dict['delta_max'] > 0) and (delta > gate_dict['delta_max']):
+        reason = 'reading {0} jumped more than {1} from last reading {2}'.\
+            format(read_dict['digits'], gate_dict['delta_max'], last_reading)
+
+    else:
+        img_send = False
+        reason = 'confidence {0:.3f}'.format(read_dict['confidence'])
+        if rollover:
+            reason += ', rollover from last reading {0}'.format(last_reading)
+
+    # Anomalous readings are not accepted as reference for next reading
+    if ('digits' in read_dict) and (read_dict['confidence'] >= gate_dict['conf_min']) and \
+            (not img_send or (reason == 'periodic audit')):
+        gate_state['last_reading'] = read_dict['digits']
+
+    return img_send, reason
+
+
+def count(
+    gate_state: dict,
+    day: str,
+    img_send: bool,
+    img_bytes: int
+) -> None:
+    """
+    Adds image to per-day counters, bytes of skipped images are bytes avoided
+
+    :param gate_state: dict
+    :param day: str, YYYY-MM-DD
+    :param img_send: bool
+    :param img_bytes: int
+    """
+    day_dict = gate_state['days'].setdefault(
+        day,
+        {
+            'images_sent': 0,
+            'images_skipped': 0,
+            'bytes_sent': 0,
+            'bytes_avoided': 0
+        }
+    )
+
+    if img_send:
+        day_dict['images_sent'] += 1
+        day_dict['bytes_sent'] += img_bytes
+    else:
+        day_dict['images_skipped'] += 1
+        day_dict['bytes_avoided'] += img_bytes
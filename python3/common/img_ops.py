@@ -1,9 +1,13 @@
 __author__ = 'Larry A. Hartman'
 __company__ = 'Janus Research'
 
-import inspect
+import hashlib
+import io
+import json
 import logging
 import os.path
+import cv2
+import numpy as np
 from common import errors
 from PIL import Image
 
@@ -11,6 +15,453 @@ from PIL import Image
 logfile = 'januswm-capture'
 logger = logging.getLogger(logfile)
 
+# Polar sampling grids by cache file, kept resident for process lifetime
+DIAL_GRIDS = {}
+
+
+def roi_locate(
+    img_orig: Image.Image,
+    roi_cache_url: str
+) -> list:
+    """
+    Gets dial region of interest from cache, or locates dial as largest
+    circle in image with OpenCV and caches its region for later captures
+
+    :param img_orig: PIL Image
+    :param roi_cache_url: str
+
+    :return roi_list: list of (left, top, right, bottom) tuples, empty if not found
+    """
+    roi_list = []
+
+    if os.path.isfile(path=roi_cache_url):
+        try:
+            with open(file=roi_cache_url, mode='r') as cache_file:
+                roi_cache = json.load(cache_file)
+            if tuple(roi_cache['size']) == img_orig.size:
+                roi_list = [tuple(rect) for rect in roi_cache['rects']]
+
+        except (OSError, ValueError, KeyError) as exc:
+            log = 'Failed to read region of interest cache {0}.'.format(roi_cache_url)
+            logger.warning(msg=log)
+            logger.warning(msg=exc)
+
+    if not roi_list:
+        # Search downscaled luma, dial is largest circle found
+        img_gray = img_orig.convert('L')
+        scale = max(1, max(img_gray.size) // 512)
+        img_gray = img_gray.resize((img_gray.width // scale, img_gray.height // scale))
+        gray = cv2.medianBlur(np.asarray(img_gray), 5)
+        circles = cv2.HoughCircles(
+            gray,
+            cv2.HOUGH_GRADIENT,
+            dp=1.5,
+            minDist=min(gray.shape) // 4,
+            param1=100,
+            param2=40,
+            minRadius=min(gray.shape) // 10,
+            maxRadius=min(gray.shape) // 2
+        )
+
+        if circles is not None:
+            x, y, r = max(circles[0], key=lambda circle: circle[2])
+            r *= 1.1
+            roi_list = [(
+                max(0, int((x - r) * scale)),
+                max(0, int((y - r) * scale)),
+                min(img_orig.width, int((x + r) * scale)),
+                min(img_orig.height, int((y + r) * scale))
+            )]
+            with open(file=roi_cache_url, mode='w') as cache_file:
+                json.dump({'size': list(img_orig.size), 'rects': roi_list}, cache_file)
+
+            log = 'OpenCV located dial region of interest {0}.'.format(roi_list[0])
+            logger.info(msg=log)
+            print(log)
+
+        else:
+            log = 'OpenCV failed to locate dial, full image retained.'
+            logger.warning(msg=log)
+            print(log)
+
+    return roi_list
+
+
+def sharpness(
+    img_data: bytes,
+    scale_size: int = 384
+) -> float:
+    """
+    Scores image sharpness as variance of Laplacian of downsampled luma,
+    JPEG is decoded directly at reduced scale
+
+    :param img_data: bytes, JPEG encoded image
+    :param scale_size: int, approximate longest side of scored luma plane
+
+    :return score: float
+    """
+    with Image.open(fp=io.BytesIO(img_data)) as img:
+        img.draft(mode='L', size=(scale_size, scale_size))
+        luma = np.asarray(img.convert('L'), dtype=np.float32)
+
+    score = float(cv2.Laplacian(luma, cv2.CV_32F).var())
+
+    return score
+
+
+def img_hash(
+    img_url: str
+) -> str:
+    """
+    Computes 64-bit difference hash of image: luma is shrunk to 9x8 and
+    each bit records whether pixel is brighter than its right neighbour
+
+    :param img_url: str
+
+    :return img_dhash: str, 16 hex digits, empty on failure
+    """
+    img_dhash = ''
+
+    try:
+        with Image.open(fp=img_url) as img:
+            img.draft(mode='L', size=(64, 64))
+            pixels = list(img.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+
+        bits = 0
+        for row in range(8):
+            for col in range(8):
+                bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+        img_dhash = '{0:016x}'.format(bits)
+
+    except Exception as exc:
+        log = 'PIL failed to hash image {0}.'.format(img_url)
+        logger.error(msg=log)
+        logger.error(msg=exc)
+        print(log)
+        print(exc)
+
+    return img_dhash
+
+
+def hash_distance(
+    img_dhash_a: str,
+    img_dhash_b: str
+) -> int:
+    """
+    Counts differing bits between two image hashes
+
+    :param img_dhash_a: str
+    :param img_dhash_b: str
+
+    :return distance: int
+    """
+    return bin(int(img_dhash_a, 16) ^ int(img_dhash_b, 16)).count('1')
+
+
+def roi_crop(
+    img_orig: Image.Image,
+    roi_list: list
+) -> Image.Image:
+    """
+    Crops regions of interest from image, several regions are stacked
+    top to bottom into single image
+
+    :param img_orig: PIL Image
+    :param roi_list: list of (left, top, right, bottom) tuples
+
+    :return img_crop: PIL Image
+    """
+    img_crops = [
+        img_orig.crop((
+            max(0, rect[0]),
+            max(0, rect[1]),
+            min(img_orig.width, rect[2]),
+            min(img_orig.height, rect[3])
+        ))
+        for rect in roi_list
+    ]
+
+    if len(img_crops) == 1:
+        img_crop = img_crops[0]
+    else:
+        img_crop = Image.new(
+            mode=img_orig.mode,
+            size=(
+                max(img.width for img in img_crops),
+                sum(img.height for img in img_crops)
+            )
+        )
+        top = 0
+        for img in img_crops:
+            img_crop.paste(img, (0, top))
+            top += img.height
+
+    return img_crop
+
+
+def luma_image(
+    luma: np.ndarray,
+    roi_list: list = None,
+    luma_scale: int = 1
+) -> Image.Image:
+    """
+    Crops regions of interest from luma plane and downscales them by
+    integer factor with block average, all on array before single
+    grayscale image is built
+
+    :param luma: np.ndarray, height x width uint8
+    :param roi_list: list of (left, top, right, bottom) tuples, None = full plane
+    :param luma_scale: int, 1 = no downscale
+
+    :return img_luma: PIL Image, mode L
+    """
+    if roi_list:
+        luma_crops = [
+            luma[max(0, rect[1]):rect[3], max(0, rect[0]):rect[2]]
+            for rect in roi_list
+        ]
+    else:
+        luma_crops = [luma]
+
+    if luma_scale > 1:
+        luma_crops = [
+            luma_crop[
+                :luma_crop.shape[0] // luma_scale * luma_scale,
+                :luma_crop.shape[1] // luma_scale * luma_scale
+            ].reshape(
+                luma_crop.shape[0] // luma_scale, luma_scale,
+                luma_crop.shape[1] // luma_scale, luma_scale
+            ).sum(axis=(1, 3), dtype=np.uint32) // (luma_scale * luma_scale)
+            for luma_crop in luma_crops
+        ]
+
+    # Several regions are stacked top to bottom as in roi_crop
+    if len(luma_crops) == 1:
+        luma_out = luma_crops[0]
+    else:
+        luma_out = np.zeros(
+            shape=(
+                sum(luma_crop.shape[0] for luma_crop in luma_crops),
+                max(luma_crop.shape[1] for luma_crop in luma_crops)
+            ),
+            dtype=np.uint8
+        )
+        top = 0
+        for luma_crop in luma_crops:
+            luma_out[top:top + luma_crop.shape[0], :luma_crop.shape[1]] = luma_crop
+            top += luma_crop.shape[0]
+
+    return Image.fromarray(np.ascontiguousarray(luma_out, dtype=np.uint8))
+
+
+def draft_open(
+    img_orig: Image.Image,
+    draft_scale: int
+) -> Image.Image:
+    """
+    Decodes JPEG at 1/2, 1/4 or 1/8 scale in DCT domain, then resizes to
+    exact scaled size if decoder could not reach it
+
+    :param img_orig: PIL Image, opened but not yet loaded
+    :param draft_scale: int
+
+    :return img_draft: PIL Image
+    """
+    draft_size = (img_orig.width // draft_scale, img_orig.height // draft_scale)
+    img_orig.draft(
+        mode=img_orig.mode,
+        size=draft_size
+    )
+    img_orig.load()
+
+    if img_orig.size != draft_size:
+        img_draft = img_orig.resize(
+            size=draft_size,
+            resample=Image.BILINEAR
+        )
+        img_orig.close()
+    else:
+        img_draft = img_orig
+
+    return img_draft
+
+
+def quality_search(
+    img_orig: Image.Image,
+    img_dest_bytes: int,
+    qual_min: int = 5,
+    qual_max: int = 95
+) -> (int, int, bytes):
+    """
+    Binary searches highest JPEG quality whose encoding fits byte budget,
+    decoded image is reused for every trial encoding.  Lowest quality is
+    returned if no quality fits.
+
+    :param img_orig: PIL Image
+    :param img_dest_bytes: int
+    :param qual_min: int
+    :param qual_max: int
+
+    :return img_dest_qual: int
+    :return trials: int
+    :return img_dest_data: bytes
+    """
+    img_dest_qual = qual_min
+    img_dest_data = None
+    trials = 0
+
+    while qual_min <= qual_max:
+        qual = (qual_min + qual_max) // 2
+        img_buffer = io.BytesIO()
+        img_orig.save(
+            fp=img_buffer,
+            format='jpeg',
+            optimize=True,
+            quality=qual
+        )
+        trials += 1
+
+        if img_buffer.tell() <= img_dest_bytes:
+            img_dest_qual = qual
+            img_dest_data = img_buffer.getvalue()
+            qual_min = qual + 1
+        else:
+            qual_max = qual - 1
+            # Lowest quality did not fit either, keep it rather than encode again
+            if qual == img_dest_qual:
+                img_dest_data = img_buffer.getvalue()
+
+    if img_dest_data is None:
+        img_buffer = io.BytesIO()
+        img_orig.save(
+            fp=img_buffer,
+            format='jpeg',
+            optimize=True,
+            quality=img_dest_qual
+        )
+        trials += 1
+        img_dest_data = img_buffer.getvalue()
+
+    return img_dest_qual, trials, img_dest_data
+
+
+def dial_grid(
+    dial_dict: dict,
+    cache_dir: str
+) -> np.ndarray:
+    """
+    Gets polar sampling grid for dial geometry: for each angle step
+    clockwise from 12 o'clock and each radius step between inner and
+    outer radius, x and y of source pixel.  Grid is computed once per
+    geometry and cached on disk as .npy named by geometry hash.
+
+    :param dial_dict: dict
+    :param cache_dir: str
+
+    :return grid: np.ndarray, 2 x angle steps x radius steps float32
+    """
+    geometry = [
+        dial_dict['centre_x'],
+        dial_dict['centre_y'],
+        dial_dict['radius_inner'],
+        dial_dict['radius_outer'],
+        dial_dict['angle_steps'],
+        dial_dict['radius_steps']
+    ]
+    geometry_hash = hashlib.sha1(json.dumps(geometry).encode()).hexdigest()[:12]
+    grid_url = os.path.join(cache_dir, 'dial_' + geometry_hash + '.npy')
+
+    grid = DIAL_GRIDS.get(grid_url)
+    if (grid is None) and os.path.isfile(path=grid_url):
+        grid = np.load(grid_url)
+        DIAL_GRIDS[grid_url] = grid
+
+    if grid is None:
+        theta = np.arange(dial_dict['angle_steps'], dtype=np.float32) * \
+            np.float32(2 * np.pi / dial_dict['angle_steps'])
+        radius = np.linspace(
+            dial_dict['radius_inner'],
+            dial_dict['radius_outer'],
+            dial_dict['radius_steps'],
+            dtype=np.float32
+        )
+        grid = np.stack([
+            dial_dict['centre_x'] + np.sin(theta)[:, np.newaxis] * radius[np.newaxis, :],
+            dial_dict['centre_y'] - np.cos(theta)[:, np.newaxis] * radius[np.newaxis, :]
+        ]).astype(np.float32)
+
+        temp_url = grid_url + '.tmp.npy'
+        np.save(temp_url, grid)
+        os.replace(temp_url, grid_url)
+        DIAL_GRIDS[grid_url] = grid
+
+        log = 'Dial polar grid computed and cached in {0}.'.format(grid_url)
+        logger.info(msg=log)
+
+    return grid
+
+
+def dial_read(
+    img_url: str,
+    dial_dict: dict,
+    cache_dir: str
+) -> (bool, float, float):
+    """
+    Estimates needle angle of analog dial in saved image: luma is resampled
+    onto polar grid in single remap, radial mean gives angular profile and
+    needle is profile extreme refined to sub-step by parabolic fit
+
+    :param img_url: str
+    :param dial_dict: dict
+    :param cache_dir: str
+
+    :return dial_err: bool
+    :return angle: float, degrees clockwise from zero mark
+    :return units: float, fractional dial units
+    """
+    dial_err = False
+    angle = 0.0
+    units = 0.0
+
+    try:
+        grid = dial_grid(
+            dial_dict=dial_dict,
+            cache_dir=cache_dir
+        )
+        with Image.open(fp=img_url) as img:
+            luma = np.asarray(img.convert('L'))
+
+        polar = cv2.remap(luma, grid[0], grid[1], cv2.INTER_LINEAR)
+
+        profile = polar.mean(axis=1, dtype=np.float32)
+        if dial_dict['needle_dark']:
+            profile = -profile
+
+        steps = len(profile)
+        peak = int(np.argmax(profile))
+        prev_val = profile[(peak - 1) % steps]
+        peak_val = profile[peak]
+        next_val = profile[(peak + 1) % steps]
+        curvature = prev_val - 2 * peak_val + next_val
+        offset = 0.5 * (prev_val - next_val) / curvature if curvature != 0 else 0.0
+
+        angle = float(((peak + offset) * 360.0 / steps - dial_dict['zero_angle']) % 360.0)
+        units = angle / 360.0 * dial_dict['units_per_rev']
+
+        log = 'Dial needle at {0:.1f} degrees, {1:.3f} units.'.format(angle, units)
+        logger.info(msg=log)
+        print(log)
+
+    except Exception as exc:
+        dial_err = True
+        log = 'Failed to read dial in image {0}.'.format(img_url)
+        logger.error(msg=log)
+        logger.error(msg=exc)
+        print(log)
+        print(exc)
+
+    return dial_err, angle, units
+
 
 def reduce(
     img_orig_stream,
@@ -18,15 +469,27 @@ def reduce(
     img_orig_url: str,
     img_dest_url: str,
     img_dest_qual: int = 100,
+    roi_list: list = None,
+    roi_cache_url: str = '',
+    img_dest_bytes: int = 0,
+    redx_dict: dict = None,
+    luma_scale: int = 1,
+    draft_scale: int = 1
 ) -> (bool, str):
     """
     Crops and saves given image
 
-    :param img_orig_stream
+    :param img_orig_stream: stream, or luma plane as np.ndarray
     :param err_xmit_url: dict
     :param img_orig_url: str
     :param img_dest_url: str
     :param img_dest_qual: int
+    :param roi_list: list of (left, top, right, bottom) tuples, None = full image
+    :param roi_cache_url: str, locate and cache dial region when no roi_list is given
+    :param img_dest_bytes: int, byte budget searched by quality, 0 = fixed img_dest_qual
+    :param redx_dict: dict, receives chosen quality, trial count and size
+    :param luma_scale: int, downscale factor applied to luma plane
+    :param draft_scale: int, 2, 4 or 8 decodes JPEG file at reduced scale, 1 = full
 
     :return img_redx_err: bool
     """
@@ -34,10 +497,34 @@ def reduce(
     img_orig = None
 
     try:
-        if img_orig_stream is not None:
+        if isinstance(img_orig_stream, np.ndarray):
+            if not roi_list and (roi_cache_url != ''):
+                roi_list = roi_locate(
+                    img_orig=Image.fromarray(img_orig_stream),
+                    roi_cache_url=roi_cache_url
+                )
+            img_orig = luma_image(
+                luma=img_orig_stream,
+                roi_list=roi_list,
+                luma_scale=luma_scale
+            )
+            roi_list = None
+            roi_cache_url = ''
+        elif img_orig_stream is not None:
             img_orig = Image.open(fp=img_orig_stream)
         elif os.path.isfile(path=img_orig_url):
             img_orig = Image.open(fp=img_orig_url)
+            if draft_scale > 1:
+                img_orig = draft_open(
+                    img_orig=img_orig,
+                    draft_scale=draft_scale
+                )
+                if roi_list:
+                    roi_list = [
+                        tuple(value // draft_scale for value in rect)
+                        for rect in roi_list
+                    ]
+                roi_cache_url = ''
         else:
             img_redx_err = True
             log = 'OS failed to locate image {0} to save.'. \
@@ -46,9 +533,7 @@ def reduce(
             print(log)
 
             if not err_xmit_url == '':
-                info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-                err_msg_base = 'FILE: ' + info.filename + ' ' + \
-                    'FUNCTION: ' + info.function
+                err_msg_base = errors.caller()
 
                 err_msg = err_msg_base + ' ' + \
                     'MESSAGE: ' + log + '\n'
@@ -58,14 +543,53 @@ def reduce(
                 )
 
         if not img_redx_err:
-            img_orig.save(
-                fp=img_dest_url,
-                format='jpeg',
-                optimize=True,
-                quality=img_dest_qual
-            )
+            if not roi_list and (roi_cache_url != ''):
+                roi_list = roi_locate(
+                    img_orig=img_orig,
+                    roi_cache_url=roi_cache_url
+                )
+
+            # Only region of interest is encoded, original is closed with it
+            if roi_list:
+                img_orig.load()
+                img_full = img_orig
+                img_orig = roi_crop(
+                    img_orig=img_full,
+                    roi_list=roi_list
+                )
+                img_full.close()
+
+            trials = 1
+            if img_dest_bytes > 0:
+                img_dest_qual, trials, img_dest_data = quality_search(
+                    img_orig=img_orig,
+                    img_dest_bytes=img_dest_bytes
+                )
+                with open(file=img_dest_url, mode='wb') as img_dest:
+                    img_dest.write(img_dest_data)
+
+                log = 'PIL chose quality {0} after {1} trial(s) for {2} byte budget: {3} bytes.'.\
+                    format(img_dest_qual, trials, img_dest_bytes, len(img_dest_data))
+                if len(img_dest_data) > img_dest_bytes:
+                    logger.warning(msg=log + ' Budget exceeded at lowest quality.')
+                else:
+                    logger.info(msg=log)
+                print(log)
+
+            else:
+                img_orig.save(
+                    fp=img_dest_url,
+                    format='jpeg',
+                    optimize=True,
+                    quality=img_dest_qual
+                )
             img_orig.close()
 
+            if redx_dict is not None:
+                redx_dict['quality'] = img_dest_qual
+                redx_dict['trials'] = trials
+                redx_dict['bytes'] = os.path.getsize(img_dest_url)
+
             log = 'PIL successfully reduced image {0}.'.\
                 format(img_dest_url)
             logger.info(msg=log)
@@ -79,9 +603,7 @@ def reduce(
         print(exc)
 
         if not err_xmit_url == '':
-            info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-            err_msg_base = 'FILE: ' + info.filename + ' ' + \
-                'FUNCTION: ' + info.function
+            err_msg_base = errors.caller()
 
             err_msg = err_msg_base + ' ' + \
                 'MESSAGE: ' + log + '\n'
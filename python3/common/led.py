@@ -1,7 +1,6 @@
 __author__ = 'Larry A. Hartman'
 __company__ = 'Janus Research'
 
-import inspect
 import logging
 import rpi_ws281x
 from common import errors
@@ -23,9 +22,6 @@ class LED(object):
         :param led_cfg_dict: dict
         """
         self.err_xmit_url = err_xmit_url
-        info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-        err_msg_base = 'FILE: ' + info.filename + ' ' + \
-            'FUNCTION: ' + info.function
 
         # Create LED object for pixels attached to given pin
         try:
@@ -54,6 +50,7 @@ class LED(object):
             print(log)
             print(exc)
 
+            err_msg_base = errors.caller()
             err_msg = err_msg_base + ' ' + \
                 'MESSAGE: ' + log + '\n'
             errors.errors(
@@ -72,10 +69,6 @@ class LED(object):
 
         :return led_on_err: bool
         """
-        info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-        err_msg_base = 'FILE: ' + info.filename + ' ' + \
-            'FUNCTION: ' + info.function
-
         led_on_err = False
 
         try:
@@ -103,6 +96,7 @@ class LED(object):
             print(log)
             print(exc)
 
+            err_msg_base = errors.caller()
             err_msg = err_msg_base + ' ' + \
                 'MESSAGE: ' + log + '\n'
             errors.errors(
@@ -120,10 +114,6 @@ class LED(object):
 
         :return led_off_err: bool
         """
-        info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-        err_msg_base = 'FILE: ' + info.filename + ' ' + \
-            'FUNCTION: ' + info.function
-
         led_off_err = False
 
         try:
@@ -146,6 +136,7 @@ class LED(object):
             print(log)
             print(exc)
 
+            err_msg_base = errors.caller()
             err_msg = err_msg_base + ' ' + \
                 'MESSAGE: ' + log + '\n'
             errors.errors(
@@ -0,0 +1,286 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import gzip
+import json
+import logging
+import os
+import re
+
+logfile = 'januswm-transmit'
+logger = logging.getLogger(logfile)
+
+# Level of log line written with verbose formatter of LogCfg
+LEVEL_PATTERN = re.compile(rb'^ \* [^*]* \* ([A-Z]+): ')
+
+# Leading bytes kept with shipped position, inode of deleted backup may be reused
+HEAD_BYTES = 64
+
+
+def load(
+    state_url: str
+) -> dict:
+    """
+    Loads shipped position of each log: inode of file last read and byte
+    offset shipped within it, with leading bytes of that file
+
+    :param state_url: str
+
+    :return ship_state: dict, log url to {'inode', 'offset', 'head'}
+    """
+    ship_state = {}
+
+    if os.path.isfile(path=state_url):
+        try:
+            with open(file=state_url, mode='r') as state_file:
+                ship_state = json.load(state_file)
+
+        except (OSError, ValueError) as exc:
+            log = 'Failed to read log shipping state {0}, shipping current logs only.'.format(state_url)
+            logger.warning(msg=log)
+            logger.warning(msg=exc)
+
+    return ship_state
+
+
+def save(
+    state_url: str,
+    ship_state: dict
+) -> None:
+    """
+    Saves shipped positions through temporary file so it is never left partial
+
+    :param state_url: str
+    :param ship_state: dict
+    """
+    temp_url = state_url + '.tmp'
+    with open(file=temp_url, mode='w') as state_file:
+        json.dump(ship_state, state_file, indent=1, sort_keys=True)
+    os.replace(temp_url, state_url)
+
+
+def segments(
+    log_url: str
+) -> list:
+    """
+    Lists log and its RotatingFileHandler backups oldest first: highest
+    numbered backup first, active log last.  Backups may be gzip-compressed,
+    <log>.1.gz and on.
+
+    :param log_url: str
+
+    :return segment_list: list of str
+    """
+    log_dir = os.path.dirname(log_url)
+    log_name = os.path.basename(log_url)
+
+    backup_list = []
+    if os.path.isdir(log_dir):
+        for file_name in os.listdir(log_dir):
+            suffix = file_name[len(log_name) + 1:]
+            if suffix.endswith('.gz'):
+                suffix = suffix[:-3]
+            if file_name.startswith(log_name + '.') and suffix.isdigit():
+                backup_list.append((int(suffix), os.path.join(log_dir, file_name)))
+
+    segment_list = [file_url for suffix, file_url in sorted(backup_list, reverse=True)]
+    if os.path.isfile(log_url):
+        segment_list.append(log_url)
+
+    return segment_list
+
+
+def log_open(
+    file_url: str
+) -> any:
+    """
+    Opens log segment for binary reading, decompressing gzip segments
+
+    :param file_url: str
+
+    :return log_file: file object
+    """
+    if file_url.endswith('.gz'):
+        log_file = gzip.open(filename=file_url, mode='rb')
+    else:
+        log_file = open(file=file_url, mode='rb')
+
+    return log_file
+
+
+def head(
+    file_url: str,
+    num_bytes: int = HEAD_BYTES
+) -> str:
+    """
+    Reads leading bytes of log, which with inode identify log file
+
+    :param file_url: str
+    :param num_bytes: int
+
+    :return head: str
+    """
+    with log_open(file_url=file_url) as head_file:
+        return head_file.read(num_bytes).decode('latin-1')
+
+
+def new_lines(
+    log_url: str,
+    log_state: dict
+) -> (bytes, dict):
+    """
+    Reads log lines written since shipped position.  Position is found by
+    inode and leading bytes, so lines rolled over into backups since last
+    run are read from backups; if that file has rotated out, all backups
+    are read.  Compressed backup is new file holding rolled over log, it is
+    found by leading bytes alone.  Partial last line of active log is left
+    for next run.
+
+    :param log_url: str
+    :param log_state: dict, {'inode', 'offset', 'head'}, None = never shipped
+
+    :return data: bytes
+    :return log_state: dict
+    """
+    segment_list = segments(log_url=log_url)
+
+    offset = 0
+    if log_state is None:
+        # First run ships active log only, not whole backlog of backups
+        start_num = max(0, len(segment_list) - 1)
+
+    else:
+        start_num = None
+        for segment_num, file_url in enumerate(segment_list):
+            if (file_url.endswith('.gz') or (os.stat(file_url).st_ino == log_state['inode'])) and \
+                    (head(file_url=file_url, num_bytes=len(log_state['head'])) == log_state['head']):
+                start_num = segment_num
+                offset = log_state['offset']
+                if not file_url.endswith('.gz') and (os.path.getsize(file_url) < offset):
+                    offset = 0
+
+        if start_num is None:
+            start_num = 0
+            log = 'Shipped position of log {0} rotated out, shipping all backups.'.format(log_url)
+            logger.warning(msg=log)
+
+    data = b''
+    new_state = log_state
+    for segment_num in range(start_num, len(segment_list)):
+        with log_open(file_url=segment_list[segment_num]) as segment_file:
+            segment_file.seek(offset if segment_num == start_num else 0)
+            segment_data = segment_file.read()
+
+        if segment_num == len(segment_list) - 1:
+            segment_data = segment_data[:segment_data.rfind(b'\n') + 1]
+            new_state = {
+                'inode': os.stat(segment_list[segment_num]).st_ino,
+                'offset': (offset if segment_num == start_num else 0) + len(segment_data),
+                'head': head(file_url=segment_list[segment_num])
+            }
+        data += segment_data
+
+    return data, new_state
+
+
+def level_filter(
+    data: bytes,
+    level_min: int
+) -> bytes:
+    """
+    Keeps log lines at or above level, continuation lines such as
+    tracebacks follow line they belong to
+
+    :param data: bytes
+    :param level_min: int
+
+    :return data: bytes
+    """
+    line_list = []
+    keep = True
+
+    for line in data.splitlines(keepends=True):
+        match = LEVEL_PATTERN.match(line)
+        if match is not None:
+            level = logging.getLevelName(match.group(1).decode())
+            keep = not isinstance(level, int) or (level >= level_min)
+        if keep:
+            line_list.append(line)
+
+    return b''.join(line_list)
+
+
+def ship(
+    log_url_list: list,
+    xmit_queue: any,
+    log_ship_dict: dict,
+    xmit_dtg: str
+) -> bool:
+    """
+    Places lines of each log not yet shipped into transmission queue, at
+    most one file per log per run, and advances shipped positions once
+    queued
+
+    :param log_url_list: list of str, active log urls
+    :param xmit_queue: XmitQueue
+    :param log_ship_dict: dict
+    :param xmit_dtg: str
+
+    :return ship_err: bool
+    """
+    ship_err = False
+    ship_state = load(state_url=log_ship_dict['state_url'])
+    level_min = logging.getLevelName(log_ship_dict['level'])
+    if not isinstance(level_min, int):
+        level_min = logging.INFO
+
+    for log_url in log_url_list:
+        try:
+            data, log_state = new_lines(
+                log_url=log_url,
+                log_state=ship_state.get(log_url)
+            )
+            raw_bytes = len(data)
+            data = level_filter(
+                data=data,
+                level_min=level_min
+            )
+
+            if data:
+                log_name = 'logs_' + xmit_dtg + '_' + os.path.basename(log_url) + '.txt'
+                if log_ship_dict['compress']:
+                    log_name += '.gz'
+                    data = gzip.compress(data)
+
+                part_url = os.path.join(xmit_queue.xmit_dir, '.' + log_name + '.part')
+                with open(file=part_url, mode='wb') as part_file:
+                    part_file.write(data)
+
+                if xmit_queue.publish(
+                    file_url=part_url,
+                    xmit_name=log_name,
+                    move=True
+                ):
+                    raise OSError('log {0} not placed into transmission queue'.format(log_name))
+
+                log = 'Log {0}: {1} new bytes shipped as {2} bytes in {3}.'.\
+                    format(log_url, raw_bytes, len(data), log_name)
+                logger.info(msg=log)
+
+            if log_state is not None:
+                ship_state[log_url] = log_state
+
+        except Exception as exc:
+            ship_err = True
+            log = 'Failed to ship log {0}.'.format(log_url)
+            logger.error(msg=log)
+            logger.error(msg=exc)
+            print(log)
+            print(exc)
+
+    save(
+        state_url=log_ship_dict['state_url'],
+        ship_state=ship_state
+    )
+
+    return ship_err
@@ -0,0 +1,185 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import hashlib
+import json
+import logging
+import numpy as np
+import os
+from PIL import Image
+
+logfile = 'januswm-capture'
+logger = logging.getLogger(logfile)
+
+# Template sizes relative to digit cell, smaller templates slide within cell
+TEMPLATE_SCALES = (0.8, 0.9, 1.0)
+
+
+def normalize(
+    patches: np.ndarray
+) -> np.ndarray:
+    """
+    Normalizes flattened patches to zero mean and unit length, so dot
+    product of two patches is their normalized cross-correlation
+
+    :param patches: np.ndarray, N x pixels
+
+    :return patches: np.ndarray, N x pixels float32
+    """
+    patches = patches.astype(np.float32)
+    patches -= patches.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(patches, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    return patches / norms
+
+
+class TemplateBank(object):
+    """
+    Digit templates at several scales, normalized and held in memory-mapped
+    .npy cache so bank is ready without decoding template images
+    """
+    def __init__(
+        self,
+        template_dir: str,
+        cell_width: int,
+        cell_height: int,
+        scales: tuple = TEMPLATE_SCALES
+    ) -> None:
+        """
+        Opens template cache, building it first if templates or cell size
+        changed.  Template images are named with digit as first character,
+        e.g. 7_a.png.
+
+        :param template_dir: str
+        :param cell_width: int
+        :param cell_height: int
+        :param scales: tuple of float, template size relative to cell
+        """
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.sizes = [
+            (max(1, int(round(cell_height * scale))), max(1, int(round(cell_width * scale))))
+            for scale in scales
+        ]
+
+        template_names = sorted(
+            file_name for file_name in os.listdir(template_dir)
+            if file_name[:1].isdigit() and
+            os.path.splitext(file_name)[1].lower() in ['.png', '.jpg', '.jpeg', '.bmp', '.pgm']
+        )
+        bank_key = json.dumps([
+            [(file_name, os.path.getmtime(os.path.join(template_dir, file_name)))
+             for file_name in template_names],
+            self.sizes
+        ])
+        cache_dir = os.path.join(template_dir, '.cache')
+        cache_base = os.path.join(cache_dir, hashlib.sha1(bank_key.encode()).hexdigest()[:12])
+
+        if not os.path.isfile(cache_base + '_labels.npy'):
+            os.makedirs(cache_dir, exist_ok=True)
+            self.build(
+                template_dir=template_dir,
+                template_names=template_names,
+                cache_base=cache_base
+            )
+
+        self.labels = np.load(cache_base + '_labels.npy')
+        self.banks = [
+            np.load(cache_base + '_s{0}.npy'.format(size_num), mmap_mode='r')
+            for size_num in range(len(self.sizes))
+        ]
+
+    def build(
+        self,
+        template_dir: str,
+        template_names: list,
+        cache_base: str
+    ) -> None:
+        """
+        Resizes and normalizes templates for each scale and writes cache,
+        labels file is written last as it marks cache complete
+
+        :param template_dir: str
+        :param template_names: list
+        :param cache_base: str
+        """
+        for size_num, (height, width) in enumerate(self.sizes):
+            bank = []
+            for file_name in template_names:
+                with Image.open(fp=os.path.join(template_dir, file_name)) as img:
+                    bank.append(np.asarray(
+                        img.convert('L').resize((width, height), Image.BILINEAR),
+                        dtype=np.float32
+                    ).ravel())
+            np.save(cache_base + '_s{0}.npy'.format(size_num), normalize(np.stack(bank)))
+
+        np.save(cache_base + '_labels.npy', np.array([int(file_name[0]) for file_name in template_names]))
+
+        log = 'Digit template cache built from {0} template(s) in {1}.'.\
+            format(len(template_names), template_dir)
+        logger.info(msg=log)
+
+    def label_scores(
+        self,
+        plane: np.ndarray,
+        digits: int
+    ) -> np.ndarray:
+        """
+        Splits register plane into equal digit cells and matches each cell
+        against all templates at all scales and positions in one product
+        per scale
+
+        :param plane: np.ndarray, cell height x (digits * cell width)
+        :param digits: int
+
+        :return label_scores: np.ndarray, digits x 10 best correlation per label
+        """
+        cells = plane[:self.cell_height, :digits * self.cell_width].\
+            reshape(self.cell_height, digits, self.cell_width).transpose(1, 0, 2)
+
+        label_scores = np.full((digits, 10), -1.0, dtype=np.float32)
+        for (height, width), bank in zip(self.sizes, self.banks):
+            # Read-only view of every window position, sliding_window_view needs numpy 1.20
+            windows = np.lib.stride_tricks.as_strided(
+                cells,
+                shape=(digits, self.cell_height - height + 1, self.cell_width - width + 1, height, width),
+                strides=cells.strides[:1] + cells.strides[1:] + cells.strides[1:],
+                writeable=False
+            )
+            positions = windows.shape[1] * windows.shape[2]
+            windows = normalize(windows.reshape(digits * positions, height * width))
+            ncc = (windows @ np.asarray(bank).T).reshape(digits, positions, -1).max(axis=1)
+
+            for label in range(10):
+                label_mask = self.labels == label
+                if label_mask.any():
+                    label_scores[:, label] = np.maximum(
+                        label_scores[:, label],
+                        ncc[:, label_mask].max(axis=1)
+                    )
+
+        return label_scores
+
+    def match(
+        self,
+        plane: np.ndarray,
+        digits: int
+    ) -> (str, list):
+        """
+        Matches digit cells of register plane, see label_scores()
+
+        :param plane: np.ndarray, cell height x (digits * cell width)
+        :param digits: int
+
+        :return read: str
+        :return scores: list of float, best correlation per digit
+        """
+        label_scores = self.label_scores(
+            plane=plane,
+            digits=digits
+        )
+        read = ''.join(str(label) for label in label_scores.argmax(axis=1))
+        scores = [float(score) for score in label_scores.max(axis=1)]
+
+        return read, scores
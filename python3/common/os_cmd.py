@@ -1,7 +1,6 @@
 __author__ = 'Larry A. Hartman'
 __company__ = 'Janus Research'
 
-import inspect
 import logging
 import subprocess
 from common import errors
@@ -57,9 +56,7 @@ def os_cmd(
         print(std_err)
 
         if not err_xmit_url == '':
-            info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-            err_msg_base = 'FILE: ' + info.filename + ' ' + \
-                           'FUNCTION: ' + info.function
+            err_msg_base = errors.caller()
             err_msg = err_msg_base + ' ' + \
                 'MESSAGE: ' + log + '\n'
             errors.errors(
@@ -79,9 +76,7 @@ def os_cmd(
         print(log)
 
         if not err_xmit_url == '':
-            info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-            err_msg_base = 'FILE: ' + info.filename + ' ' + \
-                           'FUNCTION: ' + info.function
+            err_msg_base = errors.caller()
             err_msg = err_msg_base + ' ' + \
                 'MESSAGE: ' + log + '\n'
             errors.errors(
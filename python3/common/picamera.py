@@ -1,80 +1,249 @@
 __author__ = 'Larry A. Hartman'
 __company__ = 'Janus Research'
 
-import inspect
 import logging
+import numpy as np
 import os
 import signal
-from common import errors, led, os_cmd
+from common import errors, img_ops, led, os_cmd
 from io import BytesIO
 from picamera import PiCamera
 
 
+def cam_open(
+    cam_cfg_dict: dict
+) -> PiCamera:
+    """
+    Opens and configures camera
+
+    :param cam_cfg_dict: dict
+
+    :return camera: PiCamera
+    """
+    camera = PiCamera()
+    camera.sensor_mode = cam_cfg_dict['mode']
+    camera.resolution = (cam_cfg_dict['width'], cam_cfg_dict['height'])
+    camera.shutter_speed = cam_cfg_dict['shutter']
+    camera.sharpness = cam_cfg_dict['sharpness']
+    camera.saturation = cam_cfg_dict['saturation']
+    camera.rotation = cam_cfg_dict['rotation']
+    camera.exposure_mode = cam_cfg_dict['exposure']
+
+    return camera
+
+
+def cam_close(
+    hw_dict: dict
+) -> None:
+    """
+    Closes camera and turns off LED strip held in hardware dictionary
+
+    :param hw_dict: dict
+    """
+    if hw_dict.get('camera') is not None:
+        try:
+            hw_dict['camera'].close()
+        except Exception:
+            pass
+        hw_dict['camera'] = None
+
+    if hw_dict.get('flash') is not None:
+        hw_dict['flash'].off()
+        hw_dict['flash'] = None
+
+
+def luma_capture(
+    camera: PiCamera,
+    yuv_buffer: np.ndarray = None
+) -> (np.ndarray, np.ndarray):
+    """
+    Captures unencoded YUV420 frame into preallocated buffer and returns
+    view of its luma plane, no JPEG is encoded or decoded
+
+    :param camera: PiCamera
+    :param yuv_buffer: np.ndarray, reused if its size matches resolution
+
+    :return luma: np.ndarray, height x width view into yuv_buffer
+    :return yuv_buffer: np.ndarray
+    """
+    width, height = camera.resolution
+
+    # YUV frame rows are padded to multiples of 32, frame height to multiples of 16
+    frame_width = (width + 31) // 32 * 32
+    frame_height = (height + 15) // 16 * 16
+    frame_size = frame_width * frame_height * 3 // 2
+
+    if (yuv_buffer is None) or (yuv_buffer.size != frame_size):
+        yuv_buffer = np.empty(frame_size, dtype=np.uint8)
+
+    camera.capture(
+        output=yuv_buffer,
+        format='yuv'
+    )
+    luma = yuv_buffer[:frame_width * frame_height].\
+        reshape(frame_height, frame_width)[:height, :width]
+
+    return luma, yuv_buffer
+
+
+def burst(
+    camera: PiCamera,
+    frames: int
+) -> list:
+    """
+    Captures successive frames through video port, frames are only
+    collected so LED can be turned off before they are scored
+
+    :param camera: PiCamera
+    :param frames: int
+
+    :return img_data_list: list of JPEG encoded frames
+    """
+    img_data_list = []
+    img_stream = BytesIO()
+
+    for _ in camera.capture_continuous(
+        output=img_stream,
+        format='jpeg',
+        use_video_port=True,
+        quality=100
+    ):
+        img_data_list.append(img_stream.getvalue())
+        if len(img_data_list) >= frames:
+            break
+        img_stream.seek(0)
+        img_stream.truncate()
+
+    return img_data_list
+
+
+def sharpest(
+    img_data_list: list
+) -> BytesIO:
+    """
+    Selects sharpest of burst frames
+
+    :param img_data_list: list of JPEG encoded frames
+
+    :return img_orig: stream
+    """
+    logfile = 'januswm-capture'
+    logger = logging.getLogger(logfile)
+
+    scores = [img_ops.sharpness(img_data=img_data) for img_data in img_data_list]
+    best = scores.index(max(scores))
+
+    log = 'Burst frame {0} of {1} selected, sharpness scores: {2}'.format(
+        best + 1,
+        len(scores),
+        ', '.join('{0:.1f}'.format(score) for score in scores)
+    )
+    logger.info(msg=log)
+    print(log)
+
+    return BytesIO(img_data_list[best])
+
+
 def snap_shot(
     err_xmit_url: str,
     led_cfg_dict: dict,
     led_set_dict: dict,
     cam_cfg_dict: dict,
+    hw_dict: dict = None
 ) -> (any, bool):
     """
     Captures and saves original image
 
+    If hw_dict is given, LED strip and camera are taken from and kept in
+    hw_dict between calls instead of being initialized for each capture
+
+    With cam_cfg_dict['luma'] set, img_orig is luma plane as NumPy array
+    instead of JPEG stream
+
     :param err_xmit_url: dict
     :param led_cfg_dict: dict
     :param led_set_dict: dict
     :param cam_cfg_dict: dict
+    :param hw_dict: dict
 
-    :return img_orig: stream
+    :return img_orig: stream or np.ndarray
     :return img_orig_err: bool
     """
     logfile = 'januswm-capture'
     logger = logging.getLogger(logfile)
 
-    info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-    err_msg_base = 'FILE: ' + info.filename + ' ' + \
-        'FUNCTION: ' + info.function
-
     img_orig = None
+    img_data_list = []
     img_orig_err = False
     cmd_err_count = 0
     timeout = 30
 
     # Turn flash on
-    flash = led.LED(
-        err_xmit_url=err_xmit_url,
-        led_cfg_dict=led_cfg_dict
-    )
+    if (hw_dict is not None) and (hw_dict.get('flash') is not None):
+        flash = hw_dict['flash']
+        flash.err_xmit_url = err_xmit_url
+    else:
+        flash = led.LED(
+            err_xmit_url=err_xmit_url,
+            led_cfg_dict=led_cfg_dict
+        )
+        if hw_dict is not None:
+            hw_dict['flash'] = flash
     led_on_err = flash.on(led_set_dict=led_set_dict)
 
     if not led_on_err:
         while cmd_err_count < 2:
 
             # signal.alarm(timeout)
+            camera = None
             try:
-                camera = PiCamera()
-                camera.sensor_mode = cam_cfg_dict['mode']
-                camera.resolution = (cam_cfg_dict['width'], cam_cfg_dict['height'])
-                camera.shutter_speed = cam_cfg_dict['shutter']
-                camera.sharpness = cam_cfg_dict['sharpness']
-                camera.saturation = cam_cfg_dict['saturation']
-                camera.rotation = cam_cfg_dict['rotation']
-                camera.exposure_mode = cam_cfg_dict['exposure']
-                img_orig = BytesIO()
-
-                # Quality is handled by PIL next step downstream
-                camera.capture(
-                    output=img_orig,
-                    format='jpeg',
-                    quality=100
-                )
-                img_orig.seek(0)
-
-                camera.close()
+                if (hw_dict is not None) and (hw_dict.get('camera') is not None):
+                    camera = hw_dict['camera']
+                else:
+                    camera = cam_open(cam_cfg_dict=cam_cfg_dict)
+                    if hw_dict is not None:
+                        hw_dict['camera'] = camera
+                # Quality is handled by PIL next step downstream, luma
+                # plane is encoded only once, in grayscale
+                if cam_cfg_dict['luma']:
+                    img_orig, yuv_buffer = luma_capture(
+                        camera=camera,
+                        yuv_buffer=hw_dict.get('yuv') if hw_dict is not None else None
+                    )
+                    if hw_dict is not None:
+                        hw_dict['yuv'] = yuv_buffer
+                elif cam_cfg_dict['burst'] > 1:
+                    img_data_list = burst(
+                        camera=camera,
+                        frames=cam_cfg_dict['burst']
+                    )
+                else:
+                    img_orig = BytesIO()
+                    camera.capture(
+                        output=img_orig,
+                        format='jpeg',
+                        quality=100
+                    )
+                    img_orig.seek(0)
+
+                if hw_dict is None:
+                    camera.close()
+                img_orig_err = False
                 break
 
             except Exception as exc:
                 img_orig_err = True
                 cmd_err_count += 1
+
+                # Drop camera so that next attempt starts from a fresh instance
+                if camera is not None:
+                    try:
+                        camera.close()
+                    except Exception:
+                        pass
+                if hw_dict is not None:
+                    hw_dict['camera'] = None
+
                 log = 'Timeout took place at {0} seconds'. \
                     format(timeout)
                 logger.error(msg=exc)
@@ -82,6 +251,7 @@ def snap_shot(
                 print(exc)
                 print(log)
 
+                err_msg_base = errors.caller()
                 err_msg = err_msg_base + ' ' + \
                     'MESSAGE: ' + log + '\n'
                 errors.errors(
@@ -95,6 +265,7 @@ def snap_shot(
         log = 'LED flash failed to fire, no image captured.'
         logger.error(msg=log)
 
+        err_msg_base = errors.caller()
         err_msg = err_msg_base + ' ' + \
             'MESSAGE: ' + log + '\n'
         errors.errors(
@@ -105,6 +276,10 @@ def snap_shot(
     # Turn flash off
     flash.off()
 
+    # Burst frames are scored only after flash is off
+    if img_data_list and not img_orig_err:
+        img_orig = sharpest(img_data_list=img_data_list)
+
     return img_orig, img_orig_err
 
 
@@ -131,10 +306,6 @@ def video(
     logfile = 'januswm-video'
     logger = logging.getLogger(logfile)
 
-    info = inspect.getframeinfo(frame=inspect.stack()[1][0])
-    err_msg_base = 'FILE: ' + info.filename + ' ' + \
-        'FUNCTION: ' + info.function
-
     img_orig_err = False
     cmd_err_count = 0
     rstill_check = False
@@ -192,6 +363,7 @@ def video(
                             format(img_orig_url, rtn_code0)
                         logger.error(msg=log)
 
+                        err_msg_base = errors.caller()
                         err_msg = err_msg_base + ' ' +\
                             'MESSAGE: ' + log + '\n'
                         errors.errors(
@@ -207,6 +379,7 @@ def video(
                             format(img_orig_url, rtn_code0)
                         logger.error(msg=log)
 
+                        err_msg_base = errors.caller()
                         err_msg = err_msg_base + ' ' + \
                             'MESSAGE: ' + log + '\n'
                         errors.errors(
@@ -229,6 +402,7 @@ def video(
                 print(exc)
                 print(log)
 
+                err_msg_base = errors.caller()
                 err_msg = err_msg_base + ' ' + \
                     'MESSAGE: ' + log + '\n'
                 errors.errors(
@@ -269,6 +443,7 @@ def video(
                                 signal.SIGTERM
                             )
 
+                            err_msg_base = errors.caller()
                             err_msg = err_msg_base + ' ' + \
                                 'MESSAGE: ' + 'Killed raspistill process.' + '\n'
                             errors.errors(
@@ -281,6 +456,7 @@ def video(
                         logger.info(msg=log)
                         print(log)
 
+                        err_msg_base = errors.caller()
                         err_msg = err_msg_base + ' ' + \
                             'MESSAGE: ' + log + '\n'
                         errors.errors(
@@ -294,6 +470,7 @@ def video(
         log = 'LED flash failed to fire, no image captured.'
         logger.error(msg=log)
 
+        err_msg_base = errors.caller()
         err_msg = err_msg_base + ' ' + \
             'MESSAGE: ' + log + '\n'
         errors.errors(
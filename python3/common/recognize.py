@@ -0,0 +1,400 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import abc
+import logging
+import numpy as np
+import os
+from common import ocr, xmit_queue
+from PIL import Image
+
+logfile = 'januswm-capture'
+logger = logging.getLogger(logfile)
+
+# Recognizer classes by backend name, see backend()
+BACKENDS = {}
+
+# Loaded recognizers by (backend, model url), kept resident for process lifetime
+RESIDENT = {}
+
+
+def backend(
+    name: str
+) -> any:
+    """
+    Registers recognizer class under backend name
+
+    :param name: str
+
+    :return register: class decorator
+    """
+    def register(cls):
+        BACKENDS[name] = cls
+        return cls
+
+    return register
+
+
+class Recognizer(abc.ABC):
+    """
+    Turns register region of interest into digits and confidence.  Models
+    take grayscale register resized to input width and height, scaled to
+    0..1, and give one row of ten class scores per digit position.
+    Backends implement load() and infer().
+    """
+    def __init__(
+        self,
+        rcg_dict: dict
+    ) -> None:
+        """
+        Instantiates recognizer, model is loaded by load()
+
+        :param rcg_dict: dict
+        """
+        self.rcg_dict = rcg_dict
+        self.model = None
+
+    @abc.abstractmethod
+    def load(
+        self
+    ) -> None:
+        """
+        Loads model, raises on failure
+        """
+
+    def prepare(
+        self,
+        img: any
+    ) -> np.ndarray:
+        """
+        Converts image to model input plane
+
+        :param img: str url or PIL Image
+
+        :return plane: np.ndarray, height x width float32
+        """
+        if isinstance(img, str):
+            with Image.open(fp=img) as img_file:
+                img_gray = img_file.convert('L')
+        else:
+            img_gray = img.convert('L')
+
+        img_gray = img_gray.resize(
+            size=(self.rcg_dict['width'], self.rcg_dict['height']),
+            resample=Image.BILINEAR
+        )
+
+        return np.asarray(img_gray, dtype=np.float32) / 255.0
+
+    @abc.abstractmethod
+    def infer(
+        self,
+        batch: np.ndarray
+    ) -> np.ndarray:
+        """
+        Runs model over batch
+
+        :param batch: np.ndarray, N x height x width float32
+
+        :return scores: np.ndarray, N x digits x 10
+        """
+
+    def predict(
+        self,
+        img_list: list
+    ) -> list:
+        """
+        Recognizes images in batches of configured size
+
+        :param img_list: list of str url or PIL Image
+
+        :return read_list: list of (digits, confidence) tuples
+        """
+        read_list = []
+        batch_size = max(1, self.rcg_dict['batch'])
+
+        for start in range(0, len(img_list), batch_size):
+            batch = np.stack([
+                self.prepare(img=img) for img in img_list[start:start + batch_size]
+            ])
+            scores = self.infer(batch=batch).reshape(len(batch), self.rcg_dict['digits'], -1)
+            read_list.extend(decode(scores=score) for score in scores)
+
+        return read_list
+
+
+def decode(
+    scores: np.ndarray
+) -> (str, float):
+    """
+    Converts per-digit class scores into digits and confidence, confidence
+    is lowest per-digit probability
+
+    :param scores: np.ndarray, digits x classes
+
+    :return digits: str
+    :return confidence: float
+    """
+    scores = scores.astype(np.float64)
+    if not np.allclose(scores.sum(axis=1), 1.0, atol=1e-3) or (scores.min() < 0):
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        scores /= scores.sum(axis=1, keepdims=True)
+
+    digits = ''.join(str(digit) for digit in scores.argmax(axis=1))
+    confidence = float(scores.max(axis=1).min())
+
+    return digits, confidence
+
+
+@backend('opencv')
+class OpenCVRecognizer(Recognizer):
+    """
+    OpenCV DNN recognizer for ONNX, TensorFlow or Caffe models
+    """
+    def load(
+        self
+    ) -> None:
+        """
+        Loads model into OpenCV DNN on CPU
+        """
+        import cv2
+
+        self.model = cv2.dnn.readNet(self.rcg_dict['model_url'])
+        self.model.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.model.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def infer(
+        self,
+        batch: np.ndarray
+    ) -> np.ndarray:
+        """
+        Runs network over N x 1 x height x width blob
+
+        :param batch: np.ndarray
+
+        :return scores: np.ndarray
+        """
+        self.model.setInput(batch[:, np.newaxis, :, :])
+
+        return self.model.forward()
+
+
+@backend('tflite')
+class TFLiteRecognizer(Recognizer):
+    """
+    TensorFlow Lite recognizer, runtime from tflite_runtime or tensorflow
+    """
+    def load(
+        self
+    ) -> None:
+        """
+        Loads model into TensorFlow Lite interpreter
+        """
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.model = Interpreter(model_path=self.rcg_dict['model_url'])
+        self.model.allocate_tensors()
+        self.batch_size = self.model.get_input_details()[0]['shape'][0]
+
+    def infer(
+        self,
+        batch: np.ndarray
+    ) -> np.ndarray:
+        """
+        Runs interpreter over N x height x width x 1 tensor, input is
+        resized only when batch size changes
+
+        :param batch: np.ndarray
+
+        :return scores: np.ndarray
+        """
+        input_index = self.model.get_input_details()[0]['index']
+        if len(batch) != self.batch_size:
+            self.model.resize_tensor_input(
+                input_index,
+                [len(batch), self.rcg_dict['height'], self.rcg_dict['width'], 1]
+            )
+            self.model.allocate_tensors()
+            self.batch_size = len(batch)
+
+        self.model.set_tensor(input_index, batch[:, :, :, np.newaxis])
+        self.model.invoke()
+
+        return self.model.get_tensor(self.model.get_output_details()[0]['index'])
+
+
+@backend('template')
+class TemplateRecognizer(Recognizer):
+    """
+    Template-matching recognizer, model url is directory of digit templates
+    """
+    def load(
+        self
+    ) -> None:
+        """
+        Opens template bank sized to digit cells of model input
+        """
+        self.model = ocr.TemplateBank(
+            template_dir=self.rcg_dict['model_url'],
+            cell_width=self.rcg_dict['width'] // self.rcg_dict['digits'],
+            cell_height=self.rcg_dict['height']
+        )
+
+    def infer(
+        self,
+        batch: np.ndarray
+    ) -> np.ndarray:
+        """
+        Matches digit cells of each plane, scores are best correlation per
+        label, not probabilities
+
+        :param batch: np.ndarray
+
+        :return scores: np.ndarray
+        """
+        return np.stack([
+            self.model.label_scores(
+                plane=plane,
+                digits=self.rcg_dict['digits']
+            ) for plane in batch
+        ])
+
+    def predict(
+        self,
+        img_list: list
+    ) -> list:
+        """
+        Matches digit cells of each image, confidence is lowest per-digit
+        correlation
+
+        :param img_list: list of str url or PIL Image
+
+        :return read_list: list of (digits, confidence) tuples
+        """
+        read_list = []
+
+        for img in img_list:
+            digits, scores = self.model.match(
+                plane=self.prepare(img=img),
+                digits=self.rcg_dict['digits']
+            )
+            read_list.append((digits, max(0.0, min(scores))))
+
+            log = 'Template match {0}, per-digit scores: {1}'.format(
+                digits,
+                ', '.join('{0:.2f}'.format(score) for score in scores)
+            )
+            logger.info(msg=log)
+
+        return read_list
+
+
+def recognizer(
+    rcg_dict: dict
+) -> any:
+    """
+    Gets resident recognizer for configured backend and model, loading it
+    on first use
+
+    :param rcg_dict: dict
+
+    :return rcg: Recognizer, None if backend is unknown or model fails to load
+    """
+    key = (rcg_dict['backend'], rcg_dict['model_url'])
+    rcg = RESIDENT.get(key)
+
+    if rcg is None:
+        if rcg_dict['backend'] not in BACKENDS:
+            log = 'Unknown recognition backend {0}.'.format(rcg_dict['backend'])
+            logger.error(msg=log)
+            print(log)
+
+        else:
+            try:
+                rcg = BACKENDS[rcg_dict['backend']](rcg_dict=rcg_dict)
+                rcg.load()
+                RESIDENT[key] = rcg
+
+                log = 'Recognition backend {0} loaded model {1}.'.\
+                    format(rcg_dict['backend'], rcg_dict['model_url'])
+                logger.info(msg=log)
+                print(log)
+
+            except Exception as exc:
+                rcg = None
+                log = 'Recognition backend {0} failed to load model {1}.'.\
+                    format(rcg_dict['backend'], rcg_dict['model_url'])
+                logger.error(msg=log)
+                logger.error(msg=exc)
+                print(log)
+                print(exc)
+
+    return rcg
+
+
+def recognize(
+    rcg_dict: dict,
+    img_list: list
+) -> (bool, list):
+    """
+    Recognizes digits in images with resident recognizer
+
+    :param rcg_dict: dict
+    :param img_list: list of str url or PIL Image
+
+    :return rcg_err: bool
+    :return read_list: list of (digits, confidence) tuples
+    """
+    rcg_err = False
+    read_list = []
+
+    rcg = recognizer(rcg_dict=rcg_dict)
+    if rcg is None:
+        rcg_err = True
+
+    else:
+        try:
+            read_list = rcg.predict(img_list=img_list)
+
+        except Exception as exc:
+            rcg_err = True
+            log = 'Recognition failed for {0} image(s).'.format(len(img_list))
+            logger.error(msg=log)
+            logger.error(msg=exc)
+            print(log)
+            print(exc)
+
+    return rcg_err, read_list
+
+
+def readings_enqueue(
+    reads_url: str,
+    xmit_dir: str,
+    xmit_name: str
+) -> bool:
+    """
+    Moves pending readings file into transmission directory
+
+    :param reads_url: str
+    :param xmit_dir: str
+    :param xmit_name: str, name starting with 'reads_'
+
+    :return reads_err: bool
+    """
+    reads_err = False
+
+    if os.path.isfile(path=reads_url) and (os.path.getsize(reads_url) > 0):
+        reads_err, xmit_url = xmit_queue.publish(
+            file_url=reads_url,
+            xmit_dir=xmit_dir,
+            xmit_name=xmit_name,
+            move=True
+        )
+        if not reads_err:
+            log = 'Readings placed into transmission queue as {0}.'.format(xmit_name)
+            logger.info(msg=log)
+
+    return reads_err
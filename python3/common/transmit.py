@@ -4,6 +4,7 @@ __company__ = 'Janus Research'
 
 import logging
 import time
+from common import chunked
 from sim800.gprs import Sim800 as SimGPRS
 
 logfile = 'januswm-transmit'
@@ -22,43 +23,139 @@ def transmit_data(
     :param file_url_local: str
     :param file_url_xmit: str
 
+    :return: xmit_err: bool
+    """
+    xmit_err = transmit_batch(
+        gprs_set_dict=gprs_set_dict,
+        file_list=[(file_url_local, file_url_xmit)]
+    )
+
+    return xmit_err
+
+
+def transmit_batch(
+    gprs_set_dict: dict,
+    file_list: any,
+    xmit_done: any = None,
+    xmit_fail: any = None,
+    prepare: any = None
+) -> bool:
+    """
+    Transmits successive files over single Sim800 upload session, session
+    is reopened only after a failed attempt.  Sim800 is hard reset only if
+    it fails probe before session is opened.  Transmission
+    stops at first file that fails after all attempts.
+
+    :param gprs_set_dict: dict
+    :param file_list: iterable of (file_url_local, file_url_xmit) tuples
+    :param xmit_done: callable invoked with file_url_local after each success
+    :param xmit_fail: callable invoked with file_url_local and log after each failed attempt
+    :param prepare: callable run alongside modem attach, before file_list is consumed
+
     :return: xmit_err: bool
     """
     timea = time.time()
     xmit_err = False
-    ser_err = False
-    attempt = 0
+    sess_err = True
+    file_count = 0
+
+    chunk_state = chunked.ChunkState(state_url=gprs_set_dict['chunk_state_url'])
+
+    sim = SimGPRS(
+        async_io=gprs_set_dict['async_io'],
+        port_dev=gprs_set_dict['port_dev'],
+        baudrate=gprs_set_dict['baudrate']
+    )
+
+    # With asyncio engine, local preparation overlaps Sim800 reset and attach
+    if prepare is not None:
+        prep_future = sim.engine.submit(prepare)
+        sim.probe_reset(probe_deadline=gprs_set_dict['probe_deadline'])
+        sess_err, ser_err = sim.session_open(
+            gprs_set_dict=gprs_set_dict
+        )
+        try:
+            prep_future.result()
+        except Exception as exc:
+            log = 'Failed to prepare files for transmission.'
+            logger.error(msg=log)
+            logger.error(msg=exc)
+            print(log)
+            print(exc)
 
-    sim = SimGPRS()
-    for attempt in range(0, gprs_set_dict['attempts']):
-        log = 'Attempting to transmit file {0} to server.'.format(file_url_local)
-        logger.info(msg=log)
-        print(log)
+    for file_url_local, file_url_xmit in file_list:
+        timeb = time.time()
+        attempt = 0
 
-        sim.reset()
+        for attempt in range(0, gprs_set_dict['attempts']):
+            log = 'Attempting to transmit file {0} to server.'.format(file_url_local)
+            logger.info(msg=log)
+            print(log)
 
-        xmit_err, ser_err = sim.http_upload(
-            gprs_set_dict=gprs_set_dict,
-            file_url_local=file_url_local,
-            file_url_xmit=file_url_xmit
-        )
+            if sess_err:
+                sim.session_close(session_err=True)
+                sim.probe_reset(probe_deadline=gprs_set_dict['probe_deadline'])
+                sess_err, ser_err = sim.session_open(
+                    gprs_set_dict=gprs_set_dict
+                )
+
+            if not sess_err:
+                xmit_err = sim.session_send(
+                    gprs_set_dict=gprs_set_dict,
+                    file_url_local=file_url_local,
+                    file_url_xmit=file_url_xmit,
+                    chunk_state=chunk_state
+                )
+            else:
+                xmit_err = True
+
+            if xmit_err:
+                log = 'Experienced error during transmission of file {0}.'. \
+                    format(file_url_local)
+                logger.warning(msg=log)
+                print(log)
+                if xmit_fail is not None:
+                    xmit_fail(file_url_local, log)
+
+                # Session state is unknown after failure, force reset on next attempt
+                sess_err = True
+
+                with open(file=file_url_local, mode='rb') as data_file:
+                    data_pkt = data_file.read()
+                xmit_err = sim.http_upload_alt(
+                    gprs_set_dict=gprs_set_dict,
+                    data_pkt=data_pkt,
+                    content_type=sim.content_type(file_url_xmit=file_url_xmit),
+                    file_url_xmit=file_url_xmit
+                )
+
+                # Whole file was sent, partial chunked upload is no longer resumed
+                if not xmit_err:
+                    chunk_state.remove(file_url_xmit=file_url_xmit)
+
+            if not xmit_err:
+                break
 
         if xmit_err:
-            log = 'Experienced error during transmission of file {0}.'. \
+            log = 'Failed to send file {0} after {1} attempt(s).'.\
                 format(file_url_local, (attempt + 1))
-            logger.warning(msg=log)
+            logger.error(msg=log)
             print(log)
-
-        if not xmit_err and not ser_err:
             break
 
-    if xmit_err or ser_err:
-        log = 'Failed to send file {0} after {1} attempt(s).'.\
-            format(file_url_local, (attempt + 1))
-        logger.error(msg=log)
-        print(log)
+        file_count += 1
+        if xmit_done is not None:
+            xmit_done(file_url_local)
+
+        print('File transmission time elapsed: {0} sec'.format(time.time() - timeb))
 
-    print('File transmission time elapsed: {0} sec'.format(time.time() - timea))
+    sim.session_close(session_err=sess_err)
+    sim.engine.close()
+
+    log = 'Transmitted {0} file(s) in session, time elapsed: {1} sec'.\
+        format(file_count, time.time() - timea)
+    logger.info(msg=log)
+    print(log)
 
     return xmit_err
 
@@ -84,7 +181,7 @@ def update_config(
 
     sim = SimGPRS()
     for attempt in range(0, gprs_set_dict['attempts']):
-        sim.reset()
+        sim.probe_reset(probe_deadline=gprs_set_dict['probe_deadline'])
 
         xmit_err, ser_err = sim.http_updateconfig(
             gprs_set_dict=gprs_set_dict,
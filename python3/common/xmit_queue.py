@@ -0,0 +1,380 @@
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+import logging
+import os
+import shutil
+import sqlite3
+import time
+
+logfile = 'januswm-transmit'
+logger = logging.getLogger(logfile)
+
+# Next file to transmit, served by queue_order index without sorting queue
+DEQUEUE_SQL = 'SELECT file_name FROM queue ORDER BY priority ASC, enqueue_time DESC LIMIT 1'
+
+
+def file_kind(
+    file_name: str
+) -> str:
+    """
+    Determines queue kind of file from its name
+
+    :param file_name: str
+
+    :return kind: str
+    """
+    file_name = os.path.basename(file_name)
+
+    if file_name.startswith('errs_'):
+        kind = 'errors'
+    elif file_name.startswith('reads_'):
+        kind = 'readings'
+    elif file_name.startswith('logs_'):
+        kind = 'logs'
+    elif file_name.startswith('bundle_'):
+        kind = 'bundles'
+    elif os.path.splitext(file_name)[1].lower() in ['.jpg', '.jpeg']:
+        kind = 'images'
+    else:
+        kind = 'other'
+
+    return kind
+
+
+def publish(
+    file_url: str,
+    xmit_dir: str,
+    xmit_name: str = '',
+    move: bool = False
+) -> (bool, str):
+    """
+    Places file into transmission directory atomically: file is hardlinked,
+    or renamed if moved, to hidden temporary name and then renamed into
+    place, so transmission never sees partial file and bytes are not
+    rewritten.  Bytes are copied to temporary name only where link or
+    rename is not possible, e.g. across file systems.
+
+    :param file_url: str
+    :param xmit_dir: str
+    :param xmit_name: str, name in transmission directory, '' = same name
+    :param move: bool, remove file_url once placed
+
+    :return publish_err: bool
+    :return xmit_url: str
+    """
+    publish_err = False
+
+    if xmit_name == '':
+        xmit_name = os.path.basename(file_url)
+    xmit_url = os.path.join(xmit_dir, xmit_name)
+    temp_url = os.path.join(xmit_dir, '.' + xmit_name + '.tmp')
+
+    try:
+        # Rename between links of same file does nothing, file is already placed
+        if os.path.isfile(path=xmit_url) and os.path.samefile(file_url, xmit_url):
+            method = 'already placed'
+
+        else:
+            if os.path.isfile(path=temp_url):
+                os.remove(temp_url)
+
+            try:
+                if move:
+                    os.replace(file_url, temp_url)
+                else:
+                    os.link(file_url, temp_url)
+                method = 'moved' if move else 'linked'
+
+            except OSError:
+                with open(file=file_url, mode='rb') as file_orig, \
+                        open(file=temp_url, mode='wb') as file_temp:
+                    shutil.copyfileobj(file_orig, file_temp)
+                    file_temp.flush()
+                    os.fsync(file_temp.fileno())
+                if move:
+                    os.remove(file_url)
+                method = 'copied'
+
+            os.replace(temp_url, xmit_url)
+
+        log = 'File {0} {1} into transmission directory as {2}.'.\
+            format(file_url, method, xmit_name)
+        logger.info(msg=log)
+
+    except OSError as exc:
+        publish_err = True
+        log = 'Failed to place file {0} into transmission directory.'.format(file_url)
+        logger.error(msg=log)
+        logger.error(msg=exc)
+        print(log)
+        print(exc)
+
+    return publish_err, xmit_url
+
+
+class XmitQueue(object):
+    """
+    Durable index over transmission directory, files are dequeued by kind
+    priority then newest first through single index lookup
+    """
+    def __init__(
+        self,
+        queue_url: str,
+        xmit_dir: str,
+        priority_list: list
+    ) -> None:
+        """
+        Opens queue index, creating it if needed
+
+        :param queue_url: str
+        :param xmit_dir: str
+        :param priority_list: list of kinds, highest priority first
+        """
+        self.xmit_dir = xmit_dir
+        self.priority_list = priority_list
+
+        # Index may be synchronized from preparation thread while modem attaches,
+        # access is never concurrent
+        self.conn = sqlite3.connect(
+            database=queue_url,
+            check_same_thread=False
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS queue (' +
+            'file_name TEXT PRIMARY KEY, ' +
+            'kind TEXT NOT NULL, ' +
+            'priority INTEGER NOT NULL, ' +
+            'enqueue_time REAL NOT NULL, ' +
+            'size INTEGER NOT NULL, ' +
+            'attempts INTEGER NOT NULL DEFAULT 0, ' +
+            'last_error TEXT)'
+        )
+
+        # Index of earlier versions ran ascending on enqueue_time, dequeue sorted whole queue
+        index_row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'queue_order'"
+        ).fetchone()
+        if (index_row is not None) and ('DESC' not in index_row[0]):
+            self.conn.execute('DROP INDEX queue_order')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS queue_order ON queue (priority ASC, enqueue_time DESC)'
+        )
+        self.conn.commit()
+
+        if not self.index_used():
+            log = 'Transmission queue index is not used by dequeue, each dequeue sorts queue.'
+            logger.warning(msg=log)
+            print(log)
+
+    def index_used(
+        self
+    ) -> bool:
+        """
+        Checks that dequeue reads queue_order index in order rather than
+        scanning and sorting queue
+
+        :return index_used: bool
+        """
+        plan = ' '.join(
+            str(row[-1]) for row in self.conn.execute('EXPLAIN QUERY PLAN ' + DEQUEUE_SQL)
+        )
+
+        return ('queue_order' in plan) and ('TEMP B-TREE' not in plan)
+
+    def priority(
+        self,
+        kind: str
+    ) -> int:
+        """
+        Gets priority of kind, lower value is sent first, kinds not listed
+        are sent last
+
+        :param kind: str
+
+        :return priority: int
+        """
+        if kind in self.priority_list:
+            priority = self.priority_list.index(kind)
+        else:
+            priority = len(self.priority_list)
+
+        return priority
+
+    def enqueue(
+        self,
+        file_url: str,
+        enqueue_time: float = None
+    ) -> None:
+        """
+        Records file already placed in transmission directory
+
+        :param file_url: str
+        :param enqueue_time: float
+        """
+        file_name = os.path.basename(file_url)
+        kind = file_kind(file_name=file_name)
+        if enqueue_time is None:
+            enqueue_time = time.time()
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO queue (file_name, kind, priority, enqueue_time, size) ' +
+            'VALUES (?, ?, ?, ?, ?)',
+            (
+                file_name,
+                kind,
+                self.priority(kind=kind),
+                enqueue_time,
+                os.path.getsize(os.path.join(self.xmit_dir, file_name))
+            )
+        )
+        self.conn.commit()
+
+    def publish(
+        self,
+        file_url: str,
+        xmit_name: str = '',
+        move: bool = False
+    ) -> bool:
+        """
+        Places file into transmission directory through publish() and
+        records it
+
+        :param file_url: str
+        :param xmit_name: str, name in transmission directory, '' = same name
+        :param move: bool, remove file_url once placed
+
+        :return publish_err: bool
+        """
+        publish_err, xmit_url = publish(
+            file_url=file_url,
+            xmit_dir=self.xmit_dir,
+            xmit_name=xmit_name,
+            move=move
+        )
+        if not publish_err:
+            self.enqueue(file_url=xmit_url)
+
+        return publish_err
+
+    def sync(
+        self
+    ) -> None:
+        """
+        Reconciles queue index with transmission directory in single pass:
+        adds files placed without index entry, drops entries whose file is
+        gone and applies current priority order
+        """
+        dir_names = set(
+            file_name for file_name in os.listdir(self.xmit_dir)
+            if not file_name.startswith('.')
+        )
+        queue_names = set(
+            row[0] for row in self.conn.execute('SELECT file_name FROM queue')
+        )
+
+        for file_name in dir_names - queue_names:
+            file_url = os.path.join(self.xmit_dir, file_name)
+            kind = file_kind(file_name=file_name)
+            self.conn.execute(
+                'INSERT INTO queue (file_name, kind, priority, enqueue_time, size) ' +
+                'VALUES (?, ?, ?, ?, ?)',
+                (
+                    file_name,
+                    kind,
+                    self.priority(kind=kind),
+                    os.path.getctime(file_url),
+                    os.path.getsize(file_url)
+                )
+            )
+
+        self.conn.executemany(
+            'DELETE FROM queue WHERE file_name = ?',
+            [(file_name,) for file_name in queue_names - dir_names]
+        )
+
+        kinds = [row[0] for row in self.conn.execute('SELECT DISTINCT kind FROM queue')]
+        self.conn.executemany(
+            'UPDATE queue SET priority = ? WHERE kind = ?',
+            [(self.priority(kind=kind), kind) for kind in kinds]
+        )
+        self.conn.commit()
+
+        log = 'Transmission queue synchronized: {0} added, {1} dropped, {2} queued.'.\
+            format(
+                len(dir_names - queue_names),
+                len(queue_names - dir_names),
+                len(dir_names)
+            )
+        logger.info(msg=log)
+        print(log)
+
+    def dequeue(
+        self
+    ) -> any:
+        """
+        Gets highest priority file without removing it from queue, None if
+        queue is empty
+
+        :return file_url: str
+        """
+        file_url = None
+
+        while True:
+            row = self.conn.execute(DEQUEUE_SQL).fetchone()
+            if row is None:
+                break
+
+            file_url = os.path.join(self.xmit_dir, row[0])
+            if os.path.isfile(path=file_url):
+                break
+
+            # File removed outside queue, drop its entry
+            self.conn.execute('DELETE FROM queue WHERE file_name = ?', (row[0],))
+            self.conn.commit()
+            file_url = None
+
+        return file_url
+
+    def ack(
+        self,
+        file_url: str
+    ) -> None:
+        """
+        Removes successfully transmitted file and its queue entry
+
+        :param file_url: str
+        """
+        if os.path.isfile(path=file_url):
+            os.remove(file_url)
+
+        self.conn.execute(
+            'DELETE FROM queue WHERE file_name = ?',
+            (os.path.basename(file_url),)
+        )
+        self.conn.commit()
+
+    def fail(
+        self,
+        file_url: str,
+        last_error: str
+    ) -> None:
+        """
+        Records failed transmission attempt for file
+
+        :param file_url: str
+        :param last_error: str
+        """
+        self.conn.execute(
+            'UPDATE queue SET attempts = attempts + 1, last_error = ? WHERE file_name = ?',
+            (last_error, os.path.basename(file_url))
+        )
+        self.conn.commit()
+
+    def close(
+        self
+    ) -> None:
+        """
+        Closes queue index
+        """
+        self.conn.close()
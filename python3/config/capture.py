@@ -67,6 +67,18 @@ class CaptureCfg(object):
             'img_xmit_freq': self.config.getint(
                 'Capture_Settings',
                 'image_xmit_freq'
+            ),
+            # Minimum perceptual hash distance from last queued image, 0 = queue every image
+            'change_thresh': self.config.getint(
+                'Capture_Settings',
+                'change_threshold',
+                fallback=0
+            ),
+            # Run capture as persistent daemon instead of CRON-spawned process
+            'daemon_enable': self.config.getboolean(
+                'Capture_Settings',
+                'daemon_enable',
+                fallback=False
             )
         }
 
@@ -104,13 +116,168 @@ class CaptureCfg(object):
             'width': 1536,
             'height': 1536,
             'quality': 20,
+            # Byte budget for reduced image, quality is searched to fit, 0 = fixed quality
+            'bytes_max': self.config.getint(
+                'Capture_Settings',
+                'image_bytes_max',
+                fallback=0
+            ),
             'shutter': 100000,              # Microseconds, 0 = auto
             'sharpness': 100,               # -100 to 100, 0 = default
             'saturation': 0,                # -100 to 100, 0 = default
             'rotation': 180,                # 0 to 359 degrees
-            'exposure': 'antishake'         # exposure setting
+            'exposure': 'antishake',        # exposure setting
+            # Capture unencoded luma plane instead of JPEG, image is encoded once in grayscale
+            'luma': self.config.getboolean(
+                'Capture_Settings',
+                'luma_capture',
+                fallback=False
+            ),
+            # Integer downscale factor applied to luma plane, 1 = full resolution
+            'luma_scale': self.config.getint(
+                'Capture_Settings',
+                'luma_scale',
+                fallback=1
+            ),
+            # Frames captured through video port with LED on, sharpest is kept, 1 = single still
+            'burst': self.config.getint(
+                'Capture_Settings',
+                'burst_frames',
+                fallback=1
+            )
+        }
+
+        # Region of interest dictionary, rectangles are (left, top, right, bottom)
+        self.roi_dict = {
+            'rects': self.roi_parse(
+                roi_str=self.config.get(
+                    'ROI_Settings',
+                    'roi',
+                    fallback=''
+                )
+            ),
+            # Locate dial with OpenCV once and cache region, used when no rectangle is given
+            'auto': self.config.getboolean(
+                'ROI_Settings',
+                'roi_auto',
+                fallback=False
+            ),
+            'cache_url': cfg_url_dict['roi']
         }
 
+        # Recognition dictionary, model maps register image to per-digit class scores
+        self.rcg_dict = {
+            'enable': self.config.getboolean(
+                'Recognition_Settings',
+                'recognition_enable',
+                fallback=False
+            ),
+            'backend': self.config.get(
+                'Recognition_Settings',
+                'backend',
+                fallback='opencv'
+            ),
+            'model_url': self.config.get(
+                'Recognition_Settings',
+                'model',
+                fallback=os.path.join(core_path_dict['cfg'], 'digits.onnx')
+            ),
+            'width': self.config.getint(
+                'Recognition_Settings',
+                'input_width',
+                fallback=160
+            ),
+            'height': self.config.getint(
+                'Recognition_Settings',
+                'input_height',
+                fallback=32
+            ),
+            'digits': self.config.getint(
+                'Recognition_Settings',
+                'digits',
+                fallback=6
+            ),
+            'batch': self.config.getint(
+                'Recognition_Settings',
+                'batch_size',
+                fallback=8
+            )
+        }
+
+        # Dial dictionary, analog needle read on polar grid cached in config directory
+        self.dial_dict = {
+            'enable': self.config.getboolean(
+                'Dial_Settings',
+                'dial_enable',
+                fallback=False
+            ),
+            'centre_x': self.config.getint('Dial_Settings', 'centre_x', fallback=0),
+            'centre_y': self.config.getint('Dial_Settings', 'centre_y', fallback=0),
+            'radius_inner': self.config.getint('Dial_Settings', 'radius_inner', fallback=0),
+            'radius_outer': self.config.getint('Dial_Settings', 'radius_outer', fallback=0),
+            'zero_angle': self.config.getfloat('Dial_Settings', 'zero_angle', fallback=0.0),
+            'units_per_rev': self.config.getfloat('Dial_Settings', 'units_per_rev', fallback=1.0),
+            'angle_steps': self.config.getint('Dial_Settings', 'angle_steps', fallback=360),
+            'radius_steps': self.config.getint('Dial_Settings', 'radius_steps', fallback=32),
+            'needle_dark': self.config.getboolean('Dial_Settings', 'needle_dark', fallback=True),
+            'cache_dir': core_path_dict['cfg']
+        }
+
+        # Image gate dictionary, images accompany readings only when needed
+        self.gate_dict = {
+            'enable': self.config.getboolean(
+                'Recognition_Settings',
+                'image_gate',
+                fallback=False
+            ),
+            'conf_min': self.config.getfloat(
+                'Recognition_Settings',
+                'confidence_min',
+                fallback=0.90
+            ),
+            # Minutes between audit images, 0 = no audit
+            'audit_freq': self.config.getint(
+                'Recognition_Settings',
+                'audit_freq',
+                fallback=1440
+            ),
+            'delta_max': self.config.getint(
+                'Recognition_Settings',
+                'reading_delta_max',
+                fallback=0
+            )
+        }
+
+    @staticmethod
+    def roi_parse(
+        roi_str: str
+    ) -> list:
+        """
+        Parses region of interest setting into list of rectangles
+
+        :param roi_str: str, 'left, top, right, bottom' groups separated by ';'
+
+        :return roi_list: list of (left, top, right, bottom) tuples
+        """
+        roi_list = []
+
+        for rect_str in roi_str.split(';'):
+            if rect_str.strip() == '':
+                continue
+            try:
+                rect = tuple(int(value) for value in rect_str.split(','))
+                if (len(rect) != 4) or (rect[0] >= rect[2]) or (rect[1] >= rect[3]):
+                    raise ValueError(rect_str)
+                roi_list.append(rect)
+
+            except ValueError:
+                log = 'Region of interest {0} is not left, top, right, bottom, ignoring.'.\
+                    format(rect_str.strip())
+                logger.error(msg=log)
+                print(log)
+
+        return roi_list
+
     def get(
         self,
         attrib: str
@@ -138,6 +305,14 @@ class CaptureCfg(object):
             return self.led_set_dict
         elif attrib == 'cam_cfg_dict':
             return self.cam_cfg_dict
+        elif attrib == 'roi_dict':
+            return self.roi_dict
+        elif attrib == 'rcg_dict':
+            return self.rcg_dict
+        elif attrib == 'gate_dict':
+            return self.gate_dict
+        elif attrib == 'dial_dict':
+            return self.dial_dict
 
     def set(
         self,
@@ -56,8 +56,16 @@ class CoreCfg(object):
         # Define file names in /config path
         cfg_name_dict = {
             'capt': 'capture.ini',
+            'chunk': 'chunk_state.json',
             'err':  'errors.txt',
+            'gate': 'gate_state.json',
+            'hash': 'xmit_hash.txt',
+            'qual': 'img_quality.csv',
+            'queue': 'xmit_queue.db',
+            'reads': 'readings.csv',
+            'roi':  'roi_cache.json',
             'seq':  'sequence.txt',
+            'ship': 'log_ship.json',
             'xmit': 'transmit.ini'
         }
 
@@ -67,14 +75,46 @@ class CoreCfg(object):
                 self.core_path_dict['cfg'],
                 cfg_name_dict['capt']
             ),
+            'chunk': os.path.join(
+                self.core_path_dict['cfg'],
+                cfg_name_dict['chunk']
+            ),
             'err': os.path.join(
                 self.core_path_dict['cfg'],
                 cfg_name_dict['err']
             ),
+            'gate': os.path.join(
+                self.core_path_dict['cfg'],
+                cfg_name_dict['gate']
+            ),
+            'hash': os.path.join(
+                self.core_path_dict['cfg'],
+                cfg_name_dict['hash']
+            ),
+            'qual': os.path.join(
+                self.core_path_dict['cfg'],
+                cfg_name_dict['qual']
+            ),
+            'queue': os.path.join(
+                self.core_path_dict['cfg'],
+                cfg_name_dict['queue']
+            ),
+            'reads': os.path.join(
+                self.core_path_dict['cfg'],
+                cfg_name_dict['reads']
+            ),
+            'roi': os.path.join(
+                self.core_path_dict['cfg'],
+                cfg_name_dict['roi']
+            ),
             'seq': os.path.join(
                 self.core_path_dict['cfg'],
                 cfg_name_dict['seq']
             ),
+            'ship': os.path.join(
+                self.core_path_dict['cfg'],
+                cfg_name_dict['ship']
+            ),
             'xmit': os.path.join(
                 self.core_path_dict['cfg'],
                 cfg_name_dict['xmit']
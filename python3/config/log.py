@@ -1,7 +1,14 @@
 __author__ = 'Larry A. Hartman'
 __company__ = 'Janus Research'
 
+import atexit
+import configparser
+import gzip
+import logging
+import logging.handlers
 import os
+import queue
+import shutil
 
 # Log paths and files
 LOGPATHWM = os.path.normpath('/var/log/JanusWM/')
@@ -12,13 +19,99 @@ januswm_capture = os.path.join(LOGPATHWMCAPT, 'januswm-capture')      # Log file
 januswm_transmit = os.path.join(LOGPATHWMXMIT, 'januswm-transmit')    # Log file
 
 
+def gzip_namer(
+    name: str
+) -> str:
+    """
+    Names rotated log segment as gzip file
+
+    :param name: str
+
+    :return name: str
+    """
+    return name + '.gz'
+
+
+def gzip_rotator(
+    source: str,
+    dest: str
+) -> None:
+    """
+    Compresses full log into rotated segment and removes it
+
+    :param source: str
+    :param dest: str
+    """
+    with open(file=source, mode='rb') as source_file, \
+            gzip.open(filename=dest, mode='wb') as dest_file:
+        shutil.copyfileobj(source_file, dest_file)
+    os.remove(source)
+
+
+def gzip_handler(
+    filename: str,
+    maxBytes: int,
+    backupCount: int
+) -> logging.handlers.RotatingFileHandler:
+    """
+    Creates RotatingFileHandler whose rotated segments are gzip-compressed,
+    named <log>.1.gz, <log>.2.gz and on
+
+    :param filename: str
+    :param maxBytes: int
+    :param backupCount: int
+
+    :return handler: logging.handlers.RotatingFileHandler
+    """
+    handler = logging.handlers.RotatingFileHandler(
+        filename=filename,
+        maxBytes=maxBytes,
+        backupCount=backupCount
+    )
+    handler.namer = gzip_namer
+    handler.rotator = gzip_rotator
+
+    return handler
+
+
 class LogCfg(object):
     def __init__(
-        self
+        self,
+        ini_url: str = ''
     ) -> None:
         """
-        Instantiates logging object and sets log configuration
+        Instantiates logging object and sets log configuration, logging mode
+        is read from [Log_Settings] of ini file if given
+
+        :param ini_url: str, '' = synchronous, uncompressed, console echo
         """
+        config = configparser.ConfigParser()
+        if ini_url != '':
+            config.read(ini_url)
+
+        self.mode_dict = {
+            # Loggers hand records to queue, file writes happen in listener thread
+            'async': config.getboolean(
+                'Log_Settings',
+                'log_async',
+                fallback=False
+            ),
+            # Rotated segments are gzip-compressed and larger, so far fewer files
+            'compress': config.getboolean(
+                'Log_Settings',
+                'log_compress',
+                fallback=False
+            ),
+            # Echo of log messages to stdout, which CRON mails, applied to CRON jobs by januswm.py
+            'console': config.getboolean(
+                'Log_Settings',
+                'log_console',
+                fallback=True
+            )
+        }
+        self.listener = None
+        self.file_handlers = {}
+
         self.config = {
             'version': 1,
             'disable_existing_loggers': False,
@@ -75,3 +168,85 @@ class LogCfg(object):
                 }
             }
         }
+
+        if self.mode_dict['compress']:
+            for handler_dict in self.config['handlers'].values():
+                del handler_dict['class']
+                handler_dict['()'] = gzip_handler
+                handler_dict['maxBytes'] = 250000
+                handler_dict['backupCount'] = 20
+
+    def start(
+        self
+    ) -> None:
+        """
+        Applies logging mode once configuration is loaded by dictConfig:
+        moves file handlers behind single queue listener.  Stdout is left
+        alone, console echo off only discards stdout of CRON jobs.
+        """
+        if self.mode_dict['async'] and (self.listener is None):
+            log_queue = queue.Queue(-1)
+            for logger_name in self.config['loggers']:
+                logger = logging.getLogger(name=logger_name)
+                self.file_handlers[logger_name] = list(logger.handlers)
+                for handler in self.file_handlers[logger_name]:
+                    logger.removeHandler(handler)
+                logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+            # Each record carries logger name, listener routes it to that logger's files
+            self.listener = logging.handlers.QueueListener(
+                log_queue,
+                LoggerRouter(handler_dict=self.file_handlers),
+                respect_handler_level=False
+            )
+            self.listener.start()
+            atexit.register(self.stop)
+
+    def stop(
+        self
+    ) -> None:
+        """
+        Drains queue into files and returns loggers to writing directly, so
+        records logged later during exit are not lost
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+            for logger_name, handler_list in self.file_handlers.items():
+                logger = logging.getLogger(name=logger_name)
+                for handler in list(logger.handlers):
+                    logger.removeHandler(handler)
+                for handler in handler_list:
+                    logger.addHandler(handler)
+
+
+class LoggerRouter(logging.Handler):
+    """
+    Listener-side handler passing each queued record to file handlers of
+    logger it was logged to
+    """
+    def __init__(
+        self,
+        handler_dict: dict
+    ) -> None:
+        """
+        Instantiates router
+
+        :param handler_dict: dict, logger name to list of handlers
+        """
+        logging.Handler.__init__(self)
+        self.handler_dict = handler_dict
+
+    def handle(
+        self,
+        record: logging.LogRecord
+    ) -> None:
+        """
+        Emits record through handlers of its logger that accept its level
+
+        :param record: logging.LogRecord
+        """
+        for handler in self.handler_dict.get(record.name, []):
+            if record.levelno >= handler.level:
+                handler.handle(record)
@@ -32,11 +32,44 @@ class TransmitCfg(object):
             'execution_interval'
         )
 
-        # Update frequency in minutes, minimum = 60 min and maximum = 1440, 60 min intervals
-        self.update_freq = self.config.getint(
-            'Update_Settings',
-            'update_freq'
-        )
+        # Bundle transmission directory into compressed archive(s) before transmission
+        self.bundle_dict = {
+            'enable': self.config.getboolean(
+                'Transmit_Settings',
+                'bundle_enable',
+                fallback=False
+            ),
+            # Maximum raw bytes per archive, larger backlogs are split into several archives
+            'max_bytes': self.config.getint(
+                'Transmit_Settings',
+                'bundle_max_bytes',
+                fallback=250000
+            )
+        }
+
+        # Transmission queue kinds in order of priority, unlisted kinds are sent last
+        self.queue_priority = [
+            kind.strip() for kind in self.config.get(
+                'Queue_Settings',
+                'priority',
+                fallback='errors, readings, images, logs'
+            ).split(',')
+        ]
+
+        # Log shipping dictionary, shipped position of each log is kept in state file
+        self.log_ship_dict = {
+            'level': self.config.get(
+                'Log_Settings',
+                'ship_level',
+                fallback='INFO'
+            ).strip().upper(),
+            'compress': self.config.getboolean(
+                'Log_Settings',
+                'ship_compress',
+                fallback=True
+            ),
+            'state_url': cfg_url_dict['ship']
+        }
 
         # Update frequency in minutes, minimum = 60 min and maximum = 1440, 60 min intervals
         self.update_freq = self.config.getint(
@@ -49,9 +82,30 @@ class TransmitCfg(object):
             'sock': 'fast.t-mobile.com',
             'addr': '198.13.81.243',
             'port': 4440,
+            'port_dev': '/dev/ttyAMA0',
+            'baudrate': 115200,
             'attempts': self.config.getint(
                 'Cellular_Configuration',
                 'transmission_attempts'
+            ),
+            # Resumable upload chunk size in bytes, 0 = send each file in single request
+            'chunk_bytes': self.config.getint(
+                'Cellular_Configuration',
+                'chunk_bytes',
+                fallback=0
+            ),
+            'chunk_state_url': cfg_url_dict['chunk'],
+            # Seconds allowed per probe command before modem is reset
+            'probe_deadline': self.config.getfloat(
+                'Cellular_Configuration',
+                'probe_deadline',
+                fallback=2.0
+            ),
+            # Read modem through asyncio engine so file preparation overlaps modem traffic
+            'async_io': self.config.getboolean(
+                'Cellular_Configuration',
+                'async_io',
+                fallback=False
             )
         }
 
@@ -72,6 +126,12 @@ class TransmitCfg(object):
             return self.update_freq
         elif attrib == 'gprs_cfg_dict':
             return self.gprs_cfg_dict
+        elif attrib == 'bundle_dict':
+            return self.bundle_dict
+        elif attrib == 'queue_priority':
+            return self.queue_priority
+        elif attrib == 'log_ship_dict':
+            return self.log_ship_dict
 
     def set(
         self,
@@ -38,18 +38,35 @@ if __name__ == '__main__':
         print(job)
 
     core_cfg = CoreCfg()
+    cfg_url_dict = core_cfg.get(attrib='cfg_url_dict')
     capture_cfg = CaptureCfg(core_cfg=core_cfg)
     img_capt_dict = capture_cfg.get(attrib='img_capt_dict')
 
     transmit_cfg = TransmitCfg(core_cfg=core_cfg)
     xmit_exec_int = transmit_cfg.get(attrib='exec_int')
 
-    job_capt = cron_sched.new(command='sudo python3 /opt/Janus/WM/python3/main-capture.py')
-    job_capt.minute.every(img_capt_dict['exec_interval'])
-    log = 'Setting capture execution to every {0} minutes.'.format(img_capt_dict['exec_interval'])
-    logger.info(msg=log)
+    # Stdout of job is discarded, not mailed by CRON, if console echo is off in its ini
+    capt_out = '' if LogCfg(ini_url=cfg_url_dict['capt']).mode_dict['console'] else ' > /dev/null'
+    xmit_out = '' if LogCfg(ini_url=cfg_url_dict['xmit']).mode_dict['console'] else ' > /dev/null'
+
+    if img_capt_dict['daemon_enable']:
+        # Daemon schedules its own captures, CRON only starts it at boot
+        # and relaunches it hourly should it have stopped
+        job_capt = cron_sched.new(command='sudo python3 /opt/Janus/WM/python3/main-capture-daemon.py' + capt_out)
+        job_capt.every_reboot()
+        job_capt_wdog = cron_sched.new(command='sudo python3 /opt/Janus/WM/python3/main-capture-daemon.py' + capt_out)
+        job_capt_wdog.minute.on(0)
+        log = 'Setting capture daemon execution at boot and hourly relaunch, ' + \
+            'capture every {0} minutes.'.format(img_capt_dict['exec_interval'])
+        logger.info(msg=log)
+
+    else:
+        job_capt = cron_sched.new(command='sudo python3 /opt/Janus/WM/python3/main-capture.py' + capt_out)
+        job_capt.minute.every(img_capt_dict['exec_interval'])
+        log = 'Setting capture execution to every {0} minutes.'.format(img_capt_dict['exec_interval'])
+        logger.info(msg=log)
 
-    job_xmit = cron_sched.new(command='sudo python3 /opt/Janus/WM/python3/main-transmit.py')
+    job_xmit = cron_sched.new(command='sudo python3 /opt/Janus/WM/python3/main-transmit.py' + xmit_out)
     # job_xmit.minute.every(3)
     job_xmit.hour.every(xmit_exec_int / 60)
     job_xmit.minute.on(25)
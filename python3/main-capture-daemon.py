@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+__author__ = 'Larry A. Hartman'
+__company__ = 'Janus Research'
+
+
+if __name__ == '__main__':
+    import logging
+    import logging.config
+    import signal
+    import sys
+    import time as ttime
+    from config.core import CoreCfg
+    from config.log import LogCfg
+    from tendo import singleton
+
+    # Configure logging, mode is read from [Log_Settings] and applied by start()
+    log_config_obj = LogCfg(ini_url=CoreCfg().get(attrib='cfg_url_dict')['capt'])
+    logging.config.dictConfig(log_config_obj.config)
+    log_config_obj.start()
+    logfile = 'januswm-capture'
+    logger = logging.getLogger(name=logfile)
+    logging.getLogger(name=logfile).setLevel(level=logging.INFO)
+
+    # Single instance, checked before heavy imports so CRON watchdog
+    # relaunch attempts exit quickly
+    try:
+        me = singleton.SingleInstance()
+
+    except singleton.SingleInstanceException:
+        log = 'Duplicate capture daemon process, shutting down.'
+        logger.info(msg=log)
+        print(log)
+        sys.exit(-1)
+
+    from common import capture, errors, picamera
+    from config.capture import CaptureCfg
+    from datetime import *
+
+    def stop_handler(
+        signum,
+        frame
+    ):
+        raise SystemExit(0)
+
+    signal.signal(
+        signal.SIGTERM,
+        stop_handler
+    )
+
+    for i in range(1, 6):
+        logger.info(msg='')
+
+    log = 'JanusWM Capture daemon logging started'
+    logger.info(msg=log)
+
+    core_cfg = CoreCfg()
+    capture_cfg = CaptureCfg(core_cfg=core_cfg)
+    img_capt_dict = capture_cfg.get(attrib='img_capt_dict')
+
+    # LED strip and camera are initialized on first capture and kept
+    # between captures
+    hw_dict = {
+        'flash': None,
+        'camera': None
+    }
+
+    try:
+        while True:
+
+            # Sleep until next execution interval boundary, one second
+            # past the minute so date-time stamps match CRON execution
+            exec_secs = img_capt_dict['exec_interval'] * 60
+            today = datetime.today()
+            day_secs = (today.hour * 3600) + (today.minute * 60) + today.second + \
+                (today.microsecond / 1000000)
+            ttime.sleep(exec_secs - (day_secs % exec_secs) + 1)
+
+            timea = ttime.time()
+
+            minute = int(datetime.today().strftime('%M'))
+            hour = int(datetime.today().strftime('%H'))
+            execution_minute = (hour * 60) + minute
+
+            # Rebuild capture configuration each cycle to pick up new
+            # image sequence, date-time stamp and capture.ini settings
+            capture_cfg = CaptureCfg(core_cfg=core_cfg)
+            img_capt_dict = capture_cfg.get(attrib='img_capt_dict')
+
+            print(execution_minute)
+            log = 'Capture execution minute: {0}'.format(execution_minute)
+            logger.info(msg=log)
+
+            timing_dict = {}
+            try:
+                capture.cycle(
+                    core_cfg=core_cfg,
+                    capture_cfg=capture_cfg,
+                    execution_minute=execution_minute,
+                    hw_dict=hw_dict,
+                    timing_dict=timing_dict
+                )
+
+            except Exception as exc:
+                log = 'Capture daemon cycle failed, reinitializing hardware.'
+                logger.error(msg=log)
+                logger.exception(msg=exc)
+                print(log)
+                print(exc)
+                picamera.cam_close(hw_dict=hw_dict)
+
+            timing_dict['total'] = ttime.time() - timea
+
+            log = capture.timing_report(timing_dict=timing_dict)
+            logger.info(msg=log)
+            print(log)
+
+            # Errors of cycle are written once, as single-run capture does at exit
+            errors.flush()
+
+    finally:
+        picamera.cam_close(hw_dict=hw_dict)
+
+        log = 'JanusWM Capture daemon stopped'
+        logger.info(msg=log)
+        print(log)
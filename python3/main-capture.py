@@ -4,22 +4,23 @@ __company__ = 'Janus Research'
 
 
 if __name__ == '__main__':
+    import time as ttime
+    timeo = ttime.time()
+
     import logging
     import logging.config
-    import os
-    import shutil
     import sys
-    import time as ttime
-    from common import capture, file_ops
+    from common import capture
     from config.core import CoreCfg
     from config.capture import CaptureCfg
     from config.log import LogCfg
     from datetime import *
     from tendo import singleton
 
-    # Configure logging
-    log_config_obj = LogCfg()
+    # Configure logging, mode is read from [Log_Settings] and applied by start()
+    log_config_obj = LogCfg(ini_url=CoreCfg().get(attrib='cfg_url_dict')['capt'])
     logging.config.dictConfig(log_config_obj.config)
+    log_config_obj.start()
     logfile = 'januswm-capture'
     logger = logging.getLogger(name=logfile)
     logging.getLogger(name=logfile).setLevel(level=logging.INFO)
@@ -41,8 +42,6 @@ if __name__ == '__main__':
     logger.info(msg=log)
 
     core_cfg = CoreCfg()
-    core_path_dict = core_cfg.get(attrib='core_path_dict')
-    cfg_url_dict = core_cfg.get(attrib='cfg_url_dict')
 
     timea = ttime.time()
 
@@ -52,54 +51,21 @@ if __name__ == '__main__':
 
     capture_cfg = CaptureCfg(core_cfg=core_cfg)
 
-    img_seq = capture_cfg.get(attrib='img_seq')
-    img_orig_dtg = capture_cfg.get(attrib='img_orig_dtg')
-    img_url = capture_cfg.get(attrib='img_url')
-    img_capt_dict = capture_cfg.get(attrib='img_capt_dict')
-    err_xmit_url = capture_cfg.get(attrib='err_xmit_url')
-
     print(execution_minute)
     log = 'Capture execution minute: {0}'.format(execution_minute)
     logger.info(msg=log)
 
-    img_capt_err = False
-    if img_capt_dict['img_capt_freq'] > 0:
-        if not (execution_minute % img_capt_dict['img_capt_freq']):
-            img_capt_err = capture.capture(
-                capture_cfg=capture_cfg
-            )
-
-    if not img_capt_err:
-        if img_capt_dict['img_xmit_freq'] > 0:
-            if not (execution_minute % img_capt_dict['img_xmit_freq']):
-                if os.path.isfile(path=img_url):
-                    shutil.copy2(
-                        src=img_url,
-                        dst=core_path_dict['xmit']
-                    )
-
-        if img_capt_dict['img_xmit_freq'] == 1:
-            set_err, msg = capture_cfg.set(
-                section='Capture_Settings',
-                attrib='image_xmit_freq',
-                value='0'
-            )
-
-        if img_capt_dict['img_capt_freq'] == 1:
-            set_err, msg = capture_cfg.set(
-                section='Capture_Settings',
-                attrib='image_capture_freq',
-                value='0'
-            )
-
-        # increment image sequence only after image is captured,
-        # even if there was an error
-        img_seq = str(int(img_seq) + 1)
-        file_ops.f_request(
-            file_cmd='file_replace',
-            file_name=cfg_url_dict['seq'],
-            num_bytes=7,
-            data_file_in=[img_seq]
-        )
+    timing_dict = {'startup': timea - timeo}
+    capture.cycle(
+        core_cfg=core_cfg,
+        capture_cfg=capture_cfg,
+        execution_minute=execution_minute,
+        timing_dict=timing_dict
+    )
+    timing_dict['total'] = ttime.time() - timeo
+
+    log = capture.timing_report(timing_dict=timing_dict)
+    logger.info(msg=log)
+    print(log)
 
     print('Total capture execution time elapsed: {0} sec'.format(ttime.time() - timea))
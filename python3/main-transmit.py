@@ -4,25 +4,24 @@ __company__ = 'Janus Research'
 
 
 if __name__ == '__main__':
-    import glob
     import logging
     import logging.config
     import os
-    import shutil
     import socket
     import sys
     import time as ttime
-    from common import transmit
-    from config.log import LogCfg, LOGPATHWMCAPT, LOGPATHWMXMIT
+    from common import bundle, log_ship, transmit
+    from common.xmit_queue import XmitQueue
+    from config.log import LogCfg, januswm_capture, januswm_transmit
     from config.core import CoreCfg
     from config.transmit import TransmitCfg
     from datetime import *
-    from pathlib import Path
     from tendo import singleton
 
-    # Configure logging
-    log_config_obj = LogCfg()
+    # Configure logging, mode is read from [Log_Settings] and applied by start()
+    log_config_obj = LogCfg(ini_url=CoreCfg().get(attrib='cfg_url_dict')['xmit'])
     logging.config.dictConfig(log_config_obj.config)
+    log_config_obj.start()
     logfile = 'januswm-transmit'
     logger = logging.getLogger(name=logfile)
     logging.getLogger(name=logfile).setLevel(level=logging.INFO)
@@ -53,6 +52,9 @@ if __name__ == '__main__':
 
     transmit_cfg = TransmitCfg(core_cfg=core_cfg)
     gprs_cfg_dict = transmit_cfg.get(attrib='gprs_cfg_dict')
+    bundle_dict = transmit_cfg.get(attrib='bundle_dict')
+    queue_priority = transmit_cfg.get(attrib='queue_priority')
+    log_ship_dict = transmit_cfg.get(attrib='log_ship_dict')
 
     print(execution_minute)
     log = 'Transmission execution minute: {0}'.format(execution_minute)
@@ -64,72 +66,82 @@ if __name__ == '__main__':
     #     )
 
     core_path_dict = core_cfg.get(attrib='core_path_dict')
+    cfg_url_dict = core_cfg.get(attrib='cfg_url_dict')
 
-    # Put last several logs into transmission directory if they exist
-    max_history = 3
-    directories = [LOGPATHWMCAPT, LOGPATHWMXMIT]
-    try:
-        for directory in directories:
-            count = 0
-            paths = sorted(
-                Path(directory).iterdir(),
-                key=os.path.getmtime,
-                reverse=True
+    host_name = socket.gethostname()
+
+    xmit_queue = XmitQueue(
+        queue_url=cfg_url_dict['queue'],
+        xmit_dir=core_path_dict['xmit'],
+        priority_list=queue_priority
+    )
+
+    def prepare():
+        """
+        Places new log lines into transmission directory, bundles queue if
+        enabled and synchronizes queue index, runs alongside modem attach
+        """
+        # Put log lines written since last shipment into transmission directory
+        log_ship.ship(
+            log_url_list=[januswm_capture, januswm_transmit],
+            xmit_queue=xmit_queue,
+            log_ship_dict=log_ship_dict,
+            xmit_dtg=datetime.today().strftime('%Y-%m-%d_%H%M')
+        )
+
+        # Pack queued files into compressed archive(s), previous bundles are sent as-is
+        if bundle_dict['enable']:
+            bundle_url_list = sorted(
+                os.path.join(core_path_dict['xmit'], file_name)
+                for file_name in os.listdir(core_path_dict['xmit'])
+                if not file_name.startswith('.') and not file_name.startswith('bundle_')
             )
-            for logfile in paths:
-                file_name, file_ext = os.path.splitext(str(logfile))
-                file_name = os.path.basename(file_name)
-                logfile_url = os.path.join(
-                    directory,
-                    str(logfile)
-                )
-                xmit_dtg = datetime.today().strftime('%Y-%m-%d_%H%M')
-                if file_ext != '':
-                    logfile = file_name + '_' + file_ext[1:]
-                else:
-                    logfile = file_name + '_0'
-                log_name = 'logs_' + xmit_dtg + '_' + logfile + '.txt'
-                transmit_url = os.path.join(
+            bundle_groups = bundle.group(
+                file_url_list=bundle_url_list,
+                bundle_max_bytes=bundle_dict['max_bytes']
+            )
+            xmit_dtg = datetime.today().strftime('%Y-%m-%d_%H%M%S')
+            for bundle_num, bundle_group in enumerate(bundle_groups):
+                bundle_url = os.path.join(
                     core_path_dict['xmit'],
-                    log_name
+                    'bundle_' + xmit_dtg + '_' + str(bundle_num) + '.zip'
                 )
-                shutil.copyfile(
-                    src=logfile_url,
-                    dst=transmit_url
+                bundle_err = bundle.bundle(
+                    file_url_list=bundle_group,
+                    bundle_url=bundle_url
                 )
-                count += 1
-                if count >= max_history:
-                    break
-
-    except Exception as exc:
-        log = 'Failed to copy logs to transmission directory.'
-        logger.error(msg=log)
-        logger.error(msg=exc)
+                if not bundle_err:
+                    for file_url in bundle_group:
+                        os.remove(file_url)
+
+        xmit_queue.sync()
+
+    def xmit_files():
+        """
+        Yields highest priority file in transmission queue with its
+        transmission name until queue is empty
+        """
+        while True:
+            file_url_local = xmit_queue.dequeue()
+            if file_url_local is None:
+                break
+            print(file_url_local)
+
+            file_url_xmit = host_name + '_' + os.path.basename(file_url_local)
+            yield file_url_local, file_url_xmit
+
+    xmit_err = transmit.transmit_batch(
+        gprs_set_dict=gprs_cfg_dict,
+        file_list=xmit_files(),
+        xmit_done=xmit_queue.ack,
+        xmit_fail=xmit_queue.fail,
+        prepare=prepare
+    )
+    xmit_queue.close()
+
+    if xmit_err:
+        log = 'Encountered problems transmitting files, will attempt again later.'
+        logger.warning(msg=log)
         print(log)
-        print(exc)
-
-    host_name = socket.gethostname()
-    while os.listdir(core_path_dict['xmit']):
-        most_recent_url_str = max(
-            glob.iglob(os.path.join(core_path_dict['xmit'] + '*')),
-            key=os.path.getctime
-        )
-        print(most_recent_url_str)
-
-        file_url_xmit = host_name + '_' + os.path.basename(most_recent_url_str)
-        xmit_err = transmit.transmit_data(
-            gprs_set_dict=gprs_cfg_dict,
-            file_url_local=most_recent_url_str,
-            file_url_xmit=file_url_xmit
-        )
-
-        if not xmit_err:
-            os.remove(most_recent_url_str)
-
-        else:
-            log = 'Encountered problems transmitting files, will attempt again later.'
-            logger.warning(msg=log)
-            print(log)
-            break
 
     print('Total transmission execution time elapsed: {0} sec'.format(ttime.time() - timea))
@@ -7,11 +7,45 @@ import RPi.GPIO as GPIO
 import serial
 import socket
 import time as ttime
+from common.at_engine import ATEngine
 from datetime import *
 
 logfile = 'januswm-transmit'
 logger = logging.getLogger(logfile)
 
+# Final result, prompt and deadline per AT command, see common.at_engine
+SIM5320_AT_TABLE = {
+    'AT+CGSOCKCONT': {
+        'deadline': 30
+    },
+    'AT+CHTTPSSTART': {
+        'deadline': 30
+    },
+    'AT+CHTTPSOPSE': {
+        'deadline': 60
+    },
+    # Send prompt arrives without line ending
+    'AT+CHTTPSSEND': {
+        'final': [],
+        'error': [r'ERROR$', r'\+CHTTPSNOTIFY: PEER CLOSED'],
+        'prompt': [r'>$'],
+        'deadline': 30
+    },
+    'DATA': {
+        'deadline': 60
+    },
+    'RECV EVENT': {
+        'final': [r'\+CHTTPS: RECV EVENT'],
+        'error': [r'ERROR$', r'\+CHTTPSNOTIFY: PEER CLOSED'],
+        'deadline': 60
+    },
+    'AT+CHTTPSRECV': {
+        'final': [r'\+CHTTPSRECV: 0$'],
+        'error': [r'ERROR$', r'\+CHTTPSNOTIFY: PEER CLOSED'],
+        'deadline': 30
+    }
+}
+
 
 class Sim5320(object):
     def __init__(
@@ -22,6 +56,15 @@ class Sim5320(object):
         """
         self.port = None
 
+        self.engine = ATEngine(
+            name='Sim5320',
+            cmd_table=SIM5320_AT_TABLE
+        )
+        self.engine.register_urc(
+            prefix='+CHTTPSNOTIFY',
+            handler=logger.warning
+        )
+
     @staticmethod
     def reset(
     ) -> None:
@@ -65,6 +108,7 @@ class Sim5320(object):
                 baudrate=115200,
                 timeout=1
             )
+            self.engine.attach(port=self.port)
             logger.info('Serial port opened for Sim5320, settings:')
             logger.info(self.port.get_settings())
 
@@ -82,6 +126,7 @@ class Sim5320(object):
         """
         Closes serial port to Sim5320
         """
+        self.engine.detach()
         self.port.close()
         logger.info('Serial port closed for Sim5320.')
 
@@ -149,71 +194,19 @@ class Sim5320(object):
 
         :return port_cmd_err: bool
         """
-        port_cmd_err = False
-
-        log = 'Sim5320 ' + port_cmd + ' response:'
-        logger.info(log)
+        if port_cmd == 'AT+CHTTPSRECV':
+            # Wait for receive event, then read until no data remains
+            port_cmd_err, port_lines = self.engine.response(
+                port_msg=port_cmd,
+                spec=self.engine.spec(port_msg='RECV EVENT')
+            )
+            if not port_cmd_err:
+                port_msg = 'AT+CHTTPSRECV=1024\r'
+                self.port.write(port_msg.encode())
+                port_cmd_err, port_lines = self.engine.response(port_msg=port_cmd)
 
-        blank_count = 0
-        port_event = ''
-        while True:
-            port_line = self.port.readline()
-            try:
-                port_line = port_line.decode('utf-8').split('\r\n')[0]
-                if (port_line != '') and (not port_line.isspace()):
-                    logger.info(port_line)
-                    print(port_line)
-            except Exception as exc:
-                logger.debug(exc)
-
-            if port_cmd == 'AT+CGSOCKCONT':
-                if port_line == '':
-                    blank_count += 1
-
-                if blank_count == 20:
-                    break
-
-                ttime.sleep(0.250)
-
-            elif port_cmd == 'AT+CHTTPSSEND':
-                if port_line == '+CHTTPSNOTIFY: PEER CLOSED':
-                    port_cmd_err = True
-                    break
-
-                if port_line == '>':
-                    break
-
-            elif port_cmd == 'AT+CHTTPSRECV':
-                if port_line == '+CHTTPSNOTIFY: PEER CLOSED':
-                    port_cmd_err = True
-                    break
-
-                if port_line == '+CHTTPS: RECV EVENT':
-                    port_event = port_line
-                    port_msg = 'AT+CHTTPSRECV=1024\r'
-                    self.port.write(port_msg.encode())
-
-                if (port_event == '+CHTTPS: RECV EVENT') and \
-                        (port_line == '+CHTTPSRECV: 0'):
-                    break
-
-                if port_line == '':
-                    blank_count += 1
-
-                if blank_count == 50:
-                    port_msg = 'AT+CHTTPSRECV=1024\r'
-                    self.port.write(port_msg.encode())
-
-                ttime.sleep(0.10)
-
-            else:
-                if port_line == 'OK':
-                    break
-                ttime.sleep(0.05)
-
-            if port_line == 'ERROR':
-                port_cmd_err = True
-                break
+        else:
+            port_cmd_err, port_lines = self.engine.response(port_msg=port_cmd)
 
         return port_cmd_err
 
@@ -2,30 +2,124 @@ __author__ = 'Larry A. Hartman'
 __company__ = 'Janus Research'
 
 import logging
+import os
+import re
 import RPi.GPIO as GPIO
 import serial
 import socket
 import time as ttime
 import urllib.request
 import urllib.error
+from common import chunked
+from common.at_async import SyncATEngine
+from common.at_engine import ATEngine, DEFAULT_SPEC
 
 logfile = 'januswm-transmit'
 logger = logging.getLogger(logfile)
 
+# Wall time of hard reset through PWRKEY, avoided when modem answers probe
+RESET_SEC = 11
+
+# Content type by last file extension, others are sent as application/octet-stream
+CONTENT_TYPES = {
+    '.txt': 'text/plain',
+    '.log': 'text/plain',
+    '.gz': 'application/gzip',
+    '.zip': 'application/zip'
+}
+
+# Seconds allowed per probe command when no deadline is configured
+PROBE_SEC = 2.0
+
+# Seconds allowed for modem to become ready after reset
+BOOT_SEC = 60
+
+# Registered to home network or roaming
+CREG_PATTERN = r'\+CREG:\s*\d+,[15]'
+
+# Final result, prompt and deadline per AT command, see common.at_engine
+SIM800_AT_TABLE = {
+    'AT+SAPBR=3,1,"APN"': {
+        'deadline': 30
+    },
+    # Bearer open and close may take up to 85 and 65 seconds
+    'AT+SAPBR=1,1': {
+        'deadline': 85
+    },
+    'AT+SAPBR=0,1': {
+        'deadline': 65
+    },
+    'AT+HTTPDATA': {
+        'final': [r'DOWNLOAD$'],
+        'deadline': 10
+    },
+    # Raw data written after DOWNLOAD prompt, acknowledged within HTTPDATA window
+    'DATA': {
+        'deadline': 120
+    },
+    'AT+HTTPACTION': {
+        'final': [r'\+HTTPACTION:\s*\d+,\d+'],
+        'deadline': 150
+    },
+    'AT+HTTPREAD': {
+        'deadline': 30
+    },
+    'AT+CPOWD': {
+        'final': [r'NORMAL POWER DOWN$'],
+        'deadline': 10
+    }
+}
+
 
 class Sim800(object):
     def __init__(
-        self
+        self,
+        async_io: bool = False,
+        port_dev: str = '/dev/ttyAMA0',
+        baudrate: int = 115200
     ) -> None:
         """
         Instantiates Sim800 object
+
+        :param async_io: bool, read modem through asyncio engine in background thread
+        :param port_dev: str, serial device
+        :param baudrate: int
         """
         self.port = None
+        self.port_dev = port_dev
+        self.baudrate = baudrate
+        self.http_status = 0
+        self.http_body = ''
+        self.sim_ready = False
+        self.probe_deadline = PROBE_SEC
+
+        # Modem state is unknown until probed or reset, session polls until modem is ready
+        self.boot_wait = True
+
+        if async_io:
+            self.engine = SyncATEngine(
+                name='Sim800',
+                cmd_table=SIM800_AT_TABLE
+            )
+        else:
+            self.engine = ATEngine(
+                name='Sim800',
+                cmd_table=SIM800_AT_TABLE
+            )
+        for prefix in ['RDY', 'SMS Ready', 'Call Ready', '+CPIN:', 'UNDER-VOLTAGE', 'OVER-VOLTAGE']:
+            self.engine.register_urc(
+                prefix=prefix,
+                handler=self.urc
+            )
 
-    @staticmethod
     def reset(
+        self
     ) -> None:
-        """Resets Sim800"""
+        """
+        Pulses PWRKEY, which toggles Sim800 power: powers on modem that is
+        off but powers off modem that is running, so used only when modem
+        does not answer AT
+        """
         GPIO.setmode(GPIO.BCM)
         GPIO.setup(
             22,
@@ -47,10 +141,169 @@ class Sim800(object):
         )
         GPIO.cleanup(22)
         ttime.sleep(5)
+        self.boot_wait = True
         log = 'Sim800 reset executed.'
         logger.info(msg=log)
         print(log)
 
+    def soft_reset(
+        self
+    ) -> bool:
+        """
+        Restarts running Sim800 through AT+CFUN=1,1, modem stays powered and
+        registers anew
+
+        :return reset_err: bool
+        """
+        reset_err = self.port_open()
+
+        if not reset_err:
+            reset_err = self.port_cmd(
+                port_cmd='AT+CFUN',
+                port_args='=1,1'
+            )
+            self.port_close()
+
+        self.boot_wait = True
+        log = 'Sim800 soft reset {0}.'.format('failed' if reset_err else 'executed')
+        logger.info(msg=log)
+        print(log)
+
+        return reset_err
+
+    def probe(
+        self,
+        probe_deadline: float
+    ) -> bool:
+        """
+        Checks that Sim800 answers and is registered and attached to network
+
+        :param probe_deadline: float, seconds allowed per probe command
+
+        :return probe_err: bool
+        :return probe_answer: bool, modem answered AT
+        """
+        probe_answer = False
+        probe_err = self.port_open()
+        spec = dict(DEFAULT_SPEC)
+        spec['deadline'] = probe_deadline
+
+        if not probe_err:
+            for port_cmd, port_result in [
+                ('AT', None),
+                ('AT+CREG?', CREG_PATTERN),
+                ('AT+CGATT?', r'\+CGATT:\s*1')
+            ]:
+                probe_err = self.port_check(
+                    port_cmd=port_cmd,
+                    port_result=port_result,
+                    spec=spec
+                )
+                if not probe_err and (port_result is None):
+                    probe_answer = True
+
+                if probe_err:
+                    log = 'Sim800 probe failed at {0}.'.format(port_cmd)
+                    logger.warning(msg=log)
+                    print(log)
+                    break
+
+            self.port_close()
+
+        return probe_err, probe_answer
+
+    def boot_poll(
+        self
+    ) -> bool:
+        """
+        Polls Sim800 after reset until it answers, SIM is ready and it is
+        registered.  Boot messages such as SMS Ready may be sent before
+        serial port is opened, so they are not waited for.
+
+        :return boot_err: bool
+        """
+        spec = dict(DEFAULT_SPEC)
+        spec['deadline'] = self.probe_deadline
+
+        boot_err = True
+        timea = ttime.time()
+        while boot_err and ((ttime.time() - timea) < BOOT_SEC):
+            self.sim_ready = False
+            boot_err = self.port_check(
+                port_cmd='AT',
+                port_result=None,
+                spec=spec
+            )
+
+            # +CPIN: answer is taken by unsolicited result code handler
+            if not boot_err:
+                boot_err = self.port_check(
+                    port_cmd='AT+CPIN?',
+                    port_result=None,
+                    spec=spec
+                ) or not self.sim_ready
+
+            if not boot_err:
+                boot_err = self.port_check(
+                    port_cmd='AT+CREG?',
+                    port_result=CREG_PATTERN,
+                    spec=spec
+                )
+
+            if boot_err:
+                ttime.sleep(1)
+
+        if boot_err:
+            log = 'Sim800 not ready {0} sec after reset.'.format(BOOT_SEC)
+            logger.error(msg=log)
+        else:
+            self.boot_wait = False
+            log = 'Sim800 ready {0:.2f} sec after port opened.'.format(ttime.time() - timea)
+            logger.info(msg=log)
+        print(log)
+
+        return boot_err
+
+    def probe_reset(
+        self,
+        probe_deadline: float
+    ) -> bool:
+        """
+        Probes Sim800 and resets it only as far as needed: hard reset if it
+        does not answer AT, as it is off or hung, soft reset if it answers but
+        is not registered or attached.  Modem is powered down at end of each
+        run, so probe saves hard reset only on retries within run.
+
+        :param probe_deadline: float
+
+        :return probe_err: bool
+        """
+        self.probe_deadline = probe_deadline
+        timea = ttime.time()
+        probe_err, probe_answer = self.probe(probe_deadline=probe_deadline)
+        probe_time = ttime.time() - timea
+
+        if probe_err and not probe_answer:
+            log = 'Sim800 did not answer probe in {0:.2f} sec, executing hard reset.'.format(probe_time)
+            logger.info(msg=log)
+            print(log)
+            self.reset()
+
+        elif probe_err:
+            log = 'Sim800 answered probe but is not on network, executing soft reset.'
+            logger.info(msg=log)
+            print(log)
+            self.soft_reset()
+
+        else:
+            self.boot_wait = False
+            log = 'Sim800 probe passed in {0:.2f} sec, hard reset skipped, {1:.2f} sec saved.'.\
+                format(probe_time, RESET_SEC - probe_time)
+            logger.info(msg=log)
+            print(log)
+
+        return probe_err
+
     def port_open(
         self
     ) -> bool:
@@ -63,10 +316,11 @@ class Sim800(object):
 
         try:
             self.port = serial.Serial(
-                port="/dev/ttyAMA0",
-                baudrate=115200,
+                port=self.port_dev,
+                baudrate=self.baudrate,
                 timeout=1
             )
+            self.engine.attach(port=self.port)
             log = 'Serial port opened for Sim800, settings:'
             logger.info(msg=log)
             print(log)
@@ -88,7 +342,7 @@ class Sim800(object):
         """
         Closes serial port to Sim800
         """
-
+        self.engine.detach()
         self.port.close()
         log = 'Serial port closed for Sim800.'
         logger.info(msg=log)
@@ -96,21 +350,26 @@ class Sim800(object):
     def port_cmd(
         self,
         port_cmd: str,
-        port_args: str = ''
+        port_args: str = '',
+        spec: dict = None
     ) -> bool:
         """
         Writes AT command to serial port
 
         :param port_cmd: str
         :param port_args: str
+        :param spec: dict, overrides response specification from command table
 
         :return port_cmd_err: bool
         """
         try:
             port_msg_raw = port_cmd + port_args
             port_msg = port_msg_raw + '\r'
-            self.port.write(data=port_msg.encode())
-            port_cmd_err = self.response(port_msg=port_msg_raw)
+            port_cmd_err = self.response(
+                port_msg=port_msg_raw,
+                spec=spec,
+                data=port_msg.encode()
+            )
 
         except serial.SerialException:
             port_cmd_err = True
@@ -120,6 +379,37 @@ class Sim800(object):
 
         return port_cmd_err
 
+    def port_check(
+        self,
+        port_cmd: str,
+        port_result: any,
+        spec: dict
+    ) -> bool:
+        """
+        Writes AT query and checks that response holds expected line
+
+        :param port_cmd: str
+        :param port_result: str regular expression, None = final result alone
+        :param spec: dict
+
+        :return check_err: bool
+        """
+        try:
+            check_err, port_lines = self.engine.response(
+                port_msg=port_cmd,
+                spec=spec,
+                data=(port_cmd + '\r').encode()
+            )
+
+        except serial.SerialException:
+            check_err = True
+            port_lines = []
+
+        if not check_err and (port_result is not None):
+            check_err = not any(re.match(port_result, port_line) for port_line in port_lines)
+
+        return check_err
+
     def port_data(
         self,
         port_cmd: str,
@@ -138,11 +428,15 @@ class Sim800(object):
         try:
             port_msg_raw = port_cmd + port_args
             port_msg = port_msg_raw + '\r'
-            self.port.write(data=port_msg.encode())
-            port_cmd_err = self.response(port_msg=port_msg_raw)
+            port_cmd_err = self.response(
+                port_msg=port_msg_raw,
+                data=port_msg.encode()
+            )
             if not port_cmd_err:
-                self.port.write(data=data_pkt)
-                port_cmd_err = self.response(port_msg='DATA')
+                port_cmd_err = self.response(
+                    port_msg='DATA',
+                    data=data_pkt
+                )
 
         except serial.SerialException:
             port_cmd_err = True
@@ -155,111 +449,69 @@ class Sim800(object):
     def response(
         self,
         port_msg: str,
+        spec: dict = None,
+        data: bytes = None
     ) -> bool:
         """
-        Reads response from serial port
+        Writes command data through engine and reads response from serial
+        port, engine awaits response before data is written
 
         :param port_msg: str
+        :param spec: dict
+        :param data: bytes
 
         :return port_msg_err: bool
         """
-        port_msg_err = False
-
-        log = 'Sim800 ' + port_msg + ' response'
-        logger.info(msg=log)
-        print(log)
-
-        blank_count = 0
-        while True:
-            port_line = self.port.readline()
-            try:
-                port_line = port_line.decode('utf-8').split(sep='\r\n')[0]
-                if (port_line != '') and (not port_line.isspace()):
-                    logger.info(msg=port_line)
-                    print(port_line)
-            except Exception as exc:
-                logger.debug(msg=exc)
-                print(exc)
-
-            if port_msg == 'AT+SAPBR=3,1,"Contype","GPRS"':
-                if port_line == 'SMS Ready':
-                    break
-
-                if port_line == '':
-                    blank_count += 1
-                if blank_count == 240:
-                    port_msg_err = True
-                    break
-
-                ttime.sleep(0.25)
-
-            elif port_msg == 'AT+SAPBR=3,1,"APN","fast.t-mobile.com"':
-                if port_line == 'OK':
-                    break
-
-                if port_line == '':
-                    blank_count += 1
-                if blank_count == 240:
-                    port_msg_err = True
-                    break
-
-                ttime.sleep(0.25)
-
-            elif port_msg == 'AT+SAPBR=1,1':
-                if port_line == 'OK':
-                    break
-
-                if port_line == '':
-                    blank_count += 1
-                if blank_count == 240:
-                    port_msg_err = True
-                    break
-
-                ttime.sleep(0.25)
-
-            elif port_msg == 'AT+SAPBR=2,1':
-                if port_line == 'OK':
-                    break
-
-                if port_line == '':
-                    blank_count += 1
-                if blank_count == 240:
-                    port_msg_err = True
-                    break
-
-                ttime.sleep(0.25)
-
-            elif port_msg[:11] == 'AT+HTTPDATA':
-                if port_line == 'DOWNLOAD':
-                    break
+        port_msg_err, port_lines = self.engine.response(
+            port_msg=port_msg,
+            spec=spec,
+            data=data
+        )
 
-            elif port_msg[:13] == 'AT+HTTPACTION':
-                if port_line[:18] == '+HTTPACTION: 1,200':
-                    logger.info('Sim800 experienced a successful upload.')
-                elif port_line[:18] == '+HTTPACTION: 1,415':
-                    logger.warning('Sim800 attempted to upload unsupported media type.')
-                elif port_line[:18] == '+HTTPACTION: 1,502':
-                    port_msg_err = True
-                    logger.error('Sim800 experienced a server error.')
-                elif port_line[:18] == '+HTTPACTION: 1,601':
-                    port_msg_err = True
-                    logger.error('Sim800 experienced a network error.')
-
-                if port_line[:12] == '+HTTPACTION:':
+        if port_msg[:13] == 'AT+HTTPACTION' and port_lines:
+            port_line = port_lines[-1]
+            if port_line[:18] == '+HTTPACTION: 1,200':
+                logger.info('Sim800 experienced a successful upload.')
+            elif port_line[:18] == '+HTTPACTION: 1,415':
+                logger.warning('Sim800 attempted to upload unsupported media type.')
+            elif port_line[:18] == '+HTTPACTION: 1,502':
+                port_msg_err = True
+                logger.error('Sim800 experienced a server error.')
+            elif port_line[:18] == '+HTTPACTION: 1,601':
+                port_msg_err = True
+                logger.error('Sim800 experienced a network error.')
+
+            if port_line[:12] == '+HTTPACTION:':
+                try:
+                    self.http_status = int(port_line.split(sep=',')[1])
+                except (IndexError, ValueError):
+                    self.http_status = 0
+
+        # Body follows +HTTPREAD: length line and precedes final result
+        if (port_msg[:11] == 'AT+HTTPREAD') and not port_msg_err:
+            for line_num, port_line in enumerate(port_lines):
+                if port_line[:10] == '+HTTPREAD:':
+                    self.http_body = '\n'.join(port_lines[line_num + 1:-1])
                     break
 
-            else:
-                if port_line == 'OK':
-                    break
-                elif port_line == 'NORMAL POWER DOWN':
-                    break
-                ttime.sleep(0.05)
+        return port_msg_err
 
-            if port_line == 'ERROR':
-                port_msg_err = True
-                break
+    def urc(
+        self,
+        port_line: str
+    ) -> None:
+        """
+        Handles unsolicited result codes
 
-        return port_msg_err
+        :param port_line: str
+        """
+        if port_line.startswith('+CPIN:'):
+            self.sim_ready = port_line.endswith('READY')
+            logger.info(msg='Sim800 reported ' + port_line + '.')
+        elif port_line in ['SMS Ready', 'Call Ready']:
+            logger.info(msg='Sim800 reported ' + port_line + '.')
+        else:
+            logger.warning(msg='Sim800 unsolicited result: ' + port_line)
 
     def http_start(
         self,
@@ -279,18 +531,22 @@ class Sim800(object):
         while http_cmd_err and (count < 3):
             if count > 0:
                 log = 'Sim800 experienced error in configuring GPRS service, closing serial, ' +\
-                      'resetting Sim800, reattempting.'
+                      'probing Sim800, reattempting.'
                 logger.warning(msg=log)
                 print(log)
                 self.port_close()
-                self.reset()
+                self.probe_reset(probe_deadline=self.probe_deadline)
                 ser_err = self.port_open()
+                if not ser_err and not self.boot_wait:
+                    self.http_clear()
 
             if not ser_err:
-                http_cmd_err = self.port_cmd(
-                    port_cmd='AT+SAPBR',
-                    port_args='=3,1,"Contype","GPRS"'
-                )
+                http_cmd_err = self.boot_poll() if self.boot_wait else False
+                if not http_cmd_err:
+                    http_cmd_err = self.port_cmd(
+                        port_cmd='AT+SAPBR',
+                        port_args='=3,1,"Contype","GPRS"'
+                    )
             count += 1
 
         if not http_cmd_err:
@@ -325,33 +581,60 @@ class Sim800(object):
 
         return http_cmd_err
 
+    def http_clear(
+        self
+    ) -> None:
+        """
+        Terminates HTTP service and closes bearer left open, SIM800 rejects
+        AT+HTTPINIT and AT+SAPBR=1,1 while they are open.  Errors are
+        ignored, as either may already be closed.
+        """
+        spec = dict(DEFAULT_SPEC)
+        spec['deadline'] = self.probe_deadline
+
+        self.port_cmd(
+            port_cmd='AT+HTTPTERM',
+            port_args='',
+            spec=spec
+        )
+        self.port_cmd(
+            port_cmd='AT+SAPBR',
+            port_args='=0,1'
+        )
+
     def http_sendrecv(
         self,
         gprs_set_dict: dict,
         host_name: str,
         content_type: str,
-        data_pkt: bytes
+        data_pkt: bytes,
+        url_path: str = '/upload'
     ) -> bool:
         """
-        Executes http send/receive commands
+        Executes http send/receive commands, HTTP status code of action is
+        left in http_status and response body in http_body
 
         :param gprs_set_dict: dict
         :param host_name: str
         :param content_type: str
         :param data_pkt: bytes
+        :param url_path: str
 
         :return http_cmd_err: bool
         """
+        self.http_status = 0
+        self.http_body = ''
         http_cmd_err = self.port_cmd(
             port_cmd='AT+HTTPPARA',
             port_args='="CID",1'
         )
 
         if not http_cmd_err:
-            port_args = '="URL","{0}:{1}/upload"'.\
+            port_args = '="URL","{0}:{1}{2}"'.\
                 format(
                     gprs_set_dict['addr'],
-                    gprs_set_dict['port']
+                    gprs_set_dict['port'],
+                    url_path
                 )
             http_cmd_err = self.port_cmd(
                 port_cmd='AT+HTTPPARA',
@@ -462,12 +745,7 @@ class Sim800(object):
         http_cmd_err = True
 
         # Determine content type for HTML header and build
-        if file_url_xmit.split('.')[1] == 'txt':
-            content_type = 'text/plain'
-        elif file_url_xmit.split('.')[1] == 'log':
-            content_type = 'text/plain'
-        else:
-            content_type = 'application/octet-stream'
+        content_type = self.content_type(file_url_xmit=file_url_xmit)
 
         with open(file=file_url_local, mode='rb') as text_file:
             data_pkt = text_file.read()
@@ -507,6 +785,140 @@ class Sim800(object):
 
         return http_cmd_err, ser_err
 
+    @staticmethod
+    def content_type(
+        file_url_xmit: str
+    ) -> str:
+        """
+        Determines content type for HTML header from last file extension,
+        so compressed logs_*.txt.gz are sent as gzip
+
+        :param file_url_xmit: str
+
+        :return content_type: str
+        """
+        content_type = CONTENT_TYPES.get(
+            os.path.splitext(file_url_xmit)[1].lower(),
+            'application/octet-stream'
+        )
+
+        return content_type
+
+    def session_open(
+        self,
+        gprs_set_dict: dict
+    ) -> [bool, bool]:
+        """
+        Opens serial port and brings up GPRS bearer and HTTP service once
+        for successive session_send calls
+
+        :param gprs_set_dict: dict
+
+        :return http_cmd_err: bool
+        :return ser_err: bool
+        """
+        ser_err = self.port_open()
+        http_cmd_err = True
+
+        if not ser_err:
+            # Running modem may hold HTTP service and bearer of failed session
+            if not self.boot_wait:
+                self.http_clear()
+
+            http_cmd_err = self.http_start(
+                gprs_set_dict=gprs_set_dict
+            )
+
+            if http_cmd_err:
+                log = 'Sim800 failed to open upload session.'
+                logger.error(msg=log)
+                print(log)
+
+        else:
+            log = 'Failed to open serial port to SIM 800.'
+            logger.error(msg=log)
+            print(log)
+
+        return http_cmd_err, ser_err
+
+    def session_send(
+        self,
+        gprs_set_dict: dict,
+        file_url_local: str,
+        file_url_xmit: str,
+        chunk_state: chunked.ChunkState = None
+    ) -> bool:
+        """
+        Executes http file upload over session opened by session_open,
+        file is sent in resumable chunks if chunk state is given and
+        chunk size is configured
+
+        :param gprs_set_dict: dict
+        :param file_url_local: str
+        :param file_url_xmit: str
+        :param chunk_state: ChunkState
+
+        :return http_cmd_err: bool
+        """
+        content_type = self.content_type(file_url_xmit=file_url_xmit)
+
+        if (chunk_state is not None) and (gprs_set_dict['chunk_bytes'] > 0):
+
+            def send_chunk(
+                url_path: str,
+                data_pkt: bytes
+            ) -> (int, str):
+                self.http_sendrecv(
+                    gprs_set_dict=gprs_set_dict,
+                    host_name=file_url_xmit,
+                    content_type='application/octet-stream',
+                    data_pkt=data_pkt,
+                    url_path=url_path
+                )
+                return self.http_status, self.http_body
+
+            http_cmd_err = chunked.upload(
+                send_chunk=send_chunk,
+                chunk_state=chunk_state,
+                file_url_local=file_url_local,
+                file_url_xmit=file_url_xmit,
+                chunk_bytes=gprs_set_dict['chunk_bytes']
+            )
+
+        else:
+            with open(file=file_url_local, mode='rb') as text_file:
+                data_pkt = text_file.read()
+
+            http_cmd_err = self.http_sendrecv(
+                gprs_set_dict=gprs_set_dict,
+                host_name=file_url_xmit,
+                content_type=content_type,
+                data_pkt=data_pkt
+            )
+
+        return http_cmd_err
+
+    def session_close(
+        self,
+        session_err: bool = False
+    ) -> bool:
+        """
+        Stops http post sequence, powers down Sim800 and closes serial port,
+        stop sequence is skipped if session is in error
+
+        :param session_err: bool
+
+        :return http_cmd_err: bool
+        """
+        http_cmd_err = session_err
+
+        if (self.port is not None) and self.port.is_open:
+            if not session_err:
+                http_cmd_err = self.http_stop()
+            self.port_close()
+
+        return http_cmd_err
+
     def http_updateconfig(
         self,
         gprs_set_dict: dict